@@ -0,0 +1,152 @@
+"""Generate and store this week's meal plan for every user with a calorie goal.
+
+The catalog is loaded once: listings and meal details come from the
+MealCatalog caches (downloading only what's missing), and calories are
+estimated once per meal. Each worker process receives the candidate pool
+once, when it starts, and indexes it by category and ingredient (see
+CandidateIndex). Users' targets and dietary preferences are then read
+from user_goals in username order, a chunk at a time. Workers plan a
+chunk with MealPlanner.optimize over each user's eligible meals, with no
+database or network access, and the parent stores each finished chunk in
+one transaction. A user whose plan can't be
+built is reported in the result and the run carries on.
+
+Each user's seed is derived from their username and the week, so
+re-running the batch for a week reproduces the same plans.
+"""
+import multiprocessing
+import os
+import time
+from datetime import date
+from typing import Iterator, List, Optional
+
+from db import open_database, release_database
+from meal_catalog import MealCatalog
+from meal_planner import CATEGORIES, DEFAULT_TOLERANCE, CandidateIndex, MealPlanError, MealPlanner
+from meal_plans import MealPlanStore, plan_seed, week_start
+from metrics import timed
+from nutrition import meal_calories, meal_ingredients
+from preferences import from_row
+from recompute import recompute_stale_goals
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Per worker process, set by _init_worker
+_index: Optional[CandidateIndex] = None
+_calories: dict = {}
+_tolerance = DEFAULT_TOLERANCE
+
+
+def load_candidates(db_path: str, offline: bool = False, base_url: Optional[str] = None) -> tuple:
+    """Return (meals_by_category, calories, ingredients) for the shared candidate pool."""
+    options = {"base_url": base_url} if base_url else {}
+    catalog = MealCatalog(db_path, offline=offline, **options)
+    try:
+        meals = catalog.prefetch(CATEGORIES)
+        details = catalog.get_details(meal["idMeal"] for listing in meals.values() for meal in listing)
+    finally:
+        catalog.close()
+    return meals, meal_calories(details), meal_ingredients(details)
+
+def iter_goals(db_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[tuple]]:
+    """Yield chunks of (username, calorie_intake, allowed_categories,
+    excluded_categories, excluded_ingredients) in username order; the last
+    three are dietary_preferences' JSON columns, or None.
+
+    Each chunk is its own query, continuing after the last username seen,
+    so nothing holds a read open between chunks.
+    """
+    db = open_database(db_path)
+    try:
+        last = ""
+        while True:
+            rows = db.conn.execute("""
+                SELECT g.username, g.calorie_intake,
+                       p.allowed_categories, p.excluded_categories, p.excluded_ingredients
+                FROM user_goals g LEFT JOIN dietary_preferences p ON p.username = g.username
+                WHERE g.username > ? ORDER BY g.username LIMIT ?
+            """, (last, chunk_size)).fetchall()
+            if not rows:
+                return
+            yield rows
+            last = rows[-1][0]
+    finally:
+        release_database(db)
+
+def _init_worker(meals_by_category: dict, calories: dict, ingredients: dict, tolerance: float):
+    global _index, _calories, _tolerance
+    _index = CandidateIndex(MealPlanner(meals_by_category, CATEGORIES), ingredients)
+    _calories = calories
+    _tolerance = tolerance
+
+def _plan_chunk(task: tuple) -> tuple:
+    """Plan one chunk of users; returns (plans, failures)."""
+    week, goals = task
+    plans, failures = [], []
+    for username, calorie_goal, *preferences in goals:
+        if not calorie_goal or calorie_goal <= 0:
+            failures.append((username, "No calorie goal set."))
+            continue
+        # Users with the same preferences share a planner, built on first use
+        planner = _index.planner_for(from_row(*preferences))
+        try:
+            plans.append((username, planner.optimize(calorie_goal, _calories, _tolerance,
+                                                     plan_seed(username, week))))
+        except MealPlanError as e:
+            failures.append((username, str(e)))
+    return plans, failures
+
+@timed()
+def generate_all_plans(db_path: str = "database/health_tracker.db", week: Optional[str] = None,
+                       processes: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       tolerance: float = DEFAULT_TOLERANCE, offline: bool = False,
+                       base_url: Optional[str] = None) -> dict:
+    """Plan the week containing ``week`` (a YYYY-MM-DD date, default
+    today) for every user with a goal, replacing plans already stored.
+
+    ``processes`` defaults to one per CPU; with 1 everything runs in this
+    process. Stale goals are recomputed first. Returns counts, per-user
+    failures as (username, message) pairs, and timing.
+    """
+    start = time.perf_counter()
+    week = week_start(date.fromisoformat(week) if week else None)
+    processes = processes or os.cpu_count() or 1
+    recompute_stale_goals(db_path)
+    meals, calories, ingredients = load_candidates(db_path, offline, base_url)
+    tasks = ((week, chunk) for chunk in iter_goals(db_path, chunk_size))
+
+    store = MealPlanStore(db_path)
+    users = planned = 0
+    failures = []
+    try:
+        if processes == 1:
+            _init_worker(meals, calories, ingredients, tolerance)
+            results = map(_plan_chunk, tasks)
+            pool = None
+        else:
+            # spawn: a forked child would inherit this process's SQLite connections
+            pool = multiprocessing.get_context("spawn").Pool(
+                processes, initializer=_init_worker, initargs=(meals, calories, ingredients, tolerance))
+            results = pool.imap_unordered(_plan_chunk, tasks)
+        try:
+            for plans, failed in results:
+                planned += store.save_plans(plans, week)
+                users += len(plans) + len(failed)
+                failures.extend(failed)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+    finally:
+        store.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        "week": week,
+        "users": users,
+        "planned": planned,
+        "failed": len(failures),
+        "failures": failures,
+        "seconds": seconds,
+        "users_per_second": users / seconds if seconds else 0.0,
+    }
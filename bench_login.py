@@ -0,0 +1,42 @@
+"""Report password verifications (logins) per second at each scrypt cost.
+
+Single-threaded numbers are logins/sec per core; the pooled numbers use the
+shared verifier pool with one worker per CPU, as UserInformation.login does.
+
+    python bench_login.py [--costs 12 13 14 15] [--logins 40]
+"""
+import argparse
+import os
+import time
+
+import password_hashing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--costs", type=int, nargs="+", default=[12, 13, 14, 15])
+    parser.add_argument("--logins", type=int, default=40)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    print(f"cores: {cores}")
+    print(f"{'cost':>4}  {'ms/login':>9}  {'logins/s/core':>13}  {'pooled logins/s':>15}")
+    for cost in args.costs:
+        stored = password_hashing.hash_password("correct horse", cost)
+
+        start = time.perf_counter()
+        for _ in range(args.logins):
+            password_hashing.verify_password("correct horse", stored, cost)
+        single = (time.perf_counter() - start) / args.logins
+
+        start = time.perf_counter()
+        futures = [password_hashing.submit_verify("correct horse", stored, cost) for _ in range(args.logins)]
+        for future in futures:
+            future.result()
+        pooled = args.logins / (time.perf_counter() - start)
+
+        print(f"{cost:>4}  {single * 1000:>9.1f}  {1 / single:>13.1f}  {pooled:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Time per-user get_health_data lookups as the tables grow.
+
+get_health_data reads the newest health_history row through the
+(username, recorded_at) index, so the time per call should stay roughly
+flat from 1k to 1M users.
+
+    python bench_lookups.py [--sizes 1000 10000 100000 1000000] [--lookups 2000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from personal_record import PersonalRecord
+
+
+def build_database(path: str, users: int, batch: int = 50000):
+    record = PersonalRecord(path)
+    try:
+        for start in range(0, users, batch):
+            rows = [(f"user{i}", 70.0, 1.75, 22.86) for i in range(start, min(start + batch, users))]
+            record.conn.executemany(
+                "INSERT INTO health_data (username, weight, height, bmi) VALUES (?, ?, ?, ?)", rows
+            )
+            record.conn.executemany(
+                "INSERT INTO health_history (username, weight, height, bmi) VALUES (?, ?, ?, ?)", rows
+            )
+            record.conn.commit()
+    finally:
+        record.close()
+
+
+def time_lookups(path: str, users: int, lookups: int) -> float:
+    """Return the mean seconds per get_health_data call."""
+    names = [f"user{random.randrange(users)}" for _ in range(lookups)]
+    record = PersonalRecord(path)
+    try:
+        # Time hits, not misses against an empty table
+        if record.get_health_data(names[0]) is None:
+            raise RuntimeError(f"{names[0]} has no health data in {path}")
+        start = time.perf_counter()
+        for name in names:
+            record.get_health_data(name)
+        return (time.perf_counter() - start) / lookups
+    finally:
+        record.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'users':>10}  {'us/lookup':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"bench_{size}.db")
+            build_database(path, size)
+            per_call = time_lookups(path, size, args.lookups)
+            print(f"{size:>10}  {per_call * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
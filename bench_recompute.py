@@ -0,0 +1,75 @@
+"""Compare users/second for the per-user and vectorized calorie recompute.
+
+    python bench_recompute.py [--users 20000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from goals import Goals
+from recompute import recompute_all_goals
+
+
+def populate(g: Goals, users: int):
+    """Insert synthetic users with measurements, workouts and goals directly."""
+    rng = random.Random(0)
+    conn = g.conn
+    names = [f"u{i}" for i in range(users)]
+    with conn:
+        conn.executemany(
+            "INSERT INTO users (username, email, password_hash, year_of_birth, gender) VALUES (?, ?, 'x', ?, ?)",
+            [(n, f"{n}@example.com", rng.randint(1950, 2010), rng.choice(["male", "female"])) for n in names],
+        )
+        measurements = [(n, rng.uniform(45, 120), rng.uniform(1.5, 2.0)) for n in names]
+        conn.executemany(
+            "INSERT INTO health_data (username, weight, height, bmi) VALUES (?, ?, ?, 0)", measurements
+        )
+        conn.executemany(
+            "INSERT INTO health_history (username, weight, height, bmi) VALUES (?, ?, ?, 0)", measurements
+        )
+        workouts = [(n, rng.randint(0, 7), rng.uniform(0.25, 2)) for n in names]
+        conn.executemany(
+            "INSERT INTO workout_status (username, workout_days_per_week, duration_per_day) VALUES (?, ?, ?)",
+            workouts,
+        )
+        conn.executemany(
+            "INSERT INTO workout_history (username, workout_days_per_week, duration_per_day) VALUES (?, ?, ?)",
+            workouts,
+        )
+        conn.executemany(
+            "INSERT INTO user_goals (username, goal, bmr, calorie_intake) VALUES (?, ?, 0, 0)",
+            [(n, rng.choice(["maintain", "lose", "gain"])) for n in names],
+        )
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        g = Goals(path)
+        try:
+            names = populate(g, args.users)
+            goal_of = dict(g.conn.execute("SELECT username, goal FROM user_goals"))
+
+            start = time.perf_counter()
+            for name in names:
+                g.set_calorie_goal(name, goal_of[name])
+            per_user = time.perf_counter() - start
+
+            result = recompute_all_goals(path)
+        finally:
+            g.close()
+
+    print(f"users:       {args.users}")
+    print(f"per-user:    {args.users / per_user:>12,.0f} users/s")
+    print(f"vectorized:  {result['users_per_second']:>12,.0f} users/s")
+
+
+if __name__ == "__main__":
+    main()
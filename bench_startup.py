@@ -0,0 +1,53 @@
+"""Measure the import cost of the entry-point modules with ``-X importtime``.
+
+    python bench_startup.py [module ...]
+"""
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+ENTRY_POINTS = ("main", "cli")
+
+
+def _importtime(code: str) -> Dict[str, int]:
+    """Run code in a fresh interpreter and return {module: cumulative us}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            modules[parts[2].strip()] = int(parts[1])
+        except ValueError:
+            continue  # header row
+    return modules
+
+
+def import_profile(module: str) -> Tuple[int, Dict[str, int]]:
+    """Import a module in a fresh interpreter.
+
+    Returns the module's cumulative import time in microseconds and the
+    modules it pulled in beyond what a bare interpreter already loads, with
+    their cumulative times.
+    """
+    baseline = _importtime("pass")
+    modules = _importtime(f"import {module}")
+    added = {name: micros for name, micros in modules.items() if name not in baseline}
+    return modules[module], added
+
+
+def main():
+    for module in sys.argv[1:] or ENTRY_POINTS:
+        total, modules = import_profile(module)
+        heavy = sorted(modules.items(), key=lambda item: -item[1])[1:6]
+        print(f"{module}: {total / 1000:.1f} ms, {len(modules)} new modules")
+        for name, micros in heavy:
+            print(f"    {name:<30} {micros / 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
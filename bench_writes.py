@@ -0,0 +1,71 @@
+"""Report measurement writes per second for each journal / sync / commit setting.
+
+Both modes send the same writes from --threads threads, each on its own
+connection. "direct" commits every write separately, as the menu does;
+"group" sends them through the group commit writer, so one sync covers
+many writes.
+
+    python bench_writes.py [--writes 2000] [--threads 16] [--window 0]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from personal_record import PersonalRecord
+
+SETTINGS = [
+    ("delete", "full"),
+    ("wal", "full"),
+    ("wal", "normal"),
+    ("wal", "off"),
+]
+
+
+def run(path: str, journal_mode: str, synchronous: str, group: bool, writes: int,
+        threads: int, window: float) -> float:
+    """Return writes per second for one configuration on a fresh database."""
+    record = PersonalRecord(path)
+    try:
+        record.db.configure(journal_mode=journal_mode, synchronous=synchronous)
+        if group:
+            record.db.enable_group_commit(window=window)
+        per_thread = writes // threads
+
+        def write(worker: int):
+            for i in range(per_thread):
+                ok, message = record.add_or_update_measurements(f"user{worker}-{i % 100}", 70.0, 1.75)
+                if not ok:
+                    raise RuntimeError(message)
+
+        start = time.perf_counter()
+        pool = [threading.Thread(target=write, args=(w,)) for w in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        return per_thread * threads / (time.perf_counter() - start)
+    finally:
+        record.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--window", type=float, default=0.0)
+    args = parser.parse_args()
+
+    print(f"{'journal':>7}  {'sync':>6}  {'direct w/s':>10}  {'group w/s':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n, (journal_mode, synchronous) in enumerate(SETTINGS):
+            rates = []
+            for group in (False, True):
+                path = os.path.join(tmp, f"writes-{n}-{int(group)}.db")
+                rates.append(run(path, journal_mode, synchronous, group, args.writes, args.threads, args.window))
+            print(f"{journal_mode:>7}  {synchronous:>6}  {rates[0]:>10,.0f}  {rates[1]:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
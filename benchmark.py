@@ -0,0 +1,283 @@
+"""Time the tracker's hot paths against a synthetic database.
+
+generate() fills a fresh database with users who each have a measurement
+history, a workout history and a calorie goal. run_suite() then times
+these against it: signup, login, the get_* lookups, set_calorie_goal, a
+bulk recompute, and meal-plan generation against a local FakeMealAPI.
+Lookups pick random users, so with a large population most of them miss
+the read cache.
+
+Results are JSON. Pass an earlier run as --baseline and the run fails
+when any operation's throughput drops by more than --threshold.
+
+    python benchmark.py [--users 1000 10000] [--ops 2000] [--output run.json]
+                        [--baseline old.json] [--threshold 0.25]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List
+
+import diet_plan
+import password_hashing
+from db import open_database, release_database
+from fake_meal_api import FakeMealAPI, make_catalog
+from goals import Goals
+from meal_catalog import MealCatalog
+from personal_record import PersonalRecord
+from recompute import recompute_all_goals
+from user_information import UserInformation
+
+PASSWORD = "benchmark-password"
+GOALS = ["maintain", "lose", "gain"]
+
+
+def username(i: int) -> str:
+    return f"u{i}"
+
+
+def generate(path: str, users: int, seed: int = 0, history: int = 3,
+             hash_cost: int = password_hashing.DEFAULT_COST, batch: int = 50000) -> int:
+    """Create ``users`` synthetic users in the database at ``path``.
+
+    Each user gets ``history`` measurements and workouts a day apart, with
+    the latest one copied to health_data and workout_status, and a goal
+    whose targets are filled in by a bulk recompute. Every user's password
+    is PASSWORD. Returns the number of users created.
+    """
+    rng = random.Random(seed)
+    # One hash for everyone: hashing a million passwords would dominate setup
+    password_hash = password_hashing.hash_password(PASSWORD, hash_cost)
+    now = datetime.now()
+    stamps = [(now - timedelta(days=history - k)).strftime("%Y-%m-%d %H:%M:%S.000") for k in range(history)]
+
+    db = open_database(path)
+    try:
+        conn = db.conn
+        for start in range(0, users, batch):
+            rows = range(start, min(start + batch, users))
+            names = [username(i) for i in rows]
+            measurements, workouts = [], []
+            latest_measurements, latest_workouts = [], []
+            for name in names:
+                height = round(rng.uniform(1.5, 2.0), 2)
+                for stamp in stamps:
+                    weight = round(rng.uniform(45, 120), 1)
+                    days = rng.randint(0, 7)
+                    duration = round(rng.uniform(0.25, 2), 2)
+                    measurements.append((name, weight, height, round(weight / height ** 2, 2), stamp))
+                    workouts.append((name, days, duration, stamp))
+                latest_measurements.append(measurements[-1][:4])
+                latest_workouts.append(workouts[-1][:3])
+            with conn:
+                conn.executemany(
+                    "INSERT INTO users (username, email, password_hash, first_name, last_name, year_of_birth, gender)"
+                    " VALUES (?, ?, ?, 'Bench', 'User', ?, ?)",
+                    [(n, f"{n}@example.com", password_hash, rng.randint(1950, 2010), rng.choice(["male", "female"]))
+                     for n in names],
+                )
+                conn.executemany(
+                    "INSERT INTO health_history (username, weight, height, bmi, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                    measurements,
+                )
+                conn.executemany(
+                    "INSERT INTO health_data (username, weight, height, bmi) VALUES (?, ?, ?, ?)",
+                    latest_measurements,
+                )
+                conn.executemany(
+                    "INSERT INTO workout_history (username, workout_days_per_week, duration_per_day, recorded_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    workouts,
+                )
+                conn.executemany(
+                    "INSERT INTO workout_status (username, workout_days_per_week, duration_per_day) VALUES (?, ?, ?)",
+                    latest_workouts,
+                )
+                conn.executemany(
+                    "INSERT INTO user_goals (username, goal, bmr, calorie_intake) VALUES (?, ?, 0, 0)",
+                    [(n, rng.choice(GOALS)) for n in names],
+                )
+    finally:
+        release_database(db)
+    recompute_all_goals(path)
+    return users
+
+
+def measure(name: str, call: Callable, arguments: Iterable[tuple]) -> dict:
+    """Call ``call(*args)`` for each argument tuple and summarise the latencies."""
+    latencies = []
+    for args in arguments:
+        start = time.perf_counter()
+        call(*args)
+        latencies.append(time.perf_counter() - start)
+    return summarize(name, latencies)
+
+
+def summarize(name: str, latencies: List[float]) -> dict:
+    ordered = sorted(latencies)
+    total = sum(ordered)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    return {
+        "name": name,
+        "ops": len(ordered),
+        "seconds": total,
+        "ops_per_second": len(ordered) / total if total else 0.0,
+        "mean_ms": total / len(ordered) * 1000,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def _checked(call: Callable) -> Callable:
+    """Wrap a (success, message) method so a failure stops the run."""
+    def run(*args):
+        ok, message = call(*args)
+        if not ok:
+            raise RuntimeError(f"{call.__name__}{args}: {message}")
+    return run
+
+
+def run_suite(path: str, users: int, ops: int = 2000, slow_ops: int = 20, seed: int = 0,
+              hash_cost: int = password_hashing.DEFAULT_COST) -> List[dict]:
+    """Time each operation on the database generate() built at ``path``.
+
+    ``ops`` calls are made per lookup and write, ``slow_ops`` per signup,
+    login and meal plan. Every result carries the population size.
+    """
+    rng = random.Random(seed)
+    picks = [(username(rng.randrange(users)),) for _ in range(ops)]
+    results = []
+
+    ui = UserInformation(path, hash_cost=hash_cost)
+    record = PersonalRecord(path)
+    goals = Goals(path)
+    try:
+        results.append(measure("signup", _checked(ui.user_account), [
+            (f"new{i}", f"new{i}@example.com", PASSWORD, "Bench", "User", 1990, "female") for i in range(slow_ops)
+        ]))
+        results.append(measure("login", _checked(ui.login), [(name, PASSWORD) for name, in picks[:slow_ops]]))
+        results.append(measure("get_user_profile", ui.get_user_profile, picks))
+        results.append(measure("get_health_data", record.get_health_data, picks))
+        results.append(measure("get_workout_status", ui.get_workout_status, picks))
+        results.append(measure("get_goals", goals.get_goals, picks))
+        results.append(measure("set_calorie_goal", _checked(goals.set_calorie_goal),
+                               [(name, rng.choice(GOALS)) for name, in picks]))
+        results.append(measure("add_or_update_measurements", _checked(record.add_or_update_measurements),
+                               [(name, round(rng.uniform(45, 120), 1), 1.75) for name, in picks]))
+    finally:
+        goals.close()
+        record.close()
+        ui.close()
+
+    recompute = recompute_all_goals(path)
+    result = summarize("recompute_all_goals", [recompute["seconds"]])
+    result["users_per_second"] = recompute["users_per_second"]
+    results.append(result)
+
+    results.append(_meal_plans(path, slow_ops, seed))
+    for result in results:
+        result["users"] = users
+    return results
+
+
+def _meal_plans(path: str, plans: int, seed: int) -> dict:
+    """Time calorie-balanced plan generation; the first plan downloads the
+    catalog and meal details, later ones hit the cache."""
+    api = FakeMealAPI(make_catalog(diet_plan.CATEGORIES)).start()
+    catalog = MealCatalog(path, base_url=api.base_url)
+
+    def plan(plan_seed: int):
+        meals = catalog.prefetch(diet_plan.CATEGORIES)
+        details = catalog.get_details(meal["idMeal"] for listing in meals.values() for meal in listing)
+        diet_plan.build_plan(meals, details, 2000, plan_seed)
+
+    try:
+        return measure("meal_plan", plan, [(seed + i,) for i in range(plans)])
+    finally:
+        catalog.close()
+        api.stop()
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.25) -> List[str]:
+    """Describe each operation whose throughput fell more than ``threshold``
+    (a fraction) below the baseline run's. Operations are matched by name
+    and population size; ones missing from either run are ignored."""
+    before = {(r["name"], r["users"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = before.get((result["name"], result["users"]))
+        if not old or not old["ops_per_second"]:
+            continue
+        change = result["ops_per_second"] / old["ops_per_second"] - 1
+        if change < -threshold:
+            regressions.append(
+                f"{result['name']} ({result['users']} users): {old['ops_per_second']:,.1f} -> "
+                f"{result['ops_per_second']:,.1f} ops/s ({change:+.0%})"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--ops", type=int, default=2000, help="calls per lookup or write")
+    parser.add_argument("--slow-ops", type=int, default=20, help="calls per signup, login or meal plan")
+    parser.add_argument("--history", type=int, default=3, help="measurements and workouts per user")
+    parser.add_argument("--hash-cost", type=int, default=password_hashing.DEFAULT_COST)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="a previous --output file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="fractional slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    run = {
+        "meta": {
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "ops": args.ops,
+            "slow_ops": args.slow_ops,
+            "history": args.history,
+            "hash_cost": args.hash_cost,
+            "seed": args.seed,
+        },
+        "results": [],
+    }
+    print(f"{'users':>9}  {'operation':<28}{'ops/s':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    for users in args.users:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "health_tracker.db")
+            generate(path, users, args.seed, args.history, args.hash_cost)
+            for result in run_suite(path, users, args.ops, args.slow_ops, args.seed, args.hash_cost):
+                run["results"].append(result)
+                print(f"{users:>9}  {result['name']:<28}{result['ops_per_second']:>12,.1f}"
+                      f"{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(run, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,359 @@
+"""Streaming bulk import and export of users, measurements and workouts.
+
+Files are CSV (with a header row) or JSONL (one object per line); the format
+comes from the file extension unless given explicitly. Imports read and
+validate records in chunks, using the same rules as the interactive paths,
+and write each chunk with executemany in one transaction. Plaintext
+passwords are hashed a chunk at a time on the password_hashing pool. Exports iterate
+the cursor instead of loading whole tables.
+
+    python bulk_io.py import users users.csv
+    python bulk_io.py export measurements history.jsonl
+"""
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from itertools import repeat
+from typing import IO, Iterator, List, Optional, Tuple
+
+import goal_staleness
+import password_hashing
+from personal_record import PersonalRecord
+from user_information import UserInformation
+from workout_status import WorkoutStatus
+
+KINDS = ("users", "measurements", "workouts")
+
+# Column order used for export, and accepted on import
+FIELDS = {
+    "users": ["username", "email", "password_hash", "first_name", "last_name", "year_of_birth", "gender", "created_at"],
+    "measurements": ["username", "weight", "height", "bmi", "recorded_at"],
+    "workouts": ["username", "workout_days_per_week", "duration_per_day", "recorded_at"],
+}
+
+EXPORT_QUERIES = {
+    "users": """
+        SELECT username, email, password_hash, first_name, last_name, year_of_birth, gender, created_at
+        FROM users ORDER BY id
+    """,
+    "measurements": """
+        SELECT username, weight, height, bmi, recorded_at
+        FROM health_history ORDER BY id
+    """,
+    "workouts": """
+        SELECT username, workout_days_per_week, duration_per_day, recorded_at
+        FROM workout_history ORDER BY id
+    """,
+}
+
+
+class RowError(ValueError):
+    """A record that failed validation; the message is shown to the user."""
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    if fmt:
+        return fmt
+    return "jsonl" if path.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[Tuple[int, dict]]:
+    """Yield (line_number, record) pairs, one at a time."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    record = {"__error__": f"Invalid JSON: {e.msg}"}
+                if not isinstance(record, dict):
+                    record = {"__error__": "Each line must be a JSON object."}
+                yield line_number, record
+
+def _now() -> str:
+    """Timestamp in the same format SQLite uses for recorded_at."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+def _timestamp(record: dict, field: str) -> str:
+    """Parse an optional ISO date/time and rewrite it in _now()'s format.
+
+    History and snapshot rows are ordered by comparing these strings, so
+    anything else (or a time in the future) would shadow later writes.
+    Times without an offset are taken as UTC, like SQLite's.
+    """
+    value = _text(record, field, required=False)
+    if value is None:
+        return _now()
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise RowError(f"{field} must be a date and time such as 2024-03-04 08:30:00.")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if parsed > datetime.now(timezone.utc).replace(tzinfo=None):
+        raise RowError(f"{field} is in the future.")
+    return parsed.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+def _text(record: dict, field: str, required: bool = True) -> Optional[str]:
+    value = record.get(field)
+    if value is None or str(value).strip() == "":
+        if required:
+            raise RowError(f"Missing {field}.")
+        return None
+    return str(value).strip()
+
+class _Plaintext(str):
+    """A password waiting to be hashed with the rest of its chunk."""
+
+def _number(record: dict, field: str, kind=float):
+    value = _text(record, field)
+    try:
+        return kind(value)
+    except ValueError:
+        raise RowError(f"{field} must be numeric.")
+
+
+class BulkImporter:
+    """Validate and insert records for one table, a chunk at a time."""
+
+    def __init__(self, db_path: str = "database/health_tracker.db", chunk_size: int = 5000,
+                 hash_cost: int = password_hashing.DEFAULT_COST):
+        """hash_cost is the scrypt cost for imported plaintext passwords; a
+        lower cost than the default is upgraded at the user's next login."""
+        self.chunk_size = chunk_size
+        self.user_info = UserInformation(db_path, hash_cost)
+        self.health_record = PersonalRecord(db_path)
+        self.conn = self.user_info.conn
+
+    def close(self):
+        self.user_info.close()
+        self.health_record.close()
+
+    # Each _prepare_* turns a record into a parameter tuple or raises RowError.
+
+    def _prepare_users(self, record: dict) -> tuple:
+        username = _text(record, "username")
+        email = _text(record, "email")
+        password = _text(record, "password", required=False)
+        password_hash = _text(record, "password_hash", required=False)
+        if password is None and password_hash is None:
+            raise RowError("Missing password or password_hash.")
+        year_of_birth = _number(record, "year_of_birth", int)
+        gender = _text(record, "gender").lower()
+        error = UserInformation.validate_account(username, email, password, year_of_birth, gender)
+        if error:
+            raise RowError(error)
+        if password is not None:
+            password_hash = _Plaintext(password)
+        return (username, email, password_hash, _text(record, "first_name", required=False),
+                _text(record, "last_name", required=False), year_of_birth, gender)
+
+    def _prepare_measurements(self, record: dict) -> tuple:
+        username = _text(record, "username")
+        weight = _number(record, "weight")
+        height = _number(record, "height")
+        if not self.health_record._is_valid_measurement(weight):
+            raise RowError("Invalid weight value. It must be a positive number.")
+        if not self.health_record._is_valid_measurement(height):
+            raise RowError("Invalid height value. It must be a positive number.")
+        bmi = self.health_record._calculate_bmi(weight, height)
+        recorded_at = _timestamp(record, "recorded_at")
+        return username, weight, height, bmi, recorded_at
+
+    def _prepare_workouts(self, record: dict) -> tuple:
+        username = _text(record, "username")
+        days = _number(record, "workout_days_per_week", int)
+        duration = _number(record, "duration_per_day")
+        error = WorkoutStatus.validate_workout(days, duration)
+        if error:
+            raise RowError(error)
+        recorded_at = _timestamp(record, "recorded_at")
+        return username, days, duration, recorded_at
+
+    def _write_users(self, rows: List[tuple]):
+        self.conn.executemany("""
+            INSERT INTO users (username, email, password_hash, first_name, last_name, year_of_birth, gender)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+    def _write_measurements(self, rows: List[tuple]):
+        self.conn.executemany("""
+            INSERT INTO health_history (username, weight, height, bmi, recorded_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+        # Keep the snapshot row pointing at the newest entry, whatever the file order
+        self.conn.executemany("""
+            INSERT INTO health_data (username, weight, height, bmi, last_updated)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(username) DO UPDATE SET
+                weight = excluded.weight,
+                height = excluded.height,
+                bmi = excluded.bmi,
+                last_updated = excluded.last_updated
+            WHERE excluded.last_updated >= health_data.last_updated
+        """, rows)
+        goal_staleness.mark_dirty_many(self.conn, {row[0] for row in rows})
+
+    def _write_workouts(self, rows: List[tuple]):
+        self.conn.executemany("""
+            INSERT INTO workout_history (username, workout_days_per_week, duration_per_day, recorded_at)
+            VALUES (?, ?, ?, ?)
+        """, rows)
+        self.conn.executemany("""
+            INSERT INTO workout_status (username, workout_days_per_week, duration_per_day, last_updated)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(username) DO UPDATE SET
+                workout_days_per_week = excluded.workout_days_per_week,
+                duration_per_day = excluded.duration_per_day,
+                last_updated = excluded.last_updated
+            WHERE excluded.last_updated >= workout_status.last_updated
+        """, rows)
+        goal_staleness.mark_dirty_many(self.conn, {row[0] for row in rows})
+
+    def _flush(self, kind: str, batch: List[Tuple[int, tuple]], errors: List[Tuple[int, str]]) -> int:
+        """Write one chunk in a transaction and return how many rows were stored.
+
+        If the chunk hits a constraint (e.g. a duplicate username) it is
+        retried row by row so only the offending lines are rejected.
+        """
+        write = getattr(self, f"_write_{kind}")
+        if kind == "users":
+            batch = self._hash_passwords(batch)
+        try:
+            with self.conn:
+                write([row for _, row in batch])
+            return len(batch)
+        except sqlite3.IntegrityError:
+            pass
+
+        stored = 0
+        for line_number, row in batch:
+            try:
+                with self.conn:
+                    write([row])
+                stored += 1
+            except sqlite3.IntegrityError as e:
+                errors.append((line_number, _integrity_message(e)))
+        return stored
+
+    def _hash_passwords(self, batch: List[Tuple[int, tuple]]) -> List[Tuple[int, tuple]]:
+        """Replace the chunk's plaintext passwords with hashes, computed
+        in parallel on the shared pool."""
+        pending = [i for i, (_, row) in enumerate(batch) if isinstance(row[2], _Plaintext)]
+        hashes = password_hashing.get_pool().map(
+            password_hashing.hash_password, [batch[i][1][2] for i in pending],
+            repeat(self.user_info.hash_cost))
+        batch = list(batch)
+        for i, password_hash in zip(pending, hashes):
+            line_number, row = batch[i]
+            batch[i] = (line_number, row[:2] + (password_hash,) + row[3:])
+        return batch
+
+    def import_records(self, kind: str, records) -> dict:
+        """Import (line_number, record) pairs. Returns counts and row errors."""
+        prepare = getattr(self, f"_prepare_{kind}")
+        errors = []
+        batch = []
+        imported = 0
+        for line_number, record in records:
+            try:
+                if "__error__" in record:
+                    raise RowError(record["__error__"])
+                batch.append((line_number, prepare(record)))
+            except RowError as e:
+                errors.append((line_number, str(e)))
+            if len(batch) >= self.chunk_size:
+                imported += self._flush(kind, batch, errors)
+                batch = []
+        if batch:
+            imported += self._flush(kind, batch, errors)
+        # Cached per-user reads may describe rows replaced above
+        self.user_info.db.cache.clear()
+        errors.sort()
+        return {"imported": imported, "rejected": len(errors), "errors": errors}
+
+
+def _integrity_message(error: sqlite3.IntegrityError) -> str:
+    if "users.username" in str(error):
+        return "Username already exists"
+    if "users.email" in str(error):
+        return "Email already exists"
+    return f"Database Error: {error}"
+
+def import_file(path: str, kind: str, db_path: str = "database/health_tracker.db",
+                fmt: Optional[str] = None, chunk_size: int = 5000,
+                hash_cost: int = password_hashing.DEFAULT_COST) -> dict:
+    """Stream a CSV/JSONL file into the database. See BulkImporter."""
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+    importer = BulkImporter(db_path, chunk_size, hash_cost)
+    try:
+        with open(path, newline="", encoding="utf-8") as stream:
+            return importer.import_records(kind, read_records(stream, detect_format(path, fmt)))
+    finally:
+        importer.close()
+
+def export_records(conn: sqlite3.Connection, kind: str, stream: IO[str], fmt: str) -> int:
+    """Write every row of a table to an open stream. Returns the row count."""
+    fields = FIELDS[kind]
+    cursor = conn.execute(EXPORT_QUERIES[kind])
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(stream)
+        writer.writerow(fields)
+        for row in cursor:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in cursor:
+            stream.write(json.dumps(dict(zip(fields, row))) + "\n")
+            count += 1
+    return count
+
+def export_file(path: str, kind: str, db_path: str = "database/health_tracker.db",
+                fmt: Optional[str] = None) -> int:
+    """Stream a table to a CSV/JSONL file ("-" for stdout)."""
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+    user_info = UserInformation(db_path)
+    try:
+        if path == "-":
+            return export_records(user_info.conn, kind, sys.stdout, fmt or "jsonl")
+        with open(path, "w", newline="", encoding="utf-8") as stream:
+            return export_records(user_info.conn, kind, stream, detect_format(path, fmt))
+    finally:
+        user_info.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import/export for Health Tracker.")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"])
+    parser.add_argument("--db", default="database/health_tracker.db")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--hash-cost", type=int, default=password_hashing.DEFAULT_COST,
+                        help="scrypt cost (log2 N) for plaintext passwords")
+    args = parser.parse_args(argv)
+
+    if args.action == "export":
+        count = export_file(args.path, args.kind, args.db, args.format)
+        print(f"Exported {count} {args.kind}.", file=sys.stderr)
+        return 0
+
+    result = import_file(args.path, args.kind, args.db, args.format, args.chunk_size, args.hash_cost)
+    for line_number, message in result["errors"]:
+        print(f"line {line_number}: {message}", file=sys.stderr)
+    print(f"Imported {result['imported']} {args.kind}, rejected {result['rejected']}.", file=sys.stderr)
+    return 0 if not result["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,394 @@
+"""Non-interactive command line interface for Health Tracker.
+
+Every subcommand calls the same classes as the menu in main.py, prints a
+message (or a JSON object with --json) and exits 0 on success, 1 when the
+operation fails and 2 on a usage error. ``login`` prints a session token
+that later commands accept with --session instead of --username, so the
+password is checked once per session rather than once per command.
+Modules are imported inside each command so that, for example, requests
+is only loaded by ``plan``.
+
+    python cli.py signup --username anna --email anna@example.com ...
+    python cli.py --json goal set --username anna --goal lose
+    python cli.py plan --username anna --seed 7
+    python cli.py swap --username anna --day tue --meal dinner
+    TOKEN=$(python cli.py login --username anna --password ... --quiet)
+    python cli.py record set --session "$TOKEN" --weight 60 --height 165
+    python cli.py --metrics plan.prom plan --username anna
+"""
+import argparse
+import getpass
+import json
+import os
+import sys
+from typing import List, Optional
+
+DEFAULT_DB = "database/health_tracker.db"
+
+
+def _emit(args, ok: bool, message: str, **data) -> int:
+    if args.json:
+        print(json.dumps({"ok": ok, "message": message, **data}))
+    else:
+        print(message, file=sys.stdout if ok else sys.stderr)
+    return 0 if ok else 1
+
+def _password(args) -> str:
+    """Take the password from --password, $HEALTH_TRACKER_PASSWORD or a prompt."""
+    if args.password is not None:
+        return args.password
+    if os.environ.get("HEALTH_TRACKER_PASSWORD"):
+        return os.environ["HEALTH_TRACKER_PASSWORD"]
+    return getpass.getpass("Password: ")
+
+
+class _SessionLookupError(Exception):
+    pass
+
+def _user(args):
+    """Return the Session for --session, or the --username string."""
+    if not getattr(args, "session", None):
+        return args.username
+    from sessions import SQLiteSessionStore
+    store = SQLiteSessionStore(args.db)
+    try:
+        session = store.get(args.session)
+    finally:
+        store.close()
+    if session is None:
+        raise _SessionLookupError("Invalid or expired session. Please log in again.")
+    return session
+
+
+def cmd_signup(args) -> int:
+    from user_information import UserInformation
+    ui = UserInformation(args.db)
+    try:
+        ok, message = ui.user_account(args.username, args.email, _password(args), args.first_name,
+                                      args.last_name, args.year_of_birth, args.gender.lower())
+    finally:
+        ui.close()
+    return _emit(args, ok, message, username=args.username)
+
+def cmd_login(args) -> int:
+    from sessions import SQLiteSessionStore
+    from user_information import UserInformation
+    ui = UserInformation(args.db)
+    store = SQLiteSessionStore(args.db, ttl=args.ttl)
+    try:
+        session, message = ui.login_session(args.username, _password(args), store)
+    finally:
+        store.close()
+        ui.close()
+    if session and args.quiet:
+        print(session.token)
+        return 0
+    token = session.token if session else None
+    return _emit(args, session is not None, message, username=args.username, session=token)
+
+def cmd_logout(args) -> int:
+    from sessions import SQLiteSessionStore
+    store = SQLiteSessionStore(args.db)
+    try:
+        store.revoke(args.session)
+    finally:
+        store.close()
+    return _emit(args, True, "Logged out.")
+
+def cmd_record_set(args) -> int:
+    from personal_record import PersonalRecord
+    record = PersonalRecord(args.db)
+    try:
+        user = _user(args)
+        ok, message = record.add_or_update_measurements(user, args.weight, args.height / 100)
+        data = record.get_health_data(user) if ok else None
+    finally:
+        record.close()
+    return _emit(args, ok, message, health_data=data)
+
+def cmd_workout_set(args) -> int:
+    from user_information import UserInformation
+    ui = UserInformation(args.db)
+    try:
+        user = _user(args)
+        ok, message = ui.update_workout_status(user, args.days, args.hours)
+        data = ui.get_workout_status(user) if ok else None
+    finally:
+        ui.close()
+    return _emit(args, ok, message, workout_status=data)
+
+def cmd_goal_set(args) -> int:
+    from goals import Goals
+    g = Goals(args.db)
+    try:
+        user = _user(args)
+        ok, message = g.set_calorie_goal(user, args.goal)
+        data = g.get_goals(user) if ok else None
+    finally:
+        g.close()
+    return _emit(args, ok, message, goals=data)
+
+def cmd_diet_set(args) -> int:
+    from preferences import DietaryPreferences
+    p = DietaryPreferences(args.db)
+    try:
+        user = _user(args)
+        ok, message = p.set_preferences(user, args.allow, args.exclude_category, args.exclude_ingredient)
+        data = p.get_preferences(user) if ok else None
+    finally:
+        p.close()
+    return _emit(args, ok, message, preferences=data)
+
+def cmd_plan(args) -> int:
+    from goals import Goals
+    user = _user(args)
+    g = Goals(args.db)
+    try:
+        goal = g.get_goals(user)
+    finally:
+        g.close()
+    if not goal:
+        return _emit(args, False, "No calorie goal found for this user. Please set up your goal first.")
+
+    import diet_plan
+    from meal_planner import MealPlanError
+    diet_plan.get_catalog(args.db)
+    if args.offline:
+        diet_plan.set_offline_mode(True)
+    from meal_plans import MealPlanStore
+    calorie_goal = int(goal["calorie intake"])
+    store = MealPlanStore(args.db)
+    try:
+        if args.seed is None:
+            plan = diet_plan.current_plan(user, calorie_goal, store)
+        else:
+            plan = diet_plan.plan_week(calorie_goal, seed=args.seed,
+                                       preferences=diet_plan.get_preferences(user, args.db))
+    except MealPlanError as e:
+        return _emit(args, False, f"Failed to generate meal plan: {e}")
+    finally:
+        store.close()
+    if args.json:
+        return _emit(args, True, "Meal plan generated.", plan=plan)
+    diet_plan.display_meal_plan(diet_plan.plan_to_weekly_meals(plan), calorie_goal)
+    return 0
+
+def cmd_swap(args) -> int:
+    import diet_plan
+    try:
+        day = diet_plan.parse_day(args.day)
+        slot = diet_plan.parse_meal_time(args.meal) if args.meal else None
+    except ValueError as e:
+        return _emit(args, False, str(e))
+    user = _user(args)
+    from goals import Goals
+    g = Goals(args.db)
+    try:
+        goal = g.get_goals(user)
+    finally:
+        g.close()
+    if not goal:
+        return _emit(args, False, "No calorie goal found for this user. Please set up your goal first.")
+
+    from meal_planner import MealPlanError
+    from meal_plans import MealPlanStore
+    diet_plan.get_catalog(args.db)
+    if args.offline:
+        diet_plan.set_offline_mode(True)
+    calorie_goal = int(goal["calorie intake"])
+    store = MealPlanStore(args.db)
+    try:
+        plan = diet_plan.swap_meals(user, calorie_goal, day, slot, store)
+    except MealPlanError as e:
+        return _emit(args, False, f"Failed to update meal plan: {e}")
+    finally:
+        store.close()
+    if args.json:
+        return _emit(args, True, "Meal plan updated.", plan=plan)
+    diet_plan.display_meal_plan(diet_plan.plan_to_weekly_meals(plan), calorie_goal)
+    return 0
+
+def cmd_import(args) -> int:
+    import bulk_io
+    import password_hashing
+    hash_cost = password_hashing.DEFAULT_COST if args.hash_cost is None else args.hash_cost
+    result = bulk_io.import_file(args.path, args.kind, args.db, args.format, args.chunk_size, hash_cost)
+    if not args.json:
+        for line_number, message in result["errors"]:
+            print(f"line {line_number}: {message}", file=sys.stderr)
+    message = f"Imported {result['imported']} {args.kind}, rejected {result['rejected']}."
+    return _emit(args, not result["errors"], message, **result)
+
+def cmd_export(args) -> int:
+    import bulk_io
+    count = bulk_io.export_file(args.path, args.kind, args.db, args.format)
+    if args.path == "-":
+        return 0
+    return _emit(args, True, f"Exported {count} {args.kind}.", count=count)
+
+def cmd_recompute(args) -> int:
+    from recompute import recompute_all_goals, recompute_stale_goals
+    recompute = recompute_stale_goals if args.stale else recompute_all_goals
+    result = recompute(args.db, args.year)
+    message = (f"Recomputed {result['updated']} of {result['users']} calorie goals "
+               f"({result['users_per_second']:,.0f} users/s).")
+    return _emit(args, True, message, **result)
+
+def cmd_plan_all(args) -> int:
+    from batch_plans import generate_all_plans
+    result = generate_all_plans(args.db, args.week, args.processes, args.chunk_size, offline=args.offline)
+    if not args.json:
+        for username, message in result["failures"]:
+            print(f"{username}: {message}", file=sys.stderr)
+    message = (f"Planned {result['planned']} of {result['users']} users for the week of {result['week']} "
+               f"({result['users_per_second']:,.0f} users/s).")
+    return _emit(args, not result["failures"], message, **result)
+
+def cmd_serve(args) -> int:
+    import asyncio
+    from service import TrackerService
+    service = TrackerService(args.db, args.host, args.port, args.max_in_flight, args.timeout,
+                             offline=args.offline, db_workers=args.db_workers, group_commit=args.group_commit,
+                             instrument=args.serve_metrics)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _add_user_arguments(parser: argparse.ArgumentParser):
+    user = parser.add_mutually_exclusive_group(required=True)
+    user.add_argument("--username")
+    user.add_argument("--session", help="token printed by 'login'")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="health-tracker", description="Health Tracker command line.")
+    parser.add_argument("--db", default=DEFAULT_DB, help="database path (default: %(default)s)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="record timings and SQL/HTTP counts and write them to FILE (.json for JSON)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    signup = commands.add_parser("signup", help="create a user account")
+    signup.add_argument("--username", required=True)
+    signup.add_argument("--email", required=True)
+    signup.add_argument("--password")
+    signup.add_argument("--first-name", required=True)
+    signup.add_argument("--last-name", required=True)
+    signup.add_argument("--year-of-birth", type=int, required=True)
+    signup.add_argument("--gender", required=True, choices=["male", "female"], type=str.lower)
+    signup.set_defaults(handler=cmd_signup)
+
+    login = commands.add_parser("login", help="check a username and password")
+    login.add_argument("--username", required=True)
+    login.add_argument("--password")
+    login.add_argument("--ttl", type=float, default=12 * 60 * 60, help="session lifetime in seconds")
+    login.add_argument("--quiet", action="store_true", help="print only the session token")
+    login.set_defaults(handler=cmd_login)
+
+    logout = commands.add_parser("logout", help="end a session")
+    logout.add_argument("--session", required=True)
+    logout.set_defaults(handler=cmd_logout)
+
+    record = commands.add_parser("record", help="health measurements").add_subparsers(dest="action", required=True)
+    record_set = record.add_parser("set", help="record weight and height")
+    _add_user_arguments(record_set)
+    record_set.add_argument("--weight", type=float, required=True, help="kg")
+    record_set.add_argument("--height", type=float, required=True, help="cm")
+    record_set.set_defaults(handler=cmd_record_set)
+
+    workout = commands.add_parser("workout", help="workout status").add_subparsers(dest="action", required=True)
+    workout_set = workout.add_parser("set", help="record workout frequency")
+    _add_user_arguments(workout_set)
+    workout_set.add_argument("--days", type=int, required=True, help="workout days per week (0-7)")
+    workout_set.add_argument("--hours", type=float, required=True, help="average hours per day")
+    workout_set.set_defaults(handler=cmd_workout_set)
+
+    goal = commands.add_parser("goal", help="calorie goals").add_subparsers(dest="action", required=True)
+    goal_set = goal.add_parser("set", help="set a weight goal and compute the calorie target")
+    _add_user_arguments(goal_set)
+    goal_set.add_argument("--goal", required=True, choices=["maintain", "lose", "gain"], type=str.lower)
+    goal_set.set_defaults(handler=cmd_goal_set)
+
+    diet = commands.add_parser("diet", help="dietary preferences").add_subparsers(dest="action", required=True)
+    diet_set = diet.add_parser("set", help="choose the meal categories and ingredients plans may use")
+    _add_user_arguments(diet_set)
+    diet_set.add_argument("--allow", nargs="+", default=[], metavar="CATEGORY",
+                          help="only plan from these categories (default: all)")
+    diet_set.add_argument("--exclude-category", nargs="+", default=[], metavar="CATEGORY")
+    diet_set.add_argument("--exclude-ingredient", nargs="+", default=[], metavar="INGREDIENT",
+                          help="e.g. peanut; also excludes peanut butter")
+    diet_set.set_defaults(handler=cmd_diet_set)
+
+    plan = commands.add_parser("plan", help="show this week's 7-day meal plan, generating it if needed")
+    _add_user_arguments(plan)
+    plan.add_argument("--seed", type=int, help="build a plan from this seed instead (not stored)")
+    plan.add_argument("--offline", action="store_true", help="use cached meals only")
+    plan.set_defaults(handler=cmd_plan)
+
+    swap = commands.add_parser("swap", help="replace one meal, or a whole day, of this week's plan")
+    _add_user_arguments(swap)
+    swap.add_argument("--day", required=True, help="e.g. Tuesday or tue")
+    swap.add_argument("--meal", help="breakfast, lunch or dinner (default: the whole day)")
+    swap.add_argument("--offline", action="store_true", help="use cached meals only")
+    swap.set_defaults(handler=cmd_swap)
+
+    import_ = commands.add_parser("import", help="bulk import a CSV/JSONL file")
+    import_.add_argument("kind", choices=["users", "measurements", "workouts"])
+    import_.add_argument("path")
+    import_.add_argument("--format", choices=["csv", "jsonl"])
+    import_.add_argument("--chunk-size", type=int, default=5000)
+    import_.add_argument("--hash-cost", type=int,
+                         help="scrypt cost (log2 N) for plaintext passwords (default 14)")
+    import_.set_defaults(handler=cmd_import)
+
+    export = commands.add_parser("export", help="bulk export to a CSV/JSONL file ('-' for stdout)")
+    export.add_argument("kind", choices=["users", "measurements", "workouts"])
+    export.add_argument("path")
+    export.add_argument("--format", choices=["csv", "jsonl"])
+    export.set_defaults(handler=cmd_export)
+
+    recompute = commands.add_parser("recompute", help="recompute every user's calorie target")
+    recompute.add_argument("--year", type=int, help="year to compute ages for (default: this year)")
+    recompute.add_argument("--stale", action="store_true", help="only goals whose inputs changed")
+    recompute.set_defaults(handler=cmd_recompute)
+
+    plan_all = commands.add_parser("plan-all", help="generate and store this week's meal plan for every user")
+    plan_all.add_argument("--week", help="any date in the week to plan, YYYY-MM-DD (default: this week)")
+    plan_all.add_argument("--processes", type=int, help="worker processes (default: one per CPU)")
+    plan_all.add_argument("--chunk-size", type=int, default=1000, help="users per worker task")
+    plan_all.add_argument("--offline", action="store_true", help="use cached meals only")
+    plan_all.set_defaults(handler=cmd_plan_all)
+
+    serve = commands.add_parser("serve", help="run the HTTP/JSON service (see service.py)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--max-in-flight", type=int, default=64, help="requests handled at once before 503")
+    serve.add_argument("--timeout", type=float, default=10.0, help="per-request timeout in seconds")
+    serve.add_argument("--offline", action="store_true", help="use cached meals only")
+    serve.add_argument("--db-workers", type=int, default=4, help="threads running database calls")
+    serve.add_argument("--group-commit", action="store_true", help="batch concurrent writes into shared commits")
+    serve.add_argument("--metrics", dest="serve_metrics", action="store_true",
+                       help="collect metrics and serve them at /metrics")
+    serve.set_defaults(handler=cmd_serve)
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    import metrics
+    if args.metrics:
+        metrics.enable()
+    else:
+        metrics.configure_from_env()
+    try:
+        return args.handler(args)
+    except _SessionLookupError as e:
+        return _emit(args, False, str(e))
+    finally:
+        if args.metrics:
+            metrics.write(args.metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
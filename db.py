@@ -0,0 +1,251 @@
+import os
+import sqlite3
+import threading
+import time
+import weakref
+import metrics
+from typing import Callable, Dict, Optional
+from group_commit import (BUSY_TIMEOUT, DEFAULT_MAX_BATCH, DEFAULT_WINDOW, WRITE_RETRIES,
+                          GroupCommitter, apply_pragmas, is_busy)
+from migrations import migrate
+from read_cache import ReadCache
+
+database = "database/health_tracker.db"
+
+
+class _ThreadConnection:
+    """One thread's connection and cursor, kept in its thread-local storage
+    so that it is dropped (and the connection closed) when the thread ends."""
+    __slots__ = ("conn", "cursor", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.cursor = conn.cursor()
+
+class Database:
+    """Connections to one database file, shared by every repository class
+    that opens the same path.
+
+    Each thread gets its own sqlite3 connection, created on first use, so
+    repository objects can be shared between threads; it is closed when
+    the thread exits, or with the database. File databases use
+    WAL journaling, which lets readers run alongside a writer (including
+    in other processes), and every connection waits up to BUSY_TIMEOUT
+    seconds for a lock instead of failing with "database is locked".
+    An in-memory database has a single connection shared by all threads.
+
+    Pending schema migrations are applied once when the database is
+    opened, not on every object construction. Use open_database() rather
+    than building this directly so that the connections are shared.
+
+    ``cache`` is the read-through cache for per-user lookups on this
+    database; it lives exactly as long as the connections. ``writer`` is
+    the GroupCommitter while group commit is enabled, otherwise None.
+    """
+
+    def __init__(self, path: str, journal_mode: Optional[str] = "wal", synchronous: Optional[str] = None):
+        self.path = path
+        self.memory = path == ":memory:"
+        directory = os.path.dirname(path)
+        if directory and not self.memory:
+            os.makedirs(directory, exist_ok=True)
+        self.references = 0
+        self.cache = ReadCache()
+        self.writer: Optional[GroupCommitter] = None
+        self.journal_mode = None if self.memory else journal_mode
+        self.synchronous = synchronous
+        self.closed = False
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        migrate(self.connection())
+
+    def _connect(self) -> sqlite3.Connection:
+        # Only the owning thread uses a connection; close() may run elsewhere
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, check_same_thread=False,
+                               factory=metrics.connection_factory())
+        apply_pragmas(conn, self.journal_mode, self.synchronous)
+        return conn
+
+    def connection(self) -> Optional[sqlite3.Connection]:
+        """This thread's connection, or None once the database is closed."""
+        if self.closed:
+            return None
+        local = getattr(self._local, "connection", None)
+        if local is None:
+            with self._connections_lock:
+                if self.memory and self._connections:
+                    conn = self._connections[0]
+                else:
+                    conn = self._connect()
+                    self._connections.append(conn)
+            local = self._local.connection = _ThreadConnection(conn)
+            if not self.memory:
+                weakref.finalize(local, self._thread_exited, conn)
+        return local.conn
+
+    def _thread_exited(self, conn: sqlite3.Connection):
+        with self._connections_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+                conn.close()
+
+    def cursor(self) -> Optional[sqlite3.Cursor]:
+        """A cursor on this thread's connection, reused across calls."""
+        if self.connection() is None:
+            return None
+        return self._local.connection.cursor
+
+    @property
+    def conn(self) -> Optional[sqlite3.Connection]:
+        return self.connection()
+
+    def configure(self, journal_mode: Optional[str] = None, synchronous: Optional[str] = None):
+        """Set the journal mode ("wal", "delete", ...) and synchronous level
+        ("off", "normal", "full", "extra") on every connection, including
+        ones opened later and the batch writer's."""
+        self.journal_mode = journal_mode or self.journal_mode
+        self.synchronous = synchronous or self.synchronous
+        # journal_mode is stored in the file, so one connection sets it for all
+        apply_pragmas(self.connection(), journal_mode)
+        with self._connections_lock:
+            for conn in self._connections:
+                apply_pragmas(conn, synchronous=synchronous)
+
+    def enable_group_commit(self, window: float = DEFAULT_WINDOW, max_batch: int = DEFAULT_MAX_BATCH):
+        """Route write methods through a GroupCommitter until disabled."""
+        if self.writer is None and not self.memory:
+            self.writer = GroupCommitter(self.path, window, max_batch, self.journal_mode, self.synchronous)
+
+    def disable_group_commit(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def close(self):
+        self.disable_group_commit()
+        if not self.closed:
+            self.closed = True
+            with self._connections_lock:
+                for conn in self._connections:
+                    conn.close()
+                self._connections = []
+            self.cache.clear()
+
+
+_databases: Dict[str, Database] = {}
+_lock = threading.Lock()
+
+def open_database(path: str = "database/health_tracker.db") -> Database:
+    """Return the shared Database for a path, opening it on first use.
+
+    Every call must be paired with release_database().
+    """
+    with _lock:
+        db = _databases.get(path)
+        if db is None:
+            db = Database(path)
+            _databases[path] = db
+        db.references += 1
+        return db
+
+def release_database(db: Database):
+    """Drop one reference; the connection closes when the last user is gone."""
+    with _lock:
+        db.references -= 1
+        if db.references <= 0:
+            if _databases.get(db.path) is db:
+                del _databases[db.path]
+            db.close()
+
+
+def execute_write(conn: sqlite3.Connection, writer: Optional[GroupCommitter], write: Callable, *args):
+    """Run write(cursor, *args) in a transaction and return its result.
+
+    With a writer the write joins the next group commit and this returns
+    once that batch has committed; otherwise it commits on conn directly.
+    Either way an exception from write means nothing was stored.
+
+    Direct writes take the write lock up front (BEGIN IMMEDIATE), so two
+    connections can't deadlock upgrading read locks, and are retried with
+    backoff if the database is still busy after the connection's timeout.
+    """
+    if writer is not None:
+        return writer.submit(write, *args).result()
+    for attempt in range(WRITE_RETRIES + 1):
+        try:
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute("BEGIN IMMEDIATE")
+            result = write(conn.cursor(), *args)
+            conn.commit()
+            return result
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if not is_busy(e) or attempt == WRITE_RETRIES:
+                raise
+            time.sleep(0.05 * (2 ** attempt))
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+
+
+class Repository:
+    """Shared plumbing for classes that keep a Database in ``self.db``.
+
+    ``conn`` and ``cursor`` are the calling thread's connection and cursor,
+    so one object can be used from several threads. Assigning either one
+    pins the object to that connection instead (as some tests do); the read
+    cache and the batch writer describe the shared database, so both are
+    then bypassed. Both are None once the object is closed.
+    """
+
+    db = None
+    _conn = None
+    _cursor = None
+    _released = False
+
+    @property
+    def conn(self) -> Optional[sqlite3.Connection]:
+        if self._conn is not None or self.db is None or self._released:
+            return self._conn
+        return self.db.connection()
+
+    @conn.setter
+    def conn(self, value: Optional[sqlite3.Connection]):
+        self._conn = value
+        self._cursor = None
+
+    @property
+    def cursor(self) -> Optional[sqlite3.Cursor]:
+        if self._conn is not None:
+            if self._cursor is None:
+                self._cursor = self._conn.cursor()
+            return self._cursor
+        if self.db is None or self._released:
+            return None
+        return self.db.cursor()
+
+    @cursor.setter
+    def cursor(self, value: Optional[sqlite3.Cursor]):
+        self._cursor = value
+
+    def _shared(self) -> bool:
+        return self.db is not None and self._conn is None and not self._released
+
+    def _cache(self) -> Optional[ReadCache]:
+        return self.db.cache if self._shared() else None
+
+    def _write(self, write: Callable, *args):
+        """Run a write function through execute_write on this object's connection."""
+        return execute_write(self.conn, self.db.writer if self._shared() else None, write, *args)
+
+    def _release(self):
+        """Drop this object's reference to the shared database."""
+        if self.db is not None and not self._released:
+            release_database(self.db)
+            self._released = True
+            self._conn = None
+            self._cursor = None
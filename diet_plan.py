@@ -1,77 +1,247 @@
-import requests
-import sys
-import random
+import os
+from typing import Optional
 from goals import Goals
+from meal_catalog import MealCatalog
+from meal_planner import CATEGORIES, DAYS, DEFAULT_TOLERANCE, MEAL_TIMES, CandidateIndex, MealPlanner
+from meal_plans import MealPlanStore, plan_seed, week_start
+from metrics import timed
+from nutrition import meal_calories, meal_ingredients
+from preferences import DietaryPreferences
+from sessions import UserRef, username_of
 
-CATEGORIES = ['Beef', 'Chicken', 'Seafood', 'Vegetarian', 'Vegan', 'Pasta']
+_catalog = None
+# (listing ids, CandidateIndex, calories) for the catalog snapshot last indexed
+_candidates = None
 
-def get_calorie_goal_from_user(username: str) -> int:
-    goals = Goals()
+def get_catalog(db_path: Optional[str] = None) -> MealCatalog:
+    """Return the shared meal catalog, creating it on first use.
+
+    Pass ``db_path`` to keep the catalog in that database, replacing a
+    catalog opened on another one. Set HEALTH_TRACKER_OFFLINE=1 to serve
+    only cached meals.
+    """
+    global _catalog
+    if _catalog is not None and db_path is not None and _catalog.database != db_path:
+        _catalog.close()
+        _catalog = None
+    if _catalog is None:
+        offline = os.environ.get("HEALTH_TRACKER_OFFLINE", "") not in ("", "0")
+        _catalog = MealCatalog(db_path or "database/health_tracker.db", offline=offline)
+    return _catalog
+
+def set_offline_mode(enabled: bool):
+    """Switch the shared catalog between online and cache-only mode."""
+    get_catalog().offline = enabled
+
+@timed()
+def get_calorie_goal_from_user(username: UserRef, goals: Optional[Goals] = None) -> int:
+    """Look up the user's calorie goal, reusing ``goals`` when given.
+    Raises ValueError when the user hasn't set one."""
+    username = username_of(username)
+    own_goals = goals is None
+    if own_goals:
+        goals = Goals()
     try:
-        goals.cursor.execute("SELECT calorie_intake FROM user_goals WHERE username = ?", (username,))
-        result = goals.cursor.fetchone()
+        result = goals.get_goals(username)
         if result:
-            calorie_intake = int(result[0])
+            calorie_intake = int(result["calorie intake"])
             print(f"Calorie goal for {username}: {calorie_intake} kcal/day")
             return calorie_intake
-        else:
-            print("No calorie goal found for this user. Please set up your goal first.")
-            sys.exit(1)
+        raise ValueError("No calorie goal found for this user. Please set up your goal first.")
     finally:
-        goals.close()
+        if own_goals:
+            goals.close()
 
+@timed()
 def fetch_meals_by_category(category: str):
-    url = f"https://www.themealdb.com/api/json/v1/1/filter.php?c={category}"
+    return get_catalog().get_category(category)
+
+def get_preferences(username: UserRef, db_path: str = "database/health_tracker.db") -> Optional[dict]:
+    preferences = DietaryPreferences(db_path)
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        return data.get('meals', [])
-    except requests.RequestException as e:
-        print(f"Failed to fetch meals from {category}: {e}")
-        return []
-
-def get_random_meal(exclude_ids):
-    attempts = 0
-    while attempts < 10:
-        category = random.choice(CATEGORIES)
-        meals = fetch_meals_by_category(category)
-        if meals:
-            random.shuffle(meals)
-            for meal in meals:
-                if meal['idMeal'] not in exclude_ids:
-                    return category, meal['strMeal'], meal['strMealThumb'], meal['idMeal']
-        attempts += 1
+        return preferences.get_preferences(username)
+    finally:
+        preferences.close()
+
+def listing_ids(meals_by_category: dict) -> tuple:
+    """The meal ids of every category's listing, identifying a catalog snapshot."""
+    return tuple(tuple(meal["idMeal"] for meal in meals_by_category.get(category) or ())
+                 for category in CATEGORIES)
+
+def cached_candidates(meals_by_category: dict) -> Optional[tuple]:
+    """(CandidateIndex, calories) when these listings were the last indexed, else None."""
+    cached = _candidates
+    if cached is not None and cached[0] == listing_ids(meals_by_category):
+        return cached[1], cached[2]
     return None
 
-def get_weekly_meal_plan():
-    weekly_plan = []
-    used_ids = set()
-    for _ in range(7):  # for each day
-        day_meals = []
-        for _ in range(3):  # breakfast, lunch, dinner
-            meal = get_random_meal(used_ids)
-            if meal:
-                category, name, image, meal_id = meal
-                used_ids.add(meal_id)
-                day_meals.append((category, name, image))
-        weekly_plan.append(day_meals)
-    return weekly_plan
+def index_candidates(meals_by_category: dict, details: dict) -> tuple:
+    """Index a catalog snapshot and estimate its meals' calories, keeping
+    both for cached_candidates. Returns (CandidateIndex, calories)."""
+    global _candidates
+    ids = listing_ids(meals_by_category)
+    index = CandidateIndex(MealPlanner(meals_by_category, CATEGORIES), meal_ingredients(details))
+    calories = meal_calories(details)
+    _candidates = (ids, index, calories)
+    return index, calories
+
+def plan_from(candidates: tuple, calorie_goal: Optional[float], seed: Optional[int] = None,
+              tolerance: float = DEFAULT_TOLERANCE, preferences: Optional[dict] = None) -> dict:
+    """Plan a week from index_candidates' (CandidateIndex, calories).
+
+    With a goal, each day's meals are chosen to add up to it (see
+    MealPlanner.optimize); without one they are drawn at random. Only
+    meals the user's dietary ``preferences`` allow are used.
+    """
+    index, calories = candidates
+    planner = index.planner_for(preferences)
+    if calorie_goal is None:
+        return planner.plan(None, seed)
+    return planner.optimize(calorie_goal, calories, tolerance, seed)
+
+def build_plan(meals_by_category: dict, details: Optional[dict], calorie_goal: Optional[float],
+               seed: Optional[int] = None, tolerance: float = DEFAULT_TOLERANCE,
+               preferences: Optional[dict] = None) -> dict:
+    """Plan a week from category listings and, for a calorie goal, meal
+    details; see plan_from. The listings are indexed once per catalog
+    snapshot, so while they stay the same ``details`` isn't read again."""
+    candidates = cached_candidates(meals_by_category)
+    if candidates is None:
+        if details is None:
+            # Nothing to estimate calories from, so nothing worth keeping
+            candidates = CandidateIndex(MealPlanner(meals_by_category, CATEGORIES)), {}
+        else:
+            candidates = index_candidates(meals_by_category, details)
+    return plan_from(candidates, calorie_goal, seed, tolerance, preferences)
+
+def load_candidates(preferences: Optional[dict] = None) -> tuple:
+    """Return (planner, calories) for the catalog's current listings,
+    restricted to the meals ``preferences`` allow.
+
+    The candidate index and calories are kept while the catalog serves the
+    same listings (see cached_candidates), so planning again, or swapping a
+    meal, reads no meal details and makes no requests.
+    """
+    catalog = get_catalog()
+    meals = catalog.prefetch(CATEGORIES)
+    candidates = cached_candidates(meals)
+    if candidates is None:
+        details = catalog.get_details(meal["idMeal"] for listing in meals.values() for meal in listing)
+        candidates = index_candidates(meals, details)
+    index, calories = candidates
+    return index.planner_for(preferences), calories
+
+@timed()
+def plan_week(calorie_goal: Optional[int], seed: Optional[int] = None,
+              tolerance: float = DEFAULT_TOLERANCE, preferences: Optional[dict] = None) -> dict:
+    """Return a 7-day plan with three distinct meals per day.
+
+    With a calorie goal every day lands within ``tolerance`` of it where
+    the catalog allows; the meals' details are fetched (concurrently, and
+    only once) to estimate their calories. Passing the same seed again
+    reproduces the plan as long as the cached catalog hasn't changed.
+    Only meals the dietary ``preferences`` allow are used. Raises
+    MealPlanError if too few meals are left.
+    """
+    if calorie_goal is None and not preferences:
+        return build_plan(get_catalog().prefetch(CATEGORIES), None, None, seed)
+    planner, calories = load_candidates(preferences)
+    if calorie_goal is None:
+        return planner.plan(None, seed)
+    return planner.optimize(calorie_goal, calories, tolerance, seed)
+
+@timed()
+def current_plan(username: UserRef, calorie_goal: int, store: Optional[MealPlanStore] = None) -> dict:
+    """Return the user's plan for this week, from the database when one is
+    stored for ``calorie_goal``; otherwise plan the week, within the user's
+    dietary preferences, and store it."""
+    username = username_of(username)
+    own_store = store is None
+    if own_store:
+        store = MealPlanStore()
+    try:
+        week = week_start()
+        plan = store.get_plan(username, week)
+        if plan is None or plan["calorie_goal"] != calorie_goal:
+            preferences = get_preferences(username, store.database)
+            plan = plan_week(calorie_goal, plan_seed(username, week), preferences=preferences)
+            store.save_plan(username, plan, week)
+            plan["week"] = week
+        return plan
+    finally:
+        if own_store:
+            store.close()
+
+@timed()
+def swap_meals(username: UserRef, calorie_goal: int, day: int, slot: Optional[int] = None,
+               store: Optional[MealPlanStore] = None, seed: Optional[int] = None) -> dict:
+    """Redraw one meal (``slot``) or a whole day of the user's plan for this
+    week, keeping the rest, and store the result (see MealPlanner.replace)."""
+    username = username_of(username)
+    own_store = store is None
+    if own_store:
+        store = MealPlanStore()
+    try:
+        plan = current_plan(username, calorie_goal, store)
+        planner, calories = load_candidates(get_preferences(username, store.database))
+        plan = planner.replace(plan, day, slot, calories, seed)
+        store.save_plan(username, plan, plan["week"])
+        return plan
+    finally:
+        if own_store:
+            store.close()
+
+def parse_day(text: str) -> int:
+    """Index into DAYS for a day name, or at least its first three letters; raises ValueError."""
+    text = text.strip().lower()
+    for i, day in enumerate(DAYS):
+        if len(text) >= 3 and day.lower().startswith(text):
+            return i
+    raise ValueError(f"Unknown day: {text!r}. Choose from {', '.join(DAYS)}.")
+
+def parse_meal_time(text: str) -> int:
+    """Index into MEAL_TIMES for a meal name; raises ValueError."""
+    names = [time.lower() for time in MEAL_TIMES]
+    if text.strip().lower() not in names:
+        raise ValueError(f"Unknown meal: {text!r}. Choose from {', '.join(MEAL_TIMES)}.")
+    return names.index(text.strip().lower())
+
+def plan_to_weekly_meals(plan: dict):
+    """Convert a plan_week result to the (category, name, image, calories)
+    lists display_meal_plan takes; calories is None for a random plan."""
+    return [[(meal["category"], meal["name"], meal["image"], meal.get("calories")) for meal in day["meals"]]
+            for day in plan["days"]]
+
+def get_weekly_meal_plan(calorie_goal: Optional[int] = None):
+    return plan_to_weekly_meals(plan_week(calorie_goal))
 
 def display_meal_plan(weekly_plan, calorie_goal):
     print(f"\nHere is your 7-day meal plan based on a daily goal of {calorie_goal} kcal:\n")
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    meal_times = ["Breakfast", "Lunch", "Dinner"]
-
-    for day_name, meals in zip(days, weekly_plan):
+    for day_name, meals in zip(DAYS, weekly_plan):
         print(f"{day_name}:")
-        for time, (category, name, image) in zip(meal_times, meals):
-            print(f"  {time}: {name} (Category: {category})")
+        for time, meal in zip(MEAL_TIMES, meals):
+            category, name, image = meal[:3]
+            calories = meal[3] if len(meal) > 3 else None
+            estimate = f", about {calories} kcal" if calories else ""
+            print(f"  {time}: {name} (Category: {category}{estimate})")
             print(f"    Image: {image}")
+        if all(len(meal) > 3 and meal[3] for meal in meals):
+            print(f"  Total: about {sum(meal[3] for meal in meals)} kcal")
         print("-" * 60)
 
-def generate_and_display_meal_plan(username: str):
-    calorie_goal = get_calorie_goal_from_user(username)
-    weekly_meals = get_weekly_meal_plan()
+@timed()
+def generate_and_display_meal_plan(username: UserRef, goals: Optional[Goals] = None):
+    username = username_of(username)
+    calorie_goal = get_calorie_goal_from_user(username, goals)
+    weekly_meals = plan_to_weekly_meals(current_plan(username, calorie_goal))
     display_meal_plan(weekly_meals, calorie_goal)
 
+@timed()
+def swap_and_display_meal_plan(username: UserRef, day: str, meal: str = "", goals: Optional[Goals] = None):
+    """Swap one meal, or the whole day when ``meal`` is blank, and show the week."""
+    username = username_of(username)
+    day_index = parse_day(day)
+    slot = parse_meal_time(meal) if meal.strip() else None
+    calorie_goal = get_calorie_goal_from_user(username, goals)
+    plan = swap_meals(username, calorie_goal, day_index, slot)
+    display_meal_plan(plan_to_weekly_meals(plan), calorie_goal)
@@ -0,0 +1,136 @@
+"""A local stand-in for TheMealDB, used by the tests and benchmarks."""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+def make_catalog(categories: List[str], meals_per_category: int = 20) -> Dict[str, List[dict]]:
+    """Build a synthetic catalog with unique meal ids across categories."""
+    catalog = {}
+    next_id = 50000
+    for category in categories:
+        meals = []
+        for i in range(meals_per_category):
+            meals.append({
+                "idMeal": str(next_id),
+                "strMeal": f"{category} Dish {i + 1}",
+                "strMealThumb": f"https://example.invalid/{next_id}.jpg",
+            })
+            next_id += 1
+        catalog[category] = meals
+    return catalog
+
+
+# (ingredient, measures) for synthetic recipes; the measures span light and heavy portions
+RECIPE_INGREDIENTS = [
+    ("Chicken Breast", ["1", "2", "4"]), ("Minced Beef", ["250g", "500g", "750g"]),
+    ("Salmon", ["2", "4"]), ("Basmati Rice", ["100g", "1 cup", "300g"]),
+    ("Spaghetti", ["200g", "400g", "500g"]), ("Potatoes", ["2", "500g", "1kg"]),
+    ("Olive Oil", ["1 tbsp", "2 tbsp", "4 tbsp"]), ("Butter", ["25g", "50g", "100g"]),
+    ("Cheddar Cheese", ["50g", "100g", "200g"]), ("Double Cream", ["100ml", "200ml"]),
+    ("Onion", ["1", "2"]), ("Garlic", ["2 cloves", "4 cloves"]), ("Chopped Tomatoes", ["400g", "800g"]),
+    ("Spinach", ["100g", "200g"]), ("Carrots", ["2", "3"]), ("Chickpeas", ["400g"]),
+    ("Coconut Milk", ["200ml", "400ml"]), ("Eggs", ["2", "4", "6"]), ("Salt", ["pinch"]),
+]
+
+
+def make_details(catalog: Dict[str, List[dict]]) -> Dict[str, dict]:
+    """Build ``lookup.php`` records, with ingredients, for every meal in a catalog.
+
+    Each meal's recipe is derived from its id, so the same catalog always
+    yields the same details.
+    """
+    details = {}
+    for category, meals in catalog.items():
+        for meal in meals:
+            rng = random.Random(int(meal["idMeal"]))
+            record = dict(meal, strCategory=category)
+            for i, (name, measures) in enumerate(rng.sample(RECIPE_INGREDIENTS, rng.randint(3, 8)), 1):
+                record[f"strIngredient{i}"] = name
+                record[f"strMeasure{i}"] = rng.choice(measures)
+            details[meal["idMeal"]] = record
+    return details
+
+
+class FakeMealAPI:
+    """Serve ``filter.php?c=<category>`` and ``lookup.php?i=<id>`` from an
+    in-memory catalog; meal details default to make_details(catalog).
+
+    Every request is counted in ``request_count``, and per endpoint in
+    ``requests_by_path``, so callers can check how many round-trips their
+    code made. ``delay`` adds latency to each response
+    and ``fail_next`` makes that many upcoming requests return HTTP 500.
+    """
+
+    def __init__(self, catalog: Dict[str, List[dict]], delay: float = 0.0,
+                 details: Optional[Dict[str, dict]] = None):
+        self.catalog = catalog
+        self.details = details if details is not None else make_details(catalog)
+        self.delay = delay
+        self.request_count = 0
+        self.requests_by_path = {}
+        self.fail_next = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _make_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = urlparse(self.path).path
+                endpoint = path[path.rfind("/"):]
+                with api._lock:
+                    api.request_count += 1
+                    api.requests_by_path[endpoint] = api.requests_by_path.get(endpoint, 0) + 1
+                    fail = api.fail_next > 0
+                    if fail:
+                        api.fail_next -= 1
+                if api.delay:
+                    time.sleep(api.delay)
+                if fail:
+                    self._send(500, {"error": "unavailable"})
+                    return
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path.endswith("/filter.php"):
+                    meals = api.catalog.get(query.get("c", [""])[0])
+                    self._send(200, {"meals": meals})
+                elif url.path.endswith("/lookup.php"):
+                    meal = api.details.get(query.get("i", [""])[0])
+                    self._send(200, {"meals": [meal] if meal else None})
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeMealAPI":
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
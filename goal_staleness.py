@@ -0,0 +1,38 @@
+"""Tracking which stored calorie targets are out of date.
+
+user_goals.calorie_intake is derived from the user's weight, height,
+workouts and age. Writes to those inputs mark the goal dirty in the
+dirty_goals table, in the same transaction as the write. A goal whose
+last_updated falls in an earlier year is stale too, because the user's age
+has changed since. Stale goals are recomputed when read
+(Goals.get_goals) or in bulk by recompute.recompute_stale_goals, which
+touches only the stale users.
+"""
+from datetime import datetime
+from typing import Iterable, Optional
+
+# Only users who have a goal are tracked
+MARK_DIRTY = """
+    INSERT OR IGNORE INTO dirty_goals (username)
+    SELECT username FROM user_goals WHERE username = ?
+"""
+
+def mark_dirty(cursor, username: str):
+    """Flag a user's goal for recomputation. Call inside the input write's transaction."""
+    cursor.execute(MARK_DIRTY, (username,))
+
+def mark_dirty_many(conn, usernames: Iterable[str]):
+    conn.executemany(MARK_DIRTY, ((username,) for username in usernames))
+
+def clear_dirty(cursor, username: str):
+    cursor.execute("DELETE FROM dirty_goals WHERE username = ?", (username,))
+
+def year_start(year: Optional[int] = None) -> str:
+    """Goals last updated before this timestamp were computed with an old age."""
+    return f"{year or datetime.now().year:04d}-01-01"
+
+def is_stale(cursor, username: str, last_updated: Optional[str], year: Optional[int] = None) -> bool:
+    if last_updated and last_updated < year_start(year):
+        return True
+    cursor.execute("SELECT 1 FROM dirty_goals WHERE username = ?", (username,))
+    return cursor.fetchone() is not None
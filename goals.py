@@ -1,32 +1,38 @@
+from datetime import datetime
 from typing import Tuple, Optional
 from user_information import UserInformation
 from personal_record import PersonalRecord 
-import sqlite3
+from db import Repository, open_database
+from metrics import timed
+import goal_staleness
+import meal_plans
+from migrations import migrate
+from read_cache import GOALS, PROFILE
+from sessions import UserRef, username_of
 
 database = "database/health_tracker.db"
 
-class Goals:
-    def __init__(self, db_path: str = "database/health_tracker.db"):
+class Goals(Repository):
+    @timed()
+    def __init__(self, db_path: str = "database/health_tracker.db",
+                 user_info: Optional[UserInformation] = None,
+                 health_record: Optional[PersonalRecord] = None):
+        """Pass existing user_info / health_record objects to share them;
+        otherwise Goals opens its own on the same database path."""
         self.database = db_path
-        self.conn = sqlite3.connect(self.database)
-        self.cursor = self.conn.cursor()
-        self.user_info = UserInformation()
-        self.health_record = PersonalRecord()
-        self.create_goals_table()
+        self.db = open_database(self.database)
+        self._owned = []
+        if user_info is None:
+            user_info = UserInformation(db_path)
+            self._owned.append(user_info)
+        if health_record is None:
+            health_record = PersonalRecord(db_path)
+            self._owned.append(health_record)
+        self.user_info = user_info
+        self.health_record = health_record
 
     def create_goals_table(self):
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS user_goals (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL,
-                goal TEXT NOT NULL,
-                bmr REAL NOT NULL,
-                calorie_intake REAL NOT NULL,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (username) REFERENCES users(username)
-            )
-        """)
-        self.conn.commit()
+        migrate(self.conn)
 
     def get_bmr(self, gender: str, weight: float, height: float, age: int) -> float:
         """Calculate BMR using Mifflin-St Jeor Equation."""
@@ -50,7 +56,9 @@ class Goals:
         else:
             return 1.9  # extra active
 
-    def set_calorie_goal(self, username: str, goal: str) -> Tuple[bool, Optional[str]]:
+    @timed()
+    def set_calorie_goal(self, username: UserRef, goal: str) -> Tuple[bool, Optional[str]]:
+        username = username_of(username)
         profile = self.user_info.get_user_profile(username)
         health_data = self.health_record.get_health_data(username)
         workout_data = self.user_info.get_workout_status(username)
@@ -59,7 +67,9 @@ class Goals:
             return False, "Missing user or health information."
 
         gender = profile.get("gender")
-        age = profile.get("age")
+        # From year_of_birth: a cached profile's age may be from last year
+        year_of_birth = profile.get("year_of_birth")
+        age = datetime.now().year - year_of_birth if year_of_birth else profile.get("age")
         weight = health_data.get("weight in kg")  
         height = health_data.get("height in meters") * 100
 
@@ -87,29 +97,56 @@ class Goals:
             return False, "Invalid goal. Choose from 'maintain', 'lose', or 'gain'."
 
         try:
-            self.cursor.execute("SELECT id FROM user_goals WHERE username = ?", (username,))
-            existing = self.cursor.fetchone()
-
-            if existing:
-                self.cursor.execute("""
-                    UPDATE user_goals
-                    SET goal = ?, bmr = ?, calorie_intake = ?, last_updated = CURRENT_TIMESTAMP
-                    WHERE username = ?
-                """, (goal, bmr, adjusted_calories, username))
-            else:
-                self.cursor.execute("""
-                    INSERT INTO user_goals (username, goal, bmr, calorie_intake)
-                    VALUES (?, ?, ?, ?)
-                """, (username, goal, bmr, adjusted_calories))
-
-            self.conn.commit()
-            return True, f"Your estimated daily calorie intake to {goal} weight is {round(adjusted_calories)} kcal."
-
+            self._write(self._write_goal, username, goal, bmr, adjusted_calories)
         except Exception as e:
             return False, f"Error saving goal: {e}"
+        cache = self._cache()
+        if cache is not None:
+            cache.invalidate(username, GOALS)
+        return True, f"Your estimated daily calorie intake to {goal} weight is {round(adjusted_calories)} kcal."
+
+    def _write_goal(self, cursor, username: str, goal: str, bmr: float, calories: float):
+        cursor.execute("""
+            INSERT INTO user_goals (username, goal, bmr, calorie_intake)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(username) DO UPDATE SET
+                goal = excluded.goal,
+                bmr = excluded.bmr,
+                calorie_intake = excluded.calorie_intake,
+                last_updated = CURRENT_TIMESTAMP
+        """, (username, goal, bmr, calories))
+        goal_staleness.clear_dirty(cursor, username)
+        meal_plans.discard_plans(cursor, username, keep_goal=calories)
         
-    def get_goals(self, username: str) -> Optional[dict]:
-        """Retrieve a user's goals."""
+    @timed()
+    def get_goals(self, username: UserRef) -> Optional[dict]:
+        """Retrieve a user's goals, through the shared read cache.
+
+        A goal whose inputs changed since it was computed (see
+        goal_staleness) is recomputed first, so the target is never stale.
+        Cached goals don't expire, so a hit from before this year is
+        reloaded, along with the cached profile: the user's age has
+        changed since.
+        """
+        username = username_of(username)
+        cache = self._cache()
+        if cache is not None:
+            goals = cache.get(GOALS, username, lambda: self._load_goals(username))
+            if goals and goals["last_updated"] and goals["last_updated"] < goal_staleness.year_start():
+                cache.invalidate(username, GOALS, PROFILE)
+                goals = cache.get(GOALS, username, lambda: self._load_goals(username))
+            return goals
+        return self._load_goals(username)
+
+    def _load_goals(self, username: str) -> Optional[dict]:
+        goals = self._read_goals(username)
+        if goals and goal_staleness.is_stale(self.cursor, username, goals["last_updated"]):
+            # Keep the stored target if the inputs can no longer produce one
+            if self.set_calorie_goal(username, goals["goal"])[0]:
+                goals = self._read_goals(username)
+        return goals
+
+    def _read_goals(self, username: str) -> Optional[dict]:
         self.cursor.execute("""
             SELECT goal, bmr, calorie_intake, last_updated
             FROM user_goals WHERE username = ?
@@ -125,9 +162,8 @@ class Goals:
         return None
 
     def close(self):
-        self.user_info.close()
-        self.health_record.close()
-        if self.conn:
-            self.conn.close()
-            self.conn = None
+        for owned in self._owned:
+            owned.close()
+        self._owned = []
+        self._release()
 
@@ -0,0 +1,178 @@
+"""Group commit: many callers' writes share one SQLite transaction.
+
+Normally each write method commits on its own, so each pays for a disk
+sync. A GroupCommitter owns a dedicated writer connection and thread.
+Callers submit write functions and get a Future. The writer takes every
+write queued while the previous commit was running, plus any arriving
+within ``window`` seconds (0 by default), up to ``max_batch``, runs them
+in a single transaction and commits once.
+
+- Completion: a caller's Future resolves only after the transaction
+  holding its write has committed, so a successful return is as durable
+  as the connection's synchronous level makes any commit.
+- Isolation: each write runs inside its own SAVEPOINT. One that raises is
+  rolled back alone and its Future gets the exception; the rest of the
+  batch still commits. If the COMMIT itself fails, every write in the
+  batch fails with that error.
+- Locking: like execute_write in db.py, the writer waits up to
+  BUSY_TIMEOUT for another process's lock and retries BEGIN IMMEDIATE
+  with backoff, so a busy database delays a batch rather than failing it.
+
+Batching only helps when several threads write at once, and most when
+each sync is expensive (synchronous=FULL, rollback journal). See
+bench_writes.py for numbers.
+"""
+import queue
+import sqlite3
+import threading
+import time
+import metrics
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+DEFAULT_WINDOW = 0.0
+DEFAULT_MAX_BATCH = 256
+BUSY_TIMEOUT = 10.0
+WRITE_RETRIES = 5
+
+_STOP = object()
+
+
+def apply_pragmas(conn: sqlite3.Connection, journal_mode: Optional[str] = None,
+                  synchronous: Optional[str] = None):
+    """Set the journal mode (e.g. "wal", "delete") and synchronous level
+    ("off", "normal", "full", "extra") on a connection; None leaves a
+    setting unchanged."""
+    if journal_mode:
+        conn.execute(f"PRAGMA journal_mode = {_pragma_value(journal_mode)}")
+    if synchronous:
+        conn.execute(f"PRAGMA synchronous = {_pragma_value(synchronous)}")
+
+def is_busy(error: sqlite3.OperationalError) -> bool:
+    message = str(error)
+    return "locked" in message or "busy" in message
+
+def begin_immediate(conn: sqlite3.Connection):
+    """BEGIN IMMEDIATE, retried with backoff while the database is busy."""
+    for attempt in range(WRITE_RETRIES + 1):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            if not is_busy(e) or attempt == WRITE_RETRIES:
+                raise
+            time.sleep(0.05 * (2 ** attempt))
+
+def _pragma_value(value: str) -> str:
+    if not value.isalpha():
+        raise ValueError(f"Invalid pragma value: {value!r}")
+    return value
+
+
+class GroupCommitter:
+    def __init__(self, path: str, window: float = DEFAULT_WINDOW, max_batch: int = DEFAULT_MAX_BATCH,
+                 journal_mode: Optional[str] = None, synchronous: Optional[str] = None):
+        self.path = path
+        self.window = window
+        self.max_batch = max_batch
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.batches = 0
+        self.writes = 0
+        self._queue = queue.Queue()
+        self._ready = threading.Event()
+        self._error = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error:
+            raise self._error
+
+    def submit(self, write: Callable, *args) -> Future:
+        """Queue write(cursor, *args); the Future yields its return value after the commit."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Group commit writer is closed")
+            self._queue.put((future, write, args))
+        return future
+
+    def close(self):
+        """Commit everything already submitted, then stop the writer."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        try:
+            # Transactions are managed by hand, so no implicit BEGIN
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                                   factory=metrics.connection_factory())
+            apply_pragmas(conn, self.journal_mode, self.synchronous)
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        stopping = False
+        while not stopping:
+            job = self._queue.get()
+            if job is _STOP:
+                break
+            batch = [job]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    job = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if job is _STOP:
+                    stopping = True
+                    break
+                batch.append(job)
+            self._commit(conn, batch)
+        conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, batch: list):
+        done = []
+        try:
+            begin_immediate(conn)
+        except sqlite3.Error as e:
+            for future, _, _ in batch:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(e)
+            return
+
+        cursor = conn.cursor()
+        for future, write, args in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            conn.execute("SAVEPOINT group_write")
+            try:
+                result = write(cursor, *args)
+            except Exception as e:
+                conn.execute("ROLLBACK TO group_write")
+                conn.execute("RELEASE group_write")
+                future.set_exception(e)
+                continue
+            conn.execute("RELEASE group_write")
+            done.append((future, result))
+
+        try:
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for future, _ in done:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.writes += len(done)
+        for future, result in done:
+            future.set_result(result)
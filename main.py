@@ -1,19 +1,25 @@
-import os
-from user_information import UserInformation
-from personal_record import PersonalRecord
-from goals import Goals
-from diet_plan import generate_and_display_meal_plan
+import sys
 import re
 
-if not os.path.exists("database"):
-    os.makedirs("database")
+# Keep this module cheap to import: the tracker classes load when main()
+# starts, the meal planner (and requests) only when option 5 is chosen, and
+# the database directory is created when the database is first opened.
 
 def main():
+    from user_information import UserInformation
+    from personal_record import PersonalRecord
+    from goals import Goals
+    from sessions import SessionError, default_store
+    import metrics
+
+    # HEALTH_TRACKER_METRICS=<file> records where the time goes in this session
+    metrics.configure_from_env()
     print("Welcome to Health Tracker.")
 
+    # All three share one connection to the database
     ui = UserInformation()
     record = PersonalRecord()
-    g = Goals()
+    g = Goals(user_info=ui, health_record=record)
 
     while True:
         print("\nHome:")
@@ -85,149 +91,178 @@ def main():
             print("\nLog in: ")
             username = input("Username: ").strip()
             password = input("Password: ").strip()
-            success, message = ui.login(username, password)
+            # Authenticate once; the menu below works with the session
+            session, message = ui.login_session(username, password)
             print(message) 
 
-            if success:
+            if session:
                 while True:
+                    if session.expired:
+                        print("Your session has expired. Please log in again.")
+                        break
                     print(f"\nHi {username}")
                     print("\n1. View Your User Account")
                     print("\n2. View Your Health Record")
                     print("\n3. View Your Workout Status")
                     print("\n4. Set Up Personal Goals")
                     print("\n5. View Your Diet Plan")
-                    print("\n6. Logout")
-
-                    option = input("\nPlease choose your options (1, 2, 3, 4, 5, or 6): ").strip()
-
-                    if option == "1":
-                        profile = ui.get_user_profile(username)
-                        if profile:
-                            print("\nYour profile: ")
-                            for key, value in profile.items():
-                                print(f"{key.capitalize()}: {value}")
-                        else:
-                            print("Your profile not found")
-
-                    elif option == "2":
-                        print("\nYour Health Record:")
-
-                        data = record.get_health_data(username)
-                        if data:
-                            for key, value in data.items():
-                                print(f"{key.replace('_', ' ').capitalize()}: {value}")
-
-                            while True:
-                                update_health = input("\nDo you want to update your health record? (y/n): ").strip().lower()
-                                if update_health == "y":
-                                    try:
-                                        weight = float(input("Enter your weight in kg: ").strip())
-                                        height_cm = float(input("Enter your height in cm: ").strip())
-                                        height = height_cm / 100
-                                        success, message = record.add_or_update_measurements(username, weight, height)
-                                        print(message)
-                                    except ValueError:
-                                        print("Please enter numeric values for weight and height.")
-                                    break
-                                elif update_health == "n":
-                                    break
-                                else:
-                                    print("Invalid input. Please enter 'y' for yes or 'n' for no.")
-
-                        else:
-                            print("No health record found.")
+                    print("\n6. Swap a Meal in Your Diet Plan")
+                    print("\n7. Logout")
+
+                    option = input("\nPlease choose your options (1, 2, 3, 4, 5, 6, or 7): ").strip()
+
+                    try:
+                        if option == "1":
+                            profile = ui.get_user_profile(session)
+                            if profile:
+                                print("\nYour profile: ")
+                                for key, value in profile.items():
+                                    print(f"{key.capitalize()}: {value}")
+                            else:
+                                print("Your profile not found")
+
+                        elif option == "2":
+                            print("\nYour Health Record:")
+
+                            data = record.get_health_data(session)
+                            if data:
+                                for key, value in data.items():
+                                    print(f"{key.replace('_', ' ').capitalize()}: {value}")
+
+                                while True:
+                                    update_health = input("\nDo you want to update your health record? (y/n): ").strip().lower()
+                                    if update_health == "y":
+                                        try:
+                                            weight = float(input("Enter your weight in kg: ").strip())
+                                            height_cm = float(input("Enter your height in cm: ").strip())
+                                            height = height_cm / 100
+                                            success, message = record.add_or_update_measurements(session, weight, height)
+                                            print(message)
+                                        except ValueError:
+                                            print("Please enter numeric values for weight and height.")
+                                        break
+                                    elif update_health == "n":
+                                        break
+                                    else:
+                                        print("Invalid input. Please enter 'y' for yes or 'n' for no.")
+
+                            else:
+                                print("No health record found.")
+                                try:
+                                    weight = float(input("Enter your weight in kg: ").strip())
+                                    height_cm = float(input("Enter your height in cm: ").strip())
+                                    height = height_cm / 100
+
+                                    success, message = record.add_or_update_measurements(session, weight, height)
+                                    print(message)
+
+                                except ValueError:
+                                    print("Please enter valid numeric values.")
+
+                        elif option == "3":
+                            print("\nYour Workout Status:")
+
+                            workout_data = ui.get_workout_status(session)
+                            if workout_data:
+                                for key, value in workout_data.items():
+                                    print(f"{key}: {value}")
+                                while True:
+                                    update_workout = input("Do you want to update your workout status? (y/n): ").strip().lower()
+                                    if update_workout == "y":
+                                        try:
+                                            workout_days = int(input("How many days do you work out per week (0-7 days)? "))
+                                            duration = float(input("How many hours per day do you workout? "))
+                                            success, message = ui.update_workout_status(session, workout_days, duration)
+                                            print(message)
+
+                                        except ValueError:
+                                            print("Invalid input. Please enter numeric values. ")
+                                        break
+                                    elif update_workout == "n":
+                                        break
+                                    else:
+                                        print("Invalid input. Please enter 'y' for yes or 'n' for no.")
+
+                            else:
+                                print("You have not input your workout status yet.")
+                                try:
+                                    workout_days = int(input("Enter workout days per week (0–7): ").strip())
+                                    duration = float(input("Enter average duration per day (in hours): ").strip())
+                                    success, message = ui.update_workout_status(session, workout_days, duration)
+                                    print(message)
+
+                                except ValueError:
+                                    print("Please enter valid numeric values.")
+
+                        elif option == "4":
+                            print("\nCurrent Personal Goals:")
+
+                            personal_goals = g.get_goals(session)
+                            if personal_goals:
+                                for key, value in personal_goals.items():
+                                    print(f"{key}: {value}")
+                                while True:
+                                    update_goals = input("Do you want to update your personal goals? (y/n): ").strip().lower()
+                                    if update_goals == "y":
+                                        try:
+                                            goal = input("How do you want to manage your weight? (maintain, lose, or gain)? ").strip().lower()
+                                            success, message = g.set_calorie_goal(session, goal)
+                                            print(message)
+
+                                        except ValueError:
+                                            print("Invalid input.")
+                                        break
+                                    elif update_goals == "n":
+                                        break
+                                    else: 
+                                        print("Invalid input. Please enter 'y' for yes and 'n' for no.")
+                            
+                            else:
+                                print("You have not input your personal goals yet.")
+                                try:
+                                    goal = input("How do you want to manage your weight? (maintain, lose, or gain)? ").strip().lower()
+                                    success, message = g.set_calorie_goal(session, goal)
+                                    print(message)
+                                except ValueError:
+                                    print("Invalid input.")
+
+                        elif option == "5":
+                            print("\nGenerating your 7-day meal plan:")
                             try:
-                                weight = float(input("Enter your weight in kg: ").strip())
-                                height_cm = float(input("Enter your height in cm: ").strip())
-                                height = height_cm / 100
-
-                                success, message = record.add_or_update_measurements(username, weight, height)
-                                print(message)
-
-                            except ValueError:
-                                print("Please enter valid numeric values.")
-
-                    elif option == "3":
-                        print("\nYour Workout Status:")
-
-                        workout_data = ui.get_workout_status(username)
-                        if workout_data:
-                            for key, value in workout_data.items():
-                                print(f"{key}: {value}")
-                            while True:
-                                update_workout = input("Do you want to update your workout status? (y/n): ").strip().lower()
-                                if update_workout == "y":
-                                    try:
-                                        workout_days = int(input("How many days do you work out per week (0-7 days)? "))
-                                        duration = float(input("How many hours per day do you workout? "))
-                                        success, message = ui.update_workout_status(username, workout_days, duration)
-                                        print(message)
-
-                                    except ValueError:
-                                        print("Invalid input. Please enter numeric values. ")
-                                    break
-                                elif update_workout == "n":
-                                    break
-                                else:
-                                    print("Invalid input. Please enter 'y' for yes or 'n' for no.")
-
-                        else:
-                            print("You have not input your workout status yet.")
+                                from diet_plan import generate_and_display_meal_plan
+                                generate_and_display_meal_plan(session, g)
+                            except ValueError as e:
+                                print(e)
+                            except SessionError:
+                                raise
+                            except Exception as e:
+                                print(f"Failed to generate meal plan: {e}")
+
+                        elif option == "6":
+                            day = input("Which day (Monday to Sunday)? ").strip()
+                            meal = input("Which meal (breakfast, lunch or dinner)? Press Enter to swap the whole day: ").strip()
                             try:
-                                workout_days = int(input("Enter workout days per week (0–7): ").strip())
-                                duration = float(input("Enter average duration per day (in hours): ").strip())
-                                success, message = ui.update_workout_status(username, workout_days, duration)
-                                print(message)
-
-                            except ValueError:
-                                print("Please enter valid numeric values.")
-
-                    elif option == "4":
-                        print("\nCurrent Personal Goals:")
-
-                        personal_goals = g.get_goals(username)
-                        if personal_goals:
-                            for key, value in personal_goals.items():
-                                print(f"{key}: {value}")
-                            while True:
-                                update_goals = input("Do you want to update your personal goals? (y/n): ").strip().lower()
-                                if update_goals == "y":
-                                    try:
-                                        goal = input("How do you want to manage your weight? (maintain, lose, or gain)? ").strip().lower()
-                                        success, message = g.set_calorie_goal(username, goal)
-                                        print(message)
-
-                                    except ValueError:
-                                        print("Invalid input.")
-                                    break
-                                elif update_goals == "n":
-                                    break
-                                else: 
-                                    print("Invalid input. Please enter 'y' for yes and 'n' for no.")
-                            
+                                from diet_plan import swap_and_display_meal_plan
+                                swap_and_display_meal_plan(session, day, meal, g)
+                            except ValueError as e:
+                                print(e)
+                            except SessionError:
+                                raise
+                            except Exception as e:
+                                print(f"Failed to update meal plan: {e}")
+
+                        elif option == "7":
+                            print("Logging out ...")
+                            default_store().revoke(session.token)
+                            break
+
                         else:
-                            print("You have not input your personal goals yet.")
-                            try:
-                                goal = input("How do you want to manage your weight? (maintain, lose, or gain)? ").strip().lower()
-                                success, message = g.set_calorie_goal(username, goal)
-                                print(message)
-                            except ValueError:
-                                print("Invalid input.")
-
-                    elif option == "5":
-                        print("\nGenerating your 7-day meal plan:")
-                        try:
-                            generate_and_display_meal_plan(username)
-                        except Exception as e:
-                            print(f"Failed to generate meal plan: {e}")
-
-                    elif option == "6":
-                        print("Logging out ...")
+                            print("Invalid choice. Please try again: ")
+                    except SessionError as e:
+                        # Expired mid-action: back to the login prompt
+                        print(e)
                         break
 
-                    else:
-                        print("Invalid choice. Please try again: ")
-
         elif choice == "3":
             print("Thank you!")
             break
@@ -235,8 +270,13 @@ def main():
         else:
             print("Invalid choice. Please try again: ")
 
+    g.close()
     ui.close()
     record.close()
 
 if __name__ == "__main__":
+    # With arguments, run a single non-interactive command (see cli.py)
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main())
     main()           
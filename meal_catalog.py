@@ -0,0 +1,289 @@
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from db import Repository, open_database
+import metrics
+from metrics import timed
+from migrations import migrate
+
+API_BASE_URL = "https://www.themealdb.com/api/json/v1/1"
+
+database = "database/health_tracker.db"
+
+class MealCatalog(Repository):
+    """Cache of TheMealDB category listings and meal details.
+
+    Lookups go to an in-process LRU first, then to the ``meal_catalog`` table
+    stored in the tracker database, and only then to the network. Each
+    category is downloaded at most once per ``ttl`` seconds. In offline mode
+    the network is never used and cached entries are served even when stale.
+
+    Downloads share one keep-alive ``requests.Session``. ``prefetch`` fetches
+    missing categories concurrently with at most ``max_workers`` requests in
+    flight; each request has a ``timeout`` and is retried ``retries`` times
+    with exponential ``backoff``.
+
+    Full meal records (ingredients and measures, from ``lookup.php``) are
+    kept in the ``meal_details`` table; ``get_details`` downloads the
+    missing ones the same way.
+    """
+
+    def __init__(self, db_path: str = "database/health_tracker.db", ttl: float = 24 * 60 * 60,
+                 max_entries: int = 32, offline: bool = False, base_url: str = API_BASE_URL,
+                 max_workers: int = 6, timeout: float = 10.0, retries: int = 2, backoff: float = 0.5):
+        self.database = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.offline = offline
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.hooks["response"].append(metrics.record_response)
+        self.db = open_database(self.database)
+        self._memory = OrderedDict()  # category -> (fetched_at, meals)
+        self._memory_lock = threading.Lock()
+
+    def create_catalog_table(self):
+        """Create the on-disk catalog table if it doesn't exist."""
+        migrate(self.conn)
+
+    def _is_fresh(self, fetched_at: float) -> bool:
+        return self.offline or time.time() - fetched_at < self.ttl
+
+    def _remember(self, category: str, fetched_at: float, meals: List[dict]):
+        """Put an entry in the in-process LRU, evicting the oldest if full."""
+        with self._memory_lock:
+            self._memory[category] = (fetched_at, meals)
+            self._memory.move_to_end(category)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _load(self, category: str) -> Optional[tuple]:
+        self.cursor.execute(
+            "SELECT fetched_at, payload FROM meal_catalog WHERE category = ?", (category,)
+        )
+        row = self.cursor.fetchone()
+        if row:
+            return row[0], json.loads(row[1])
+        return None
+
+    def _store(self, category: str, fetched_at: float, meals: List[dict]):
+        self._write(self._write_category, category, json.dumps(meals), fetched_at)
+
+    def _write_category(self, cursor, category: str, payload: str, fetched_at: float):
+        cursor.execute("""
+            INSERT OR REPLACE INTO meal_catalog (category, payload, fetched_at)
+            VALUES (?, ?, ?)
+        """, (category, payload, fetched_at))
+
+    def _fetch(self, endpoint: str, params: dict, what: str) -> Optional[dict]:
+        """GET an API endpoint, retrying with backoff.
+
+        Returns the decoded JSON, or None if every attempt failed.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(f"{self.base_url}/{endpoint}", params=params, timeout=self.timeout)
+                response.raise_for_status()
+                return response.json()
+            except (requests.RequestException, ValueError) as e:
+                metrics.inc(metrics.HTTP_ERRORS, host=urlsplit(self.base_url).netloc)
+                if attempt == self.retries:
+                    # stderr, so JSON on stdout (cli.py --json) stays parseable
+                    print(f"Failed to fetch {what}: {e}", file=sys.stderr)
+                    return None
+                time.sleep(self.backoff * (2 ** attempt))
+
+    def _download(self, category: str) -> Optional[List[dict]]:
+        """Fetch one category listing; None if every attempt failed."""
+        data = self._fetch("filter.php", {"c": category}, f"meals from {category}")
+        return None if data is None else data.get("meals") or []
+
+    def _download_details(self, meal_id: str) -> Optional[dict]:
+        """Fetch one meal's full record; {} if the API doesn't know the id,
+        None if every attempt failed."""
+        data = self._fetch("lookup.php", {"i": meal_id}, f"details for meal {meal_id}")
+        if data is None:
+            return None
+        meals = data.get("meals") or [{}]
+        return meals[0]
+
+    def _cached(self, category: str) -> tuple:
+        """Look a category up in memory, then on disk.
+
+        Returns (meals, stored): meals is None unless a usable entry was
+        found, and stored is the on-disk entry kept as a stale fallback.
+        """
+        with self._memory_lock:
+            entry = self._memory.get(category)
+            if entry and self._is_fresh(entry[0]):
+                self._memory.move_to_end(category)
+                return entry[1], None
+
+        stored = self._load(category)
+        if stored and self._is_fresh(stored[0]):
+            self._remember(category, *stored)
+            return stored[1], stored
+        return None, stored
+
+    def lookup(self, categories: Iterable[str]) -> tuple:
+        """Split categories into cached and missing ones without any network use.
+
+        Returns (found, stale): found maps usable categories to their meals;
+        stale maps each category that needs downloading to its outdated
+        on-disk entry (or None) to fall back on.
+        """
+        found = {}
+        stale = {}
+        for category in categories:
+            meals, stored = self._cached(category)
+            if meals is not None:
+                found[category] = meals
+            elif self.offline:
+                found[category] = []
+            else:
+                stale[category] = stored
+        return found, stale
+
+    def download(self, categories: Iterable[str]) -> Dict[str, Optional[List[dict]]]:
+        """Fetch categories concurrently. Network only: no SQLite access,
+        so this may run on any thread."""
+        missing = list(categories)
+        if len(missing) == 1:
+            return {missing[0]: self._download(missing[0])}
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as pool:
+                return dict(zip(missing, pool.map(self._download, missing)))
+        return {}
+
+    def merge(self, categories: Iterable[str], found: dict, stale: dict,
+              downloaded: Dict[str, Optional[List[dict]]]) -> Dict[str, List[dict]]:
+        """Store the downloads and return every category's meals, as prefetch does."""
+        fetched_at = time.time()
+        for category, meals in downloaded.items():
+            if meals is None:
+                # Serve a stale copy rather than nothing when the API is down
+                found[category] = stale[category][1] if stale[category] else []
+            else:
+                self._store(category, fetched_at, meals)
+                self._remember(category, fetched_at, meals)
+                found[category] = meals
+        return {category: list(found[category]) for category in categories}
+
+    @timed()
+    def prefetch(self, categories: Iterable[str]) -> Dict[str, List[dict]]:
+        """Load several categories at once and return them keyed by name.
+
+        Only categories missing from both cache levels hit the network, and
+        those are downloaded concurrently, so the wall-clock cost is bounded
+        by the slowest single fetch. Every returned list is a copy.
+        """
+        categories = list(categories)
+        found, stale = self.lookup(categories)
+        # SQLite work stays on this thread; the download workers only do HTTP
+        return self.merge(categories, found, stale, self.download(stale))
+
+    @timed()
+    def get_category(self, category: str) -> List[dict]:
+        """Return the meals listed under a category.
+
+        The returned list is a copy, so callers may shuffle or modify it.
+        """
+        return self.prefetch([category])[category]
+
+    # Meal details. A meal id's recipe doesn't change, so details are kept
+    # until invalidated rather than expiring after ttl.
+
+    def lookup_details(self, meal_ids: Iterable[str]) -> tuple:
+        """Read stored details without any network use.
+
+        Returns (found, missing): found maps meal ids to their records,
+        missing lists the ids that still need downloading.
+        """
+        meal_ids = list(dict.fromkeys(meal_ids))
+        found = {}
+        # Stay under SQLite's limit on bound parameters
+        for start in range(0, len(meal_ids), 500):
+            chunk = meal_ids[start:start + 500]
+            self.cursor.execute(
+                f"SELECT meal_id, payload FROM meal_details WHERE meal_id IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            found.update((meal_id, json.loads(payload)) for meal_id, payload in self.cursor.fetchall())
+        return found, [meal_id for meal_id in meal_ids if meal_id not in found]
+
+    def download_details(self, meal_ids: Iterable[str]) -> Dict[str, Optional[dict]]:
+        """Fetch details concurrently, at most max_workers at a time.
+        Network only, like download()."""
+        missing = list(meal_ids)
+        if not missing:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as pool:
+            return dict(zip(missing, pool.map(self._download_details, missing)))
+
+    def store_details(self, found: dict, downloaded: Dict[str, Optional[dict]]) -> Dict[str, dict]:
+        """Store the successful downloads in one transaction and return them
+        merged into ``found``. Failed ones are left out, to be retried."""
+        fetched_at = time.time()
+        rows = [(meal_id, json.dumps(meal), fetched_at) for meal_id, meal in downloaded.items() if meal is not None]
+        if rows:
+            self._write(self._write_details, rows)
+        found = dict(found)
+        for meal_id, meal in downloaded.items():
+            if meal is not None:
+                found[meal_id] = meal
+        return found
+
+    def _write_details(self, cursor, rows: List[tuple]):
+        cursor.executemany(
+            "INSERT OR REPLACE INTO meal_details (meal_id, payload, fetched_at) VALUES (?, ?, ?)", rows
+        )
+
+    @timed()
+    def get_details(self, meal_ids: Iterable[str]) -> Dict[str, dict]:
+        """Return lookup.php records (with ingredients) for the given meals.
+
+        Stored details are read in a few queries and only the rest are
+        downloaded, concurrently. In offline mode, or when a download fails,
+        a meal is simply missing from the result.
+        """
+        found, missing = self.lookup_details(meal_ids)
+        if self.offline or not missing:
+            return found
+        return self.store_details(found, self.download_details(missing))
+
+    def invalidate(self, category: Optional[str] = None):
+        """Drop one category, or the whole catalog including meal details,
+        from both cache levels."""
+        with self._memory_lock:
+            if category is None:
+                self._memory.clear()
+            else:
+                self._memory.pop(category, None)
+        self._write(self._write_invalidate, category)
+
+    def _write_invalidate(self, cursor, category: Optional[str]):
+        if category is None:
+            cursor.execute("DELETE FROM meal_catalog")
+            cursor.execute("DELETE FROM meal_details")
+        else:
+            cursor.execute("DELETE FROM meal_catalog WHERE category = ?", (category,))
+
+    def close(self):
+        """Close the HTTP session and release the database connection."""
+        self.session.close()
+        self._release()
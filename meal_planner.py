@@ -0,0 +1,321 @@
+import random
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional
+
+from nutrition import ingredient_key
+
+# The TheMealDB categories plans are drawn from
+CATEGORIES = ['Beef', 'Chicken', 'Seafood', 'Vegetarian', 'Vegan', 'Pasta']
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MEAL_TIMES = ["Breakfast", "Lunch", "Dinner"]
+
+DEFAULT_TOLERANCE = 0.1
+# Random probes per day before settling for the closest day found
+ATTEMPTS = 200
+# Pools up to this size fall back to an exhaustive O(n^2) search per day
+EXACT_SEARCH_LIMIT = 200
+# Restricted planners a CandidateIndex keeps, one per distinct eligible set
+MAX_RESTRICTED_PLANNERS = 256
+
+class MealPlanError(Exception):
+    """Raised when a complete weekly meal plan cannot be built."""
+
+class MealPlanner:
+    """Draw weekly meal plans from a fixed pool of candidate meals.
+
+    The pool is built once from category listings and de-duplicated by
+    ``idMeal``; a meal listed under several categories keeps the first one.
+    Every plan fills all slots with distinct meals or raises MealPlanError.
+    """
+
+    def __init__(self, meals_by_category: Dict[str, List[dict]], categories: Optional[Iterable[str]] = None):
+        self.pool = {}
+        for category in categories if categories is not None else meals_by_category:
+            for meal in meals_by_category.get(category, []):
+                meal_id = meal.get("idMeal")
+                if meal_id and meal_id not in self.pool:
+                    self.pool[meal_id] = {
+                        "id": meal_id,
+                        "name": meal.get("strMeal"),
+                        "category": category,
+                        "image": meal.get("strMealThumb"),
+                    }
+        # Insertion order is deterministic, so a seed always maps to the same draw
+        self._ids = list(self.pool)
+        self._ranked = None
+
+    def subset(self, meal_ids: Iterable[str]) -> "MealPlanner":
+        """A planner over some of this pool's meals, given in pool order."""
+        planner = MealPlanner({})
+        planner.pool = {meal_id: self.pool[meal_id] for meal_id in meal_ids}
+        planner._ids = list(planner.pool)
+        return planner
+
+    def draw(self, count: int, seed: Optional[int] = None) -> List[dict]:
+        """Pick ``count`` distinct meals without replacement."""
+        if count > len(self._ids):
+            raise MealPlanError(
+                f"Need {count} distinct meals but only {len(self._ids)} are available."
+            )
+        return [self.pool[meal_id] for meal_id in random.Random(seed).sample(self._ids, count)]
+
+    def plan(self, calorie_goal: Optional[int] = None, seed: Optional[int] = None) -> dict:
+        """Build a full week of meals.
+
+        When no seed is given one is chosen and returned with the plan, so
+        the same plan can be rebuilt later from the same pool.
+        """
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        per_day = len(MEAL_TIMES)
+        meals = self.draw(len(DAYS) * per_day, seed)
+        days = []
+        for i, day in enumerate(DAYS):
+            day_meals = meals[i * per_day:(i + 1) * per_day]
+            days.append({
+                "day": day,
+                "meals": [dict(meal, slot=slot) for slot, meal in zip(MEAL_TIMES, day_meals)],
+            })
+        return {"calorie_goal": calorie_goal, "seed": seed, "days": days}
+
+    def optimize(self, calorie_goal: float, calories: Dict[str, float], tolerance: float = DEFAULT_TOLERANCE,
+                 seed: Optional[int] = None) -> dict:
+        """Build a week whose days each add up to calorie_goal within tolerance.
+
+        ``calories`` maps meal ids to kcal per serving; meals without an
+        estimate are left out. Candidates are kept sorted by calories. For
+        each day two meals are drawn at random and the third is found by
+        bisecting for the remaining calories, so a probe is O(log n). If
+        ATTEMPTS probes miss, small pools are searched exhaustively. A day
+        that still misses keeps the closest combination found and is marked
+        ``within_tolerance: False``. Meals are distinct across the week and
+        each day is served lightest first. The same seed reproduces the plan.
+        """
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        rng = random.Random(seed)
+        per_day = len(MEAL_TIMES)
+        values, ids = (list(ranked) for ranked in self._rank(calories))
+        if len(ids) < len(DAYS) * per_day:
+            raise MealPlanError(
+                f"Need {len(DAYS) * per_day} meals with calorie estimates but only {len(ids)} are available."
+            )
+        low, high = calorie_goal * (1 - tolerance), calorie_goal * (1 + tolerance)
+
+        days = []
+        for day in DAYS:
+            picked = _closest_day(values, calorie_goal, low, high, rng)
+            total = sum(values[i] for i in picked)
+            meals = sorted((values[i], ids[i]) for i in picked)
+            # Delete from the back so earlier indexes stay valid
+            for i in sorted(picked, reverse=True):
+                del values[i]
+                del ids[i]
+            days.append({
+                "day": day,
+                "calories": round(total),
+                "within_tolerance": low <= total <= high,
+                "meals": [dict(self.pool[meal_id], slot=slot, calories=round(value))
+                          for slot, (value, meal_id) in zip(MEAL_TIMES, meals)],
+            })
+        return {"calorie_goal": calorie_goal, "seed": seed, "tolerance": tolerance, "days": days}
+
+    def replace(self, plan: dict, day: int, slot: Optional[int] = None,
+                calories: Optional[Dict[str, float]] = None, seed: Optional[int] = None) -> dict:
+        """Return a copy of ``plan`` with one meal, or all of one day, drawn again.
+
+        ``day`` and ``slot`` index DAYS and MEAL_TIMES. Every other meal is
+        kept and new meals are distinct from all meals in the week, including
+        the ones replaced. For a plan with a calorie goal pass ``calories``:
+        a new meal then comes from those that keep its day within tolerance
+        (the closest one if none do), found by bisecting, and a new day is
+        chosen as optimize chooses one. Otherwise meals are drawn at random.
+        Either way a swap takes a few draws rather than a new week.
+        """
+        rng = random.Random(seed)
+        days = [dict(d, meals=[dict(meal) for meal in d["meals"]]) for d in plan["days"]]
+        plan = dict(plan, days=days)
+        used = {meal["id"] for d in days for meal in d["meals"]}
+        target = days[day]
+        goal = plan.get("calorie_goal")
+        balanced = goal is not None and calories is not None
+        tolerance = plan.get("tolerance", DEFAULT_TOLERANCE)
+
+        if slot is not None:
+            if balanced:
+                rest = sum(meal["calories"] or 0 for i, meal in enumerate(target["meals"]) if i != slot)
+                meal_id = self._balanced_meal(calories, goal - rest, goal * tolerance, used, rng)
+                new = dict(self.pool[meal_id], calories=round(calories[meal_id]))
+            else:
+                new = dict(self.pool[self._random_meal(used, rng)])
+            target["meals"][slot] = dict(new, slot=MEAL_TIMES[slot])
+        elif balanced:
+            values, ids = self._rank(calories)
+            free = [k for k, meal_id in enumerate(ids) if meal_id not in used]
+            if len(free) < len(MEAL_TIMES):
+                raise MealPlanError("No unused meals with calorie estimates are left to choose from.")
+            free_values = [values[k] for k in free]
+            picked = _closest_day(free_values, goal, goal * (1 - tolerance), goal * (1 + tolerance), rng)
+            meals = sorted((free_values[k], ids[free[k]]) for k in picked)
+            target["meals"] = [dict(self.pool[meal_id], slot=time, calories=round(value))
+                               for time, (value, meal_id) in zip(MEAL_TIMES, meals)]
+        else:
+            for i, time in enumerate(MEAL_TIMES):
+                meal_id = self._random_meal(used, rng)
+                used.add(meal_id)
+                target["meals"][i] = dict(self.pool[meal_id], slot=time)
+
+        if "calories" in target:
+            total = sum(meal.get("calories") or 0 for meal in target["meals"])
+            target["calories"] = round(total)
+            target["within_tolerance"] = goal * (1 - tolerance) <= total <= goal * (1 + tolerance)
+        return plan
+
+    def _random_meal(self, used: set, rng: random.Random) -> str:
+        if len(self._ids) <= len(used):
+            raise MealPlanError("No unused meals are left to choose from.")
+        # The week uses at most 21 meals, so a draw rarely has to be repeated
+        while True:
+            meal_id = self._ids[rng.randrange(len(self._ids))]
+            if meal_id not in used:
+                return meal_id
+
+    def _balanced_meal(self, calories: Dict[str, float], want: float, slack: float,
+                       used: set, rng: random.Random) -> str:
+        """An unused meal within ``slack`` kcal of ``want``, or the closest unused one."""
+        values, ids = self._rank(calories)
+        start, end = bisect_left(values, want - slack), bisect_right(values, want + slack)
+        if end - start > len(used):
+            while True:
+                k = rng.randrange(start, end)
+                if ids[k] not in used:
+                    return ids[k]
+        fitting = [ids[k] for k in range(start, end) if ids[k] not in used]
+        if fitting:
+            return rng.choice(fitting)
+        # Walk outwards from where want would sit; at most len(used) steps are skipped
+        below, above = start - 1, end
+        while below >= 0 and ids[below] in used:
+            below -= 1
+        while above < len(values) and ids[above] in used:
+            above += 1
+        candidates = [k for k in (below, above) if 0 <= k < len(values)]
+        if not candidates:
+            raise MealPlanError("No unused meals with calorie estimates are left to choose from.")
+        return ids[min(candidates, key=lambda k: abs(values[k] - want))]
+
+    def _rank(self, calories: Dict[str, float]) -> tuple:
+        """(values, ids) for the pool's meals with an estimate, sorted by calories.
+
+        The sort is kept for the last ``calories`` mapping seen, so planning
+        many users against one mapping sorts once. Both it and the returned
+        lists are shared: treat them as read-only.
+        """
+        if self._ranked is None or self._ranked[0] is not calories:
+            ranked = sorted((calories[meal_id], meal_id) for meal_id in self._ids if calories.get(meal_id))
+            self._ranked = (calories, [value for value, _ in ranked], [meal_id for _, meal_id in ranked])
+        return self._ranked[1], self._ranked[2]
+
+
+class CandidateIndex:
+    """Bitsets over a planner's pool, for finding a user's eligible meals
+    with a few integer operations instead of checking meal by meal.
+
+    Bit k stands for the planner's k-th meal. There is one bitset per
+    category and one per ingredient key (see nutrition.ingredient_key) and
+    per run of its words, so excluding "pork" also excludes "pork chop".
+    The planner for each eligible set is built once and reused, so users
+    with the same preferences share it and its calorie sort.
+    """
+
+    def __init__(self, planner: MealPlanner, ingredients: Optional[Dict[str, Iterable[str]]] = None):
+        self.planner = planner
+        self.all = (1 << len(planner._ids)) - 1
+        self.categories: Dict[str, int] = {}
+        self.ingredients: Dict[str, int] = {}
+        ingredients = ingredients or {}
+        for k, meal_id in enumerate(planner._ids):
+            bit = 1 << k
+            category = planner.pool[meal_id]["category"]
+            self.categories[category] = self.categories.get(category, 0) | bit
+            keys = set()
+            for name in ingredients.get(meal_id, ()):
+                words = ingredient_key(name).split()
+                keys.update(" ".join(words[i:j]) for i in range(len(words)) for j in range(i + 1, len(words) + 1))
+            for key in keys:
+                self.ingredients[key] = self.ingredients.get(key, 0) | bit
+        self._planners = {self.all: planner}
+
+    def mask(self, preferences: Optional[dict]) -> int:
+        """Bitset of the meals a DietaryPreferences record allows."""
+        if not preferences:
+            return self.all
+        allowed = preferences.get("allowed categories")
+        mask = self.all
+        if allowed:
+            mask = 0
+            for category in allowed:
+                mask |= self.categories.get(category, 0)
+        for category in preferences.get("excluded categories") or ():
+            mask &= ~self.categories.get(category, 0)
+        for name in preferences.get("excluded ingredients") or ():
+            mask &= ~self.ingredients.get(ingredient_key(name), 0)
+        return mask
+
+    def planner_for(self, preferences: Optional[dict]) -> MealPlanner:
+        """The planner restricted to the meals ``preferences`` allow."""
+        mask = self.mask(preferences)
+        planner = self._planners.get(mask)
+        if planner is None:
+            if len(self._planners) > MAX_RESTRICTED_PLANNERS:
+                # Drop the oldest restricted planner, never the full one
+                del self._planners[next(key for key in self._planners if key != self.all)]
+            ids = self.planner._ids
+            # bin() lists bits most significant first; reversed, position k is bit k
+            bits = bin(mask)[:1:-1]
+            planner = self._planners[mask] = self.planner.subset(
+                ids[k] for k, bit in enumerate(bits) if bit == "1")
+        return planner
+
+
+def _nearest(values: List[float], target: float, exclude: tuple) -> int:
+    """Index of the value closest to target, skipping the excluded indexes."""
+    i = bisect_left(values, target)
+    below, above = i - 1, i
+    while below in exclude:
+        below -= 1
+    while above in exclude:
+        above += 1
+    candidates = [k for k in (below, above) if 0 <= k < len(values)]
+    return min(candidates, key=lambda k: abs(values[k] - target))
+
+def _closest_day(values: List[float], goal: float, low: float, high: float, rng: random.Random) -> tuple:
+    """Pick three distinct indexes into sorted ``values`` summing into [low, high],
+    or as close to goal as the search gets."""
+    best, best_error = None, None
+    for _ in range(ATTEMPTS):
+        a, b = rng.sample(range(len(values)), 2)
+        c = _nearest(values, goal - values[a] - values[b], (a, b))
+        total = values[a] + values[b] + values[c]
+        if low <= total <= high:
+            return a, b, c
+        error = abs(total - goal)
+        if best is None or error < best_error:
+            best, best_error = (a, b, c), error
+
+    if len(values) <= EXACT_SEARCH_LIMIT:
+        # Closest three-sum: fix the smallest, then walk two pointers inwards
+        for a in range(len(values) - 2):
+            b, c = a + 1, len(values) - 1
+            while b < c:
+                total = values[a] + values[b] + values[c]
+                error = abs(total - goal)
+                if error < best_error:
+                    best, best_error = (a, b, c), error
+                if total < goal:
+                    b += 1
+                elif total > goal:
+                    c -= 1
+                else:
+                    return a, b, c
+    return best
@@ -0,0 +1,116 @@
+"""Stored weekly meal plans.
+
+A plan is one meal_plans row per user and week plus its 21
+meal_plan_items rows. The meal's name, category, image and calories are
+copied into each item so that a stored plan reads back without the
+catalog. Saving a plan for a week that already has one replaces it.
+
+A stored plan is reused until the week rolls over, the user's calorie
+target changes or their dietary preferences do: Goals.set_calorie_goal
+and DietaryPreferences.set_preferences call discard_plans in the same
+transaction as their own write.
+"""
+import zlib
+from datetime import date, timedelta
+from typing import Iterable, Optional, Tuple
+
+from db import Repository, open_database
+from meal_planner import DAYS, MEAL_TIMES
+from metrics import timed
+
+database = "database/health_tracker.db"
+
+
+def week_start(day: Optional[date] = None) -> str:
+    """The Monday starting the week that contains ``day`` (default today), as YYYY-MM-DD."""
+    day = day or date.today()
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+def plan_seed(username: str, week: str) -> int:
+    """The seed for a user's plan for a week, so regenerating it gives the same plan."""
+    return zlib.crc32(f"{username}/{week}".encode())
+
+def discard_plans(cursor, username: str, keep_goal: Optional[float] = None):
+    """Delete the user's plans from this week on, except those made for
+    ``keep_goal`` when given. Earlier weeks are kept as history."""
+    stale = "SELECT id FROM meal_plans WHERE username = ? AND week_start >= ?"
+    params = (username, week_start())
+    if keep_goal is not None:
+        stale += " AND calorie_goal IS NOT ?"
+        params += (keep_goal,)
+    cursor.execute(f"DELETE FROM meal_plan_items WHERE plan_id IN ({stale})", params)
+    cursor.execute(f"DELETE FROM meal_plans WHERE id IN ({stale})", params)
+
+
+class MealPlanStore(Repository):
+    def __init__(self, db_path: str = "database/health_tracker.db"):
+        self.database = db_path
+        self.db = open_database(self.database)
+
+    def save_plans(self, plans: Iterable[Tuple[str, dict]], week: Optional[str] = None) -> int:
+        """Store (username, plan) pairs for a week in one transaction.
+
+        ``plan`` is a MealPlanner plan. Returns the number of plans stored.
+        """
+        plans = list(plans)
+        if plans:
+            self._write(self._write_plans, week or week_start(), plans)
+        return len(plans)
+
+    def save_plan(self, username: str, plan: dict, week: Optional[str] = None):
+        self.save_plans([(username, plan)], week)
+
+    @timed()
+    def get_plan(self, username: str, week: Optional[str] = None) -> Optional[dict]:
+        """Return the user's stored plan for a week (default: this week), or None.
+
+        The plan has the shape MealPlanner builds, plus ``week``. One query
+        reads it, through the (username, week_start) index.
+        """
+        week = week or week_start()
+        rows = self.conn.execute("""
+            SELECT p.calorie_goal, p.seed, p.tolerance, i.day, i.slot, i.meal_id, i.name, i.category, i.image, i.calories
+            FROM meal_plans p JOIN meal_plan_items i ON i.plan_id = p.id
+            WHERE p.username = ? AND p.week_start = ?
+            ORDER BY i.day, i.slot
+        """, (username, week)).fetchall()
+        if not rows:
+            return None
+        calorie_goal, seed, tolerance = rows[0][:3]
+        days = [{"day": day, "meals": []} for day in DAYS]
+        for _, _, _, day, slot, meal_id, name, category, image, calories in rows:
+            days[day]["meals"].append({"id": meal_id, "name": name, "category": category, "image": image,
+                                       "slot": MEAL_TIMES[slot], "calories": calories})
+        if calorie_goal is not None:
+            low, high = calorie_goal * (1 - tolerance), calorie_goal * (1 + tolerance)
+            for day in days:
+                total = sum(meal["calories"] or 0 for meal in day["meals"])
+                day["calories"] = round(total)
+                day["within_tolerance"] = low <= total <= high
+        return {"calorie_goal": calorie_goal, "seed": seed, "tolerance": tolerance, "week": week, "days": days}
+
+    def _write_plans(self, cursor, week: str, plans: list):
+        items = []
+        for username, plan in plans:
+            cursor.execute("""
+                DELETE FROM meal_plan_items WHERE plan_id =
+                    (SELECT id FROM meal_plans WHERE username = ? AND week_start = ?)
+            """, (username, week))
+            cursor.execute("DELETE FROM meal_plans WHERE username = ? AND week_start = ?", (username, week))
+            cursor.execute("""
+                INSERT INTO meal_plans (username, week_start, calorie_goal, seed, tolerance)
+                VALUES (?, ?, ?, ?, ?)
+            """, (username, week, plan.get("calorie_goal"), plan["seed"], plan.get("tolerance")))
+            plan_id = cursor.lastrowid
+            for day_index, day in enumerate(plan["days"]):
+                for slot_index, meal in enumerate(day["meals"]):
+                    items.append((plan_id, day_index, slot_index, meal["id"], meal.get("name"),
+                                  meal.get("category"), meal.get("image"), meal.get("calories")))
+        cursor.executemany("""
+            INSERT INTO meal_plan_items (plan_id, day, slot, meal_id, name, category, image, calories)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, items)
+
+    def close(self):
+        """Release the shared database connection."""
+        self._release()
@@ -0,0 +1,357 @@
+"""Opt-in instrumentation for the tracker's hot paths.
+
+Nothing is recorded until enable() is called, or until the
+HEALTH_TRACKER_METRICS environment variable names a file (see
+configure_from_env). While disabled, an instrumented method costs one
+flag check and the database uses plain sqlite3 connections.
+
+While enabled the registry collects:
+
+- a latency histogram per operation: every method decorated with
+  @timed, e.g. UserInformation.login or generate_and_display_meal_plan;
+- SQL statements and rows read/written per operation. Statements are
+  counted by SQLite's trace hook, so BEGIN and COMMIT count too. An
+  operation's numbers include those of operations it calls, and SQL run
+  outside any operation is reported under operation="none";
+- HTTP requests, errors, response bytes and latency per host, for the
+  meal API;
+- the service's request latency per route and status.
+
+Only connections opened while enabled are instrumented, so enable before
+opening the database. The registry exports as Prometheus text (write(),
+serve(), or the service's /metrics endpoint) or as a JSON snapshot.
+"""
+import atexit
+import bisect
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+PREFIX = "health_tracker_"
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+OPERATION_SECONDS = "operation_seconds"
+SQL_STATEMENTS = "sql_statements_total"
+SQL_ROWS_READ = "sql_rows_read_total"
+SQL_ROWS_WRITTEN = "sql_rows_written_total"
+HTTP_REQUESTS = "http_requests_total"
+HTTP_ERRORS = "http_request_errors_total"
+HTTP_BYTES = "http_response_bytes_total"
+HTTP_SECONDS = "http_request_seconds"
+SERVER_SECONDS = "server_request_seconds"
+
+# Index of each SQL counter in an operation's frame
+_SQL_COUNTERS = (SQL_STATEMENTS, SQL_ROWS_READ, SQL_ROWS_WRITTEN)
+
+_enabled = False
+_local = threading.local()
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as Prometheus exposes it."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> dict:
+        """Plain-data copy: counters by name and label string, histograms
+        with count, sum, and approximate p50/p95/p99 in seconds."""
+        with self._lock:
+            counters = {}
+            for (name, labels), value in sorted(self.counters.items()):
+                counters.setdefault(name, {})[_label_text(labels)] = value
+            histograms = {}
+            for (name, labels), h in sorted(self.histograms.items()):
+                histograms.setdefault(name, {})[_label_text(labels)] = {
+                    "count": h.count, "sum": h.sum,
+                    "p50": h.quantile(0.5), "p95": h.quantile(0.95), "p99": h.quantile(0.99),
+                }
+        return {"counters": counters, "histograms": histograms}
+
+    def prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            by_name = {}
+            for (name, labels), value in self.counters.items():
+                by_name.setdefault(name, []).append((labels, value))
+            for name in sorted(by_name):
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                for labels, value in sorted(by_name[name]):
+                    lines.append(f"{PREFIX}{name}{_label_text(labels)} {_number(value)}")
+
+            by_name = {}
+            for (name, labels), h in self.histograms.items():
+                by_name.setdefault(name, []).append((labels, h))
+            for name in sorted(by_name):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for labels, h in sorted(by_name[name], key=lambda item: item[0]):
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + (float("inf"),), h.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{PREFIX}{name}_bucket{_label_text(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{PREFIX}{name}_sum{_label_text(labels)} {_number(h.sum)}")
+                    lines.append(f"{PREFIX}{name}_count{_label_text(labels)} {h.count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _label_text(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+registry = Registry()
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def enabled() -> bool:
+    return _enabled
+
+def inc(name: str, amount: float = 1, **labels):
+    """Add to a counter in the shared registry; a no-op while disabled."""
+    if _enabled:
+        registry.inc(name, amount, **labels)
+
+def observe(name: str, value: float, **labels):
+    if _enabled:
+        registry.observe(name, value, **labels)
+
+
+# Operations
+
+def _stack() -> list:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Decorate a function or method to record its latency and SQL use as
+    one operation, named after its qualified name by default."""
+    def decorate(func: Callable) -> Callable:
+        operation = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            return _run(operation, func, args, kwargs)
+        return wrapper
+    return decorate
+
+def _run(operation: str, func: Callable, args: tuple, kwargs: dict):
+    stack = _stack()
+    frame = [0, 0, 0]
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        stack.pop()
+        if stack:
+            # Callers' totals include their callees'
+            parent = stack[-1]
+            for i, value in enumerate(frame):
+                parent[i] += value
+        registry.observe(OPERATION_SECONDS, elapsed, operation=operation)
+        for counter, value in zip(_SQL_COUNTERS, frame):
+            if value:
+                registry.inc(counter, value, operation=operation)
+
+def _count_sql(index: int, amount: int):
+    if not _enabled or amount <= 0:
+        return
+    stack = _stack()
+    if stack:
+        stack[-1][index] += amount
+    else:
+        registry.inc(_SQL_COUNTERS[index], amount, operation="none")
+
+
+# SQL
+
+class _Cursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        super().execute(sql, parameters)
+        _count_sql(2, self.rowcount)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        super().executemany(sql, seq_of_parameters)
+        _count_sql(2, self.rowcount)
+        return self
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            _count_sql(1, 1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        _count_sql(1, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        _count_sql(1, len(rows))
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        _count_sql(1, 1)
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection that reports its statements and rows to the registry."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_trace_callback(_trace)
+
+    def cursor(self, factory=_Cursor):
+        return super().cursor(factory)
+
+    # Connection.execute would create a plain cursor and bypass the counts
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def _trace(statement: str):
+    _count_sql(0, 1)
+
+def connection_factory() -> type:
+    """The connection class for sqlite3.connect(factory=...)."""
+    return InstrumentedConnection if _enabled else sqlite3.Connection
+
+
+# HTTP
+
+def record_response(response, *args, **kwargs):
+    """requests response hook: count the request, its bytes and latency."""
+    if not _enabled:
+        return
+    host = urlsplit(response.url).netloc
+    registry.inc(HTTP_REQUESTS, host=host, status=str(response.status_code))
+    registry.inc(HTTP_BYTES, len(response.content), host=host)
+    registry.observe(HTTP_SECONDS, response.elapsed.total_seconds(), host=host)
+
+
+# Export
+
+def write(path: str):
+    """Write the registry to a file: JSON if the name ends in .json,
+    otherwise Prometheus text (suitable for a textfile collector)."""
+    text = json.dumps(registry.snapshot(), indent=2) if path.endswith(".json") else registry.prometheus()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Replace atomically so a scraper never reads half a file
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+def serve(port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve GET /metrics in Prometheus text format from a daemon thread.
+    Call shutdown() on the returned server to stop it."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def configure_from_env() -> Optional[str]:
+    """Enable metrics if HEALTH_TRACKER_METRICS names a file, and write
+    them there when the process exits. Returns the path, or None."""
+    path = os.environ.get("HEALTH_TRACKER_METRICS")
+    if path:
+        enable()
+        atexit.register(write, path)
+    return path or None
@@ -0,0 +1,268 @@
+import sqlite3
+
+# Tables as they existed before versioned migrations; IF NOT EXISTS lets
+# older databases adopt version 1 without being rebuilt.
+BASELINE_TABLES = {
+    "users": """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            first_name TEXT,
+            last_name TEXT,
+            year_of_birth INTEGER,
+            gender TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    "health_data": """
+        CREATE TABLE IF NOT EXISTS health_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            weight REAL NOT NULL,
+            height REAL NOT NULL,
+            bmi REAL,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    """,
+    "workout_status": """
+        CREATE TABLE IF NOT EXISTS workout_status (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            workout_days_per_week INTEGER NOT NULL,
+            duration_per_day REAL NOT NULL,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    """,
+    "user_goals": """
+        CREATE TABLE IF NOT EXISTS user_goals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            goal TEXT NOT NULL,
+            bmr REAL NOT NULL,
+            calorie_intake REAL NOT NULL,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    """,
+    "meal_catalog": """
+        CREATE TABLE IF NOT EXISTS meal_catalog (
+            category TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            fetched_at REAL NOT NULL
+        )
+    """,
+}
+
+# Tables holding one row per user, looked up and upserted by username
+PER_USER_TABLES = ("health_data", "workout_status", "user_goals")
+
+
+def _create_baseline_tables(conn: sqlite3.Connection):
+    for ddl in BASELINE_TABLES.values():
+        conn.execute(ddl)
+
+def _add_username_indexes(conn: sqlite3.Connection):
+    """Give each per-user table a UNIQUE index on username.
+
+    Older databases may hold several rows for a user (two racing
+    SELECT-then-INSERT calls); all but the newest row are deleted first.
+    """
+    for table in PER_USER_TABLES:
+        conn.execute(f"""
+            DELETE FROM {table}
+            WHERE id NOT IN (SELECT MAX(id) FROM {table} GROUP BY username)
+        """)
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_username ON {table}(username)")
+
+
+def _add_history_tables(conn: sqlite3.Connection):
+    """Append-only history for measurements and workouts.
+
+    health_data and workout_status stay as one-row-per-user snapshots of the
+    latest entry. recorded_at has millisecond precision so entries made in
+    the same second still sort in order, and TEXT affinity so range bounds
+    like '2024' compare as strings. Existing snapshots are copied in as
+    each user's first history entry.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS health_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            weight REAL NOT NULL,
+            height REAL NOT NULL,
+            bmi REAL,
+            recorded_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_health_history_user_time
+        ON health_history(username, recorded_at)
+    """)
+    conn.execute("""
+        INSERT INTO health_history (username, weight, height, bmi, recorded_at)
+        SELECT username, weight, height, bmi, last_updated FROM health_data
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS workout_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            workout_days_per_week INTEGER NOT NULL,
+            duration_per_day REAL NOT NULL,
+            recorded_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_workout_history_user_time
+        ON workout_history(username, recorded_at)
+    """)
+    conn.execute("""
+        INSERT INTO workout_history (username, workout_days_per_week, duration_per_day, recorded_at)
+        SELECT username, workout_days_per_week, duration_per_day, last_updated FROM workout_status
+    """)
+
+
+def _add_sessions_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            token_hash TEXT PRIMARY KEY,
+            username TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions(expires_at)")
+
+def _add_dirty_goals_table(conn: sqlite3.Connection):
+    # Users whose stored calorie target no longer matches their inputs
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dirty_goals (
+            username TEXT PRIMARY KEY,
+            marked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Lets the batch job find goals computed before the current year
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_goals_last_updated ON user_goals(last_updated)")
+
+def _add_meal_details_table(conn: sqlite3.Connection):
+    # lookup.php records (with ingredients) keyed by TheMealDB meal id
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS meal_details (
+            meal_id TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            fetched_at REAL NOT NULL
+        )
+    """)
+
+def _add_meal_plan_tables(conn: sqlite3.Connection):
+    # One plan per user and week (week_start is that Monday's date)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS meal_plans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            week_start TEXT NOT NULL,
+            calorie_goal REAL,
+            seed INTEGER NOT NULL,
+            tolerance REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (username, week_start),
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    """)
+    # day and slot index DAYS and MEAL_TIMES; meal fields are copied so a
+    # stored plan reads back without the catalog
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS meal_plan_items (
+            plan_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            slot INTEGER NOT NULL,
+            meal_id TEXT NOT NULL,
+            name TEXT,
+            category TEXT,
+            image TEXT,
+            calories REAL,
+            PRIMARY KEY (plan_id, day, slot),
+            FOREIGN KEY (plan_id) REFERENCES meal_plans(id)
+        )
+    """)
+
+def _add_dietary_preferences_table(conn: sqlite3.Connection):
+    # JSON lists; a NULL allowed_categories allows every category
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dietary_preferences (
+            username TEXT PRIMARY KEY,
+            allowed_categories TEXT,
+            excluded_categories TEXT NOT NULL DEFAULT '[]',
+            excluded_ingredients TEXT NOT NULL DEFAULT '[]',
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    """)
+
+
+# (version, description, function). Append only: never renumber or edit a
+# migration that has shipped.
+MIGRATIONS = [
+    (1, "baseline tables", _create_baseline_tables),
+    (2, "unique username indexes", _add_username_indexes),
+    (3, "measurement and workout history", _add_history_tables),
+    (4, "login sessions", _add_sessions_table),
+    (5, "dirty goal tracking", _add_dirty_goals_table),
+    (6, "meal details", _add_meal_details_table),
+    (7, "stored meal plans", _add_meal_plan_tables),
+    (8, "dietary preferences", _add_dietary_preferences_table),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """Return the schema version of a database, 0 if it was never migrated."""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply every pending migration and return the resulting version.
+
+    On an up-to-date database this is a single indexed query. Otherwise all
+    pending migrations run in one write transaction, so a failure leaves
+    the database at its old version and a concurrent process waits for the
+    upgrade instead of repeating it.
+    """
+    if current_version(conn) >= LATEST_VERSION:
+        return LATEST_VERSION
+
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Re-read under the write lock in case another process just upgraded
+        version = current_version(conn)
+        for number, description, apply in MIGRATIONS:
+            if number > version:
+                apply(conn)
+                conn.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                    (number, description),
+                )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return LATEST_VERSION
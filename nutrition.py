@@ -0,0 +1,182 @@
+"""Calorie estimates for TheMealDB recipes from a local ingredient table.
+
+A recipe lists up to 20 ingredients (strIngredient1..20), each with a
+free-text measure such as "200g", "1 1/2 cups", "2 tbsp" or "3". A measure
+is converted to grams: units go through UNIT_GRAMS, and bare counts use
+the ingredient's weight per piece. The grams are then multiplied by the
+ingredient's energy density from INGREDIENTS. Volumes are treated as
+water-dense, and ingredients missing from the table count as zero, so
+figures are estimates good enough to balance a day's meals. Most
+TheMealDB recipes serve four, so totals are divided by SERVINGS.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+SERVINGS = 4
+DEFAULT_PIECE_GRAMS = 100
+
+# ingredient -> (kcal per 100 g, grams per piece or None)
+INGREDIENTS = {
+    # Meat and fish
+    "chicken": (215, 1500), "chicken breast": (165, 170), "chicken thigh": (209, 110),
+    "chicken leg": (190, 200), "chicken wing": (203, 90), "beef": (250, None),
+    "minced beef": (254, None), "ground beef": (254, None), "beef brisket": (250, None),
+    "steak": (271, 225), "lamb": (282, None), "lamb mince": (282, None), "pork": (242, None),
+    "pork chop": (231, 180), "bacon": (541, 15), "sausage": (301, 75), "chorizo": (455, None),
+    "ham": (145, 30), "salmon": (208, 150), "cod": (82, 150), "white fish": (90, 150),
+    "tuna": (132, None), "prawn": (99, 12), "king prawn": (99, 20), "mussel": (86, 10),
+    # Eggs and dairy
+    "egg": (143, 50), "egg yolk": (322, 17), "egg white": (52, 33), "butter": (717, None),
+    "unsalted butter": (717, None), "milk": (61, None), "double cream": (467, None),
+    "heavy cream": (340, None), "single cream": (193, None), "cream": (340, None),
+    "sour cream": (198, None), "creme fraiche": (292, None), "yogurt": (61, None),
+    "greek yogurt": (97, None), "cheese": (400, None), "cheddar cheese": (403, None),
+    "parmesan": (431, None), "parmesan cheese": (431, None), "mozzarella": (280, 125),
+    "feta": (264, None), "cream cheese": (342, None),
+    # Oils and fats
+    "olive oil": (884, None), "vegetable oil": (884, None), "sunflower oil": (884, None),
+    "oil": (884, None), "coconut oil": (862, None), "sesame seed oil": (884, None),
+    "sesame oil": (884, None),
+    # Starches and grains
+    "rice": (360, None), "basmati rice": (360, None), "long grain rice": (365, None),
+    "arborio risotto rice": (350, None), "pasta": (371, None), "spaghetti": (371, None),
+    "penne rigate": (371, None), "penne": (371, None), "lasagne sheet": (371, 20),
+    "egg noodle": (384, None), "noodle": (138, None), "rice noodle": (364, None),
+    "flour": (364, None), "plain flour": (364, None), "self-raising flour": (350, None),
+    "bread": (265, 30), "breadcrumb": (395, None), "tortilla": (310, 40), "potato": (77, 170),
+    "sweet potato": (86, 130), "couscous": (376, None), "oat": (389, None),
+    # Vegetables and fruit
+    "onion": (40, 110), "red onion": (40, 110), "spring onion": (32, 15), "shallot": (72, 25),
+    "garlic": (149, 5), "garlic clove": (149, 5), "ginger": (80, 15), "tomato": (18, 120),
+    "cherry tomato": (18, 17), "chopped tomato": (21, None), "tomato puree": (82, None),
+    "passata": (24, None), "carrot": (41, 60), "celery": (16, 40), "red pepper": (31, 120),
+    "green pepper": (20, 120), "yellow pepper": (27, 120), "bell pepper": (31, 120),
+    "mushroom": (22, 18), "spinach": (23, None), "pea": (81, None), "broccoli": (34, 300),
+    "courgette": (17, 200), "zucchini": (17, 200), "aubergine": (25, 300), "eggplant": (25, 300),
+    "cabbage": (25, 900), "lettuce": (15, 300), "cucumber": (15, 300), "avocado": (160, 150),
+    "lemon": (29, 60), "lime": (30, 45), "lemon juice": (22, None), "lime juice": (25, None),
+    "chilli": (40, 15), "green chilli": (40, 15), "red chilli": (40, 15), "apple": (52, 180),
+    "banana": (89, 120), "sweetcorn": (86, None), "leek": (61, 90), "cauliflower": (25, 600),
+    # Pulses, nuts and seeds
+    "chickpea": (164, None), "kidney bean": (127, None), "black bean": (132, None),
+    "lentil": (116, None), "red lentil": (116, None), "tofu": (76, None),
+    "peanut": (567, None), "peanut butter": (588, None), "almond": (579, 1.2),
+    "cashew nut": (553, 1.5), "coconut": (354, None), "desiccated coconut": (660, None),
+    "coconut milk": (197, None), "sesame seed": (573, None),
+    # Sauces, sweeteners and liquids
+    "soy sauce": (53, None), "fish sauce": (35, None), "worcestershire sauce": (78, None),
+    "oyster sauce": (51, None), "mayonnaise": (680, None), "ketchup": (112, None),
+    "mustard": (66, None), "dijon mustard": (66, None), "vinegar": (18, None),
+    "red wine": (85, None), "white wine": (82, None), "sugar": (387, None),
+    "caster sugar": (387, None), "brown sugar": (380, None), "honey": (304, None),
+    "maple syrup": (260, None), "dark chocolate": (546, None), "cocoa": (228, None),
+    "stock": (5, None), "chicken stock": (5, None), "beef stock": (5, None),
+    "vegetable stock": (5, None), "fish stock": (5, None), "stock cube": (250, 10),
+    "water": (0, None), "salt": (0, None),
+    # Herbs and spices (small amounts, but listed so they are not "unknown")
+    "pepper": (251, None), "black pepper": (251, None), "parsley": (36, None),
+    "coriander": (23, None), "basil": (23, None), "thyme": (101, None), "oregano": (265, None),
+    "rosemary": (131, None), "cumin": (375, None), "paprika": (282, None),
+    "chilli powder": (282, None), "cinnamon": (247, None), "curry powder": (325, None),
+    "garam masala": (379, None), "turmeric": (312, None), "bay leaf": (313, 0.2),
+}
+
+UNIT_GRAMS = {
+    "g": 1, "gr": 1, "gram": 1, "kg": 1000, "mg": 0.001, "ml": 1, "cl": 10, "dl": 100,
+    "l": 1000, "litre": 1000, "liter": 1000, "oz": 28.35, "ounce": 28.35, "lb": 453.6,
+    "pound": 453.6, "cup": 240, "tbsp": 15, "tbs": 15, "tblsp": 15, "tablespoon": 15,
+    "tsp": 5, "teaspoon": 5, "pinch": 0.5, "dash": 0.5, "handful": 30, "clove": 5,
+    "slice": 30, "can": 400, "tin": 400, "stick": 113, "knob": 15, "bunch": 50, "sprig": 1,
+}
+
+_FRACTIONS = {"½": " 1/2", "⅓": " 1/3", "⅔": " 2/3", "¼": " 1/4", "¾": " 3/4", "⅛": " 1/8"}
+# An amount ("1 1/2", "3/4", "0.5", "2"; a range "2-3" counts as its low end) and its unit
+_QUANTITY = re.compile(r"(\d+\s+\d+/\d+|\d+/\d+|\d*\.\d+|\d+)(?:\s*-\s*[\d./]+)?\s*([a-z]*)")
+
+
+def _singular(word: str) -> str:
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+def _normalize(name: str) -> str:
+    words = re.sub(r"[^a-z\s-]", " ", name.lower()).split()
+    return " ".join(_singular(word) for word in words)
+
+_TABLE = {_normalize(name): values for name, values in INGREDIENTS.items()}
+
+def ingredient_key(name: str) -> str:
+    """Normalised ingredient name: lower case, singular ("Chicken Thighs" -> "chicken thigh")."""
+    return _normalize(name)
+
+
+@lru_cache(maxsize=4096)
+def lookup_ingredient(name: str) -> Optional[tuple]:
+    """(kcal per 100 g, grams per piece) for an ingredient, or None.
+
+    Leading words are dropped until something matches, so "boneless
+    chicken thighs" falls back to "chicken thigh".
+    """
+    words = _normalize(name).split()
+    for start in range(len(words)):
+        values = _TABLE.get(" ".join(words[start:]))
+        if values:
+            return values
+    return None
+
+def parse_grams(measure: str, piece_grams: Optional[float] = None) -> float:
+    """Convert a free-text measure to grams; 0 when it has no amount ("to taste")."""
+    text = (measure or "").lower()
+    for symbol, replacement in _FRACTIONS.items():
+        text = text.replace(symbol, replacement)
+    match = _QUANTITY.search(text)
+    if match:
+        quantity = sum(float(part.split("/")[0]) / float(part.split("/")[1]) if "/" in part else float(part)
+                       for part in match.group(1).split())
+        unit = _singular(match.group(2))
+    else:
+        words = text.split()
+        quantity, unit = 1.0, _singular(words[0]) if words else ""
+        if unit not in UNIT_GRAMS:
+            return 0.0
+    if unit in UNIT_GRAMS:
+        return quantity * UNIT_GRAMS[unit]
+    return quantity * (piece_grams or DEFAULT_PIECE_GRAMS)
+
+def ingredients(meal: dict) -> Iterable[tuple]:
+    """(ingredient, measure) pairs from a TheMealDB lookup.php record."""
+    for i in range(1, 21):
+        name = (meal.get(f"strIngredient{i}") or "").strip()
+        if name:
+            yield name, (meal.get(f"strMeasure{i}") or "").strip()
+
+def estimate_calories(meal: dict, servings: int = SERVINGS) -> Optional[float]:
+    """Estimated kcal per serving, or None if no ingredient is recognised."""
+    total = 0.0
+    known = False
+    for name, measure in ingredients(meal):
+        values = lookup_ingredient(name)
+        if values is None:
+            continue
+        known = True
+        kcal_per_100g, piece_grams = values
+        total += parse_grams(measure, piece_grams) * kcal_per_100g / 100
+    return round(total / servings) if known else None
+
+def meal_ingredients(details: Dict[str, dict]) -> Dict[str, list]:
+    """Map meal ids to their ingredient names."""
+    return {meal_id: [name for name, _ in ingredients(meal)] for meal_id, meal in details.items() if meal}
+
+def meal_calories(details: Dict[str, dict]) -> Dict[str, float]:
+    """Map meal ids to kcal per serving, leaving out meals with no estimate."""
+    calories = {}
+    for meal_id, meal in details.items():
+        estimate = estimate_calories(meal) if meal else None
+        if estimate:
+            calories[meal_id] = estimate
+    return calories
@@ -0,0 +1,91 @@
+"""Versioned, salted password hashes.
+
+Hashes are stored as ``scrypt$<cost>$<r>$<p>$<salt hex>$<hash hex>`` where
+cost is log2 of the scrypt N parameter. Accounts created before this format
+hold a bare 64-character unsalted SHA-256 hex digest; those still verify,
+and are reported as needing a rehash so login can upgrade them.
+
+Verification is deliberately expensive, so it runs on a bounded worker
+pool: hashlib releases the GIL while hashing, letting concurrent logins use
+every core without oversubscribing the machine.
+"""
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+SCHEME = "scrypt"
+DEFAULT_COST = 14  # N = 2**14, about 16 MB and tens of ms per hash
+BLOCK_SIZE = 8
+PARALLELISM = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+def _scrypt(password: str, salt: bytes, cost: int, r: int, p: int) -> bytes:
+    n = 2 ** cost
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r * p + (1 << 20), dklen=KEY_BYTES)
+
+def hash_password(password: str, cost: int = DEFAULT_COST) -> str:
+    """Hash a password with a fresh random salt."""
+    salt = os.urandom(SALT_BYTES)
+    key = _scrypt(password, salt, cost, BLOCK_SIZE, PARALLELISM)
+    return f"{SCHEME}${cost}${BLOCK_SIZE}${PARALLELISM}${salt.hex()}${key.hex()}"
+
+def legacy_hash(password: str) -> str:
+    """The original unsalted SHA-256 format."""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def is_legacy_hash(stored: str) -> bool:
+    return "$" not in stored and len(stored) == 64
+
+def verify_password(password: str, stored: str, cost: int = DEFAULT_COST) -> Tuple[bool, bool]:
+    """Check a password against a stored hash.
+
+    Returns (matches, needs_rehash). needs_rehash is True when the password
+    matched but the stored hash uses the legacy format or a different cost.
+    """
+    if is_legacy_hash(stored):
+        matches = hmac.compare_digest(legacy_hash(password), stored)
+        return matches, matches
+
+    try:
+        scheme, stored_cost, r, p, salt, key = stored.split("$")
+        if scheme != SCHEME:
+            return False, False
+        expected = bytes.fromhex(key)
+        candidate = _scrypt(password, bytes.fromhex(salt), int(stored_cost), int(r), int(p))
+    except ValueError:
+        return False, False
+    matches = hmac.compare_digest(candidate, expected)
+    return matches, matches and int(stored_cost) != cost
+
+
+_dummy_hashes = {}
+
+def dummy_hash(cost: int = DEFAULT_COST) -> str:
+    """A hash of a random secret, checked when a username doesn't exist so
+    that failed lookups take as long as wrong passwords."""
+    if cost not in _dummy_hashes:
+        _dummy_hashes[cost] = hash_password(os.urandom(16).hex(), cost)
+    return _dummy_hashes[cost]
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ThreadPoolExecutor:
+    """The shared verifier pool, one worker per CPU."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1,
+                                       thread_name_prefix="password-verify")
+        return _pool
+
+def submit_verify(password: str, stored: str, cost: int = DEFAULT_COST) -> Future:
+    """Queue a verification on the shared pool; the Future yields verify_password's result."""
+    return get_pool().submit(verify_password, password, stored, cost)
@@ -1,29 +1,22 @@
-import sqlite3
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
+from db import Repository, open_database
+from metrics import timed
+import goal_staleness
+from migrations import migrate
+from read_cache import GOALS, HEALTH
+from sessions import UserRef, username_of
 
 database = "database/health_tracker.db"
 
-class PersonalRecord:
+class PersonalRecord(Repository):
+    @timed()
     def __init__(self, db_path: str = "database/health_tracker.db"):
         self.database = db_path
-        self.conn = sqlite3.connect(self.database)
-        self.cursor = self.conn.cursor()
-        self.create_health_table()
+        self.db = open_database(self.database)
 
     def create_health_table(self):
         """Create the health data table if it doesn't exist."""
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS health_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL,
-                weight REAL NOT NULL,
-                height REAL NOT NULL,
-                bmi REAL,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (username) REFERENCES users(username)
-            )
-        """)
-        self.conn.commit()
+        migrate(self.conn)
 
     def _calculate_bmi(self, weight: float, height: float) -> float:
         """Calculate BMI using the formula: BMI = weight (kg) / height^2 (m^2)."""
@@ -33,8 +26,15 @@ class PersonalRecord:
         """Check if the input value is a valid positive number."""
         return isinstance(value, (int, float)) and value > 0
 
-    def add_or_update_measurements(self, username: str, weight: float, height: float) -> Tuple[bool, str]:
-        """Add or update user's health measurements with validation."""
+    @timed()
+    def add_or_update_measurements(self, username: UserRef, weight: float, height: float) -> Tuple[bool, str]:
+        """Record a new measurement for the user with validation.
+
+        The entry is appended to health_history and the user's health_data
+        row is updated to match, in the same transaction. The user's calorie
+        goal, if any, is marked dirty so it is recomputed.
+        """
+        username = username_of(username)
         if not self._is_valid_measurement(weight):
             return False, "Invalid weight value. It must be a positive number."
 
@@ -44,36 +44,50 @@ class PersonalRecord:
         bmi = self._calculate_bmi(weight, height)
 
         try:
-            self.cursor.execute("""
-                SELECT id FROM health_data WHERE username = ?
-            """, (username,))
-            existing = self.cursor.fetchone()
-
-            if existing:
-                # Update record
-                self.cursor.execute("""
-                    UPDATE health_data
-                    SET weight = ?, height = ?, bmi = ?, last_updated = CURRENT_TIMESTAMP
-                    WHERE username = ?
-                """, (weight, height, bmi, username))
-            else:
-                # Insert new record
-                self.cursor.execute("""
-                    INSERT INTO health_data (username, weight, height, bmi)
-                    VALUES (?, ?, ?, ?)
-                """, (username, weight, height, bmi))
-
-            self.conn.commit()
-            return True, "Your information updated successfully."
-
+            self._write(self._write_measurement, username, weight, height, bmi)
         except Exception as e:
             return False, f"Failed to save health data: {str(e)}"
+        cache = self._cache()
+        if cache is not None:
+            cache.invalidate(username, HEALTH, GOALS)
+        return True, "Your information updated successfully."
+
+    def _write_measurement(self, cursor, username: str, weight: float, height: float, bmi: float):
+        cursor.execute("""
+            INSERT INTO health_history (username, weight, height, bmi)
+            VALUES (?, ?, ?, ?)
+        """, (username, weight, height, bmi))
+        # Insert, or update the user's existing row, in one statement
+        cursor.execute("""
+            INSERT INTO health_data (username, weight, height, bmi)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(username) DO UPDATE SET
+                weight = excluded.weight,
+                height = excluded.height,
+                bmi = excluded.bmi,
+                last_updated = CURRENT_TIMESTAMP
+        """, (username, weight, height, bmi))
+        goal_staleness.mark_dirty(cursor, username)
 
-    def get_health_data(self, username: str) -> Optional[dict]:
-        """Retrieve a user's health data."""
+    @timed()
+    def get_health_data(self, username: UserRef) -> Optional[dict]:
+        """Retrieve a user's latest health data.
+
+        Reads the newest health_history entry, a single seek on the
+        (username, recorded_at) index however long the history is.
+        Results are served from the shared read cache when possible.
+        """
+        username = username_of(username)
+        cache = self._cache()
+        if cache is not None:
+            return cache.get(HEALTH, username, lambda: self._load_health_data(username))
+        return self._load_health_data(username)
+
+    def _load_health_data(self, username: str) -> Optional[dict]:
         self.cursor.execute("""
-            SELECT weight, height, bmi, last_updated
-            FROM health_data WHERE username = ?
+            SELECT weight, height, bmi, substr(recorded_at, 1, 19)
+            FROM health_history WHERE username = ?
+            ORDER BY recorded_at DESC, id DESC LIMIT 1
         """, (username,))
         data = self.cursor.fetchone()
         if data:
@@ -85,8 +99,29 @@ class PersonalRecord:
             }
         return None
 
+    @timed()
+    def get_health_history(self, username: UserRef, since: Optional[str] = None,
+                           until: Optional[str] = None) -> List[dict]:
+        """Return a user's measurements, oldest first.
+
+        since (inclusive) and until (exclusive) are 'YYYY-MM-DD[ HH:MM:SS]'
+        strings bounding recorded_at.
+        """
+        username = username_of(username)
+        query = "SELECT weight, height, bmi, recorded_at FROM health_history WHERE username = ?"
+        params = [username]
+        if since:
+            query += " AND recorded_at >= ?"
+            params.append(since)
+        if until:
+            query += " AND recorded_at < ?"
+            params.append(until)
+        self.cursor.execute(query + " ORDER BY recorded_at, id", params)
+        return [
+            {"weight in kg": row[0], "height in meters": row[1], "bmi": row[2], "recorded_at": row[3]}
+            for row in self.cursor.fetchall()
+        ]
+
     def close(self):
-        """Close the database connection."""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
+        """Release the shared database connection."""
+        self._release()
@@ -0,0 +1,96 @@
+"""Per-user dietary preferences for meal planning.
+
+A user may restrict plans to some categories (allowed), rule categories
+out (excluded) and rule out ingredients. Ingredients are matched once
+meal details are known: see CandidateIndex in meal_planner. Changing
+preferences discards the user's stored plans from this week on, so the
+next view plans afresh.
+"""
+import json
+from typing import Iterable, List, Optional, Tuple
+
+import meal_plans
+from db import Repository, open_database
+from meal_planner import CATEGORIES
+from metrics import timed
+from nutrition import ingredient_key
+from sessions import UserRef, username_of
+
+database = "database/health_tracker.db"
+
+
+def parse_categories(names: Iterable[str]) -> List[str]:
+    """Match names case-insensitively against CATEGORIES; raises ValueError."""
+    known = {category.lower(): category for category in CATEGORIES}
+    categories = []
+    for name in names:
+        key = name.strip().lower()
+        if key not in known:
+            raise ValueError(f"Unknown category: {name!r}. Choose from {', '.join(CATEGORIES)}.")
+        categories.append(known[key])
+    return categories
+
+def from_row(allowed: Optional[str], excluded_categories: Optional[str],
+             excluded_ingredients: Optional[str]) -> Optional[dict]:
+    """Decode the stored JSON columns; None when nothing is restricted."""
+    preferences = {
+        "allowed categories": json.loads(allowed) if allowed else None,
+        "excluded categories": json.loads(excluded_categories or "[]"),
+        "excluded ingredients": json.loads(excluded_ingredients or "[]"),
+    }
+    if not any(preferences.values()):
+        return None
+    return preferences
+
+
+class DietaryPreferences(Repository):
+    def __init__(self, db_path: str = "database/health_tracker.db"):
+        self.database = db_path
+        self.db = open_database(self.database)
+
+    @timed()
+    def set_preferences(self, username: UserRef, allowed_categories: Optional[Iterable[str]] = None,
+                        excluded_categories: Iterable[str] = (),
+                        excluded_ingredients: Iterable[str] = ()) -> Tuple[bool, str]:
+        """Replace the user's preferences. ``allowed_categories`` None (or
+        empty) allows every category; category names are matched to
+        CATEGORIES ignoring case. Ingredient names are normalised, so
+        "Peanuts" and "peanut" are the same exclusion."""
+        username = username_of(username)
+        try:
+            allowed = sorted(set(parse_categories(allowed_categories or ()))) or None
+            excluded = sorted(set(parse_categories(excluded_categories)))
+        except ValueError as e:
+            return False, str(e)
+        ingredients = sorted({ingredient_key(name) for name in excluded_ingredients} - {""})
+        try:
+            self._write(self._write_preferences, username,
+                        json.dumps(allowed) if allowed else None, json.dumps(excluded), json.dumps(ingredients))
+        except Exception as e:
+            return False, f"Error saving dietary preferences: {e}"
+        return True, "Dietary preferences saved."
+
+    def _write_preferences(self, cursor, username: str, allowed: Optional[str], excluded: str, ingredients: str):
+        cursor.execute("""
+            INSERT INTO dietary_preferences (username, allowed_categories, excluded_categories, excluded_ingredients)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(username) DO UPDATE SET
+                allowed_categories = excluded.allowed_categories,
+                excluded_categories = excluded.excluded_categories,
+                excluded_ingredients = excluded.excluded_ingredients,
+                last_updated = CURRENT_TIMESTAMP
+        """, (username, allowed, excluded, ingredients))
+        meal_plans.discard_plans(cursor, username)
+
+    @timed()
+    def get_preferences(self, username: UserRef) -> Optional[dict]:
+        """The user's preferences, or None when they have none."""
+        row = self.conn.execute("""
+            SELECT allowed_categories, excluded_categories, excluded_ingredients
+            FROM dietary_preferences WHERE username = ?
+        """, (username_of(username),)).fetchone()
+        return from_row(*row) if row else None
+
+    def close(self):
+        """Release the shared database connection."""
+        self._release()
@@ -0,0 +1,79 @@
+"""A bounded read-through cache for per-user lookups.
+
+Each Database owns one ReadCache, so every repository object on the same
+path shares it and it goes away when the connection closes. Entries are
+keyed by (kind, username) and evicted least-recently-used first; missing
+users are cached too. Write methods call invalidate() for the kinds they
+change, so a cached value never outlives a write made through this process.
+Writes from other processes are not seen until the entry is evicted or
+the database is reopened.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+DEFAULT_MAX_ENTRIES = 4096
+
+# The kinds of value cached for a user
+PROFILE = "profile"
+HEALTH = "health"
+WORKOUT = "workout"
+GOALS = "goals"
+KINDS = (PROFILE, HEALTH, WORKOUT, GOALS)
+
+
+class ReadCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (kind, username) -> value
+        # Bumped by every invalidation, so a load that raced a write isn't stored
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _copy(value):
+        # Callers get their own dict, so mutating it can't corrupt the cache
+        return dict(value) if isinstance(value, dict) else value
+
+    def get(self, kind: str, username: Hashable, loader: Callable[[], Any]):
+        """Return the cached value, or call loader() and cache its result."""
+        key = (kind, username)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._copy(self._entries[key])
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+        with self._lock:
+            if generation != self._generation:
+                return self._copy(value)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return self._copy(value)
+
+    def invalidate(self, username: Hashable, *kinds: str):
+        """Drop a user's entries for the given kinds (all kinds if none given)."""
+        with self._lock:
+            self._generation += 1
+            for kind in kinds or KINDS:
+                self._entries.pop((kind, username), None)
+
+    def clear(self):
+        """Drop every entry, e.g. after a bulk write."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,138 @@
+"""Recompute every user's calorie target in one vectorized pass.
+
+This is the batch counterpart of Goals.set_calorie_goal, for when inputs
+change for everyone at once (e.g. ages tick over at the new year). It uses
+the same Mifflin-St Jeor equation, activity bands and goal adjustments.
+recompute_stale_goals does the same for only the goals goal_staleness
+reports as out of date.
+"""
+import time
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+import goal_staleness
+from db import open_database, release_database
+from metrics import timed
+
+def load_goal_inputs(conn, stale_before: Optional[str] = None) -> dict:
+    """Load every user with a goal, joined with their latest inputs, as columns.
+
+    With stale_before, load only dirty goals and goals last updated before
+    that timestamp.
+    """
+    query = """
+        SELECT g.username, g.goal, u.gender, u.year_of_birth, h.weight, h.height,
+               COALESCE(w.workout_days_per_week, 0), COALESCE(w.duration_per_day, 0)
+        FROM user_goals g
+        JOIN users u ON u.username = g.username
+        JOIN health_data h ON h.username = g.username
+        LEFT JOIN workout_status w ON w.username = g.username
+    """
+    params = ()
+    if stale_before is not None:
+        query += """
+        WHERE g.username IN (SELECT username FROM dirty_goals)
+           OR g.username IN (SELECT username FROM user_goals WHERE last_updated < ?)
+        """
+        params = (stale_before,)
+    rows = conn.execute(query, params).fetchall()
+    columns = list(zip(*rows)) if rows else [()] * 8
+    return {
+        "username": np.array(columns[0], dtype=object),
+        "goal": np.array([(g or "").lower() for g in columns[1]], dtype=object),
+        "gender": np.array([(g or "").lower() for g in columns[2]], dtype=object),
+        "year_of_birth": np.array([y or 0 for y in columns[3]], dtype=np.int64),
+        "weight": np.array(columns[4], dtype=np.float64),
+        "height": np.array(columns[5], dtype=np.float64),
+        "workout_days": np.array(columns[6], dtype=np.float64),
+        "duration": np.array(columns[7], dtype=np.float64),
+    }
+
+def compute_targets(inputs: dict, year: int) -> tuple:
+    """Return (bmr, calorie_intake, valid) arrays for the loaded inputs.
+
+    Rows that set_calorie_goal would reject (unknown gender or goal,
+    missing age, weight or height) are marked invalid.
+    """
+    age = np.where(inputs["year_of_birth"] > 0, year - inputs["year_of_birth"], 0)
+    weight = inputs["weight"]
+    height_cm = inputs["height"] * 100
+    male = inputs["gender"] == "male"
+    female = inputs["gender"] == "female"
+
+    base = 10 * weight + 6.25 * height_cm - 5 * age
+    bmr = np.where(male, base + 5, base - 161)
+
+    total_minutes = inputs["workout_days"] * inputs["duration"] * 60
+    multiplier = np.select(
+        [total_minutes == 0, total_minutes <= 150, total_minutes <= 300, total_minutes <= 450],
+        [1.2, 1.375, 1.55, 1.725],
+        1.9,
+    )
+
+    goal = inputs["goal"]
+    adjustment = np.select([goal == "maintain", goal == "lose", goal == "gain"], [0, -500, 500], np.nan)
+    # Same half-to-even rounding as Python's round()
+    calories = np.round(bmr * multiplier + adjustment)
+
+    valid = (male | female) & ~np.isnan(adjustment) & (age != 0) & (weight != 0) & (height_cm != 0)
+    return bmr, calories, valid
+
+def _recompute(db_path: str, year: Optional[int], stale_only: bool) -> dict:
+    year = year or datetime.now().year
+    start = time.perf_counter()
+    db = open_database(db_path)
+    try:
+        conn = db.conn
+        if conn.in_transaction:
+            conn.commit()
+        # Hold the write lock from read to write so no input change slips between
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            inputs = load_goal_inputs(conn, goal_staleness.year_start(year) if stale_only else None)
+            bmr, calories, valid = compute_targets(inputs, year)
+            updates = zip(bmr[valid].tolist(), calories[valid].tolist(), inputs["username"][valid].tolist())
+            conn.executemany("""
+                UPDATE user_goals
+                SET bmr = ?, calorie_intake = ?, last_updated = CURRENT_TIMESTAMP
+                WHERE username = ?
+            """, updates)
+            conn.execute("DELETE FROM dirty_goals")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        db.cache.clear()
+    finally:
+        release_database(db)
+
+    users = len(inputs["username"])
+    updated = int(valid.sum())
+    seconds = time.perf_counter() - start
+    return {
+        "users": users,
+        "updated": updated,
+        "skipped": users - updated,
+        "seconds": seconds,
+        "users_per_second": users / seconds if seconds else 0.0,
+    }
+
+@timed()
+def recompute_all_goals(db_path: str = "database/health_tracker.db", year: Optional[int] = None) -> dict:
+    """Recompute and store bmr and calorie_intake for every user with a goal.
+
+    Results are written back with one executemany in a single transaction.
+    Returns counts and timing for the run.
+    """
+    return _recompute(db_path, year, stale_only=False)
+
+@timed()
+def recompute_stale_goals(db_path: str = "database/health_tracker.db", year: Optional[int] = None) -> dict:
+    """Recompute only dirty goals and goals computed before this year.
+
+    Same result and return value as recompute_all_goals, but the work is
+    proportional to the number of stale users.
+    """
+    return _recompute(db_path, year, stale_only=True)
@@ -0,0 +1,540 @@
+"""Asyncio HTTP/JSON service for Health Tracker.
+
+Serves the operations of the menu and the CLI to many concurrent clients
+from one process, using only the standard library:
+
+    python service.py --port 8080
+    curl -s localhost:8080/health
+    curl -s -X POST localhost:8080/login -d '{"username": "anna", "password": "..."}'
+    curl -s localhost:8080/goals -H "Authorization: Bearer <token>"
+
+Endpoints (all but /health, /signup and /login need a bearer token from
+/login):
+
+    GET  /health                       POST /signup, /login, /logout
+    GET  /profile
+    GET  /record, /record/history      POST /record   {"weight": kg, "height": cm}
+    GET  /workout, /workout/history    POST /workout  {"days": n, "hours": h}
+    GET  /goals                        POST /goals    {"goal": "lose"}
+    GET  /preferences                  POST /preferences {"allowed_categories": [...],
+                                           "excluded_categories": [...], "excluded_ingredients": [...]}
+    GET  /plan                         (this week's stored plan; ?seed=7 for a one-off)
+    GET  /metrics                      (Prometheus text, see metrics.py)
+
+Blocking tracker calls run on a bounded pool of ``db_workers`` threads,
+each with its own SQLite connection, while the event loop keeps accepting
+requests. With ``group_commit`` their writes share commits. Password
+hashing runs on the password_hashing pool, meal downloads on a small
+network executor and meal planning on its own thread, so none of them
+holds up the database threads or the event loop. The planner's candidate
+index is built once per catalog snapshot (see diet_plan.index_candidates).
+
+At most ``max_in_flight`` requests are handled at once. Beyond that the
+service answers 503 with Retry-After straight away rather than queueing
+without bound; /health and /metrics are never shed. A request that takes longer than
+``request_timeout`` seconds gets 504, but keeps its slot until the executor
+job it was waiting on finishes, since that job can't be interrupted.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import metrics
+import password_hashing
+from meal_planner import MealPlanError
+from sessions import MemorySessionStore, Session, SessionError
+from user_information import UserInformation
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+HEALTH_CHECK_TIMEOUT = 1.0
+
+# Executor jobs started by the request being handled, see TrackerService._track
+_request_jobs: ContextVar = ContextVar("request_jobs")
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+    503: "Service Unavailable", 504: "Gateway Timeout",
+}
+
+
+class HTTPError(Exception):
+    """Abort a request with an HTTP status and a message for the client."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    def __init__(self, method: str, target: str, version: str, headers: dict, body: bytes):
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path.rstrip("/") or "/"
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        self.headers = headers
+        self.body = body
+        self.keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+    def json(self) -> dict:
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except ValueError:
+            raise HTTPError(400, "Request body must be JSON.")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Request body must be a JSON object.")
+        return data
+
+
+def _result(ok: bool, message: str, **data) -> Tuple[int, dict]:
+    return (200 if ok else 400), {"ok": ok, "message": message, **data}
+
+def _error(message: str) -> dict:
+    return {"ok": False, "message": message}
+
+def _field(data: dict, name: str, kind=str):
+    value = data.get(name)
+    if value is None or str(value).strip() == "":
+        raise HTTPError(400, f"Missing {name}.")
+    try:
+        return kind(value) if kind is not str else str(value).strip()
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"{name} must be numeric.")
+
+
+class TrackerService:
+    def __init__(self, db_path: str = "database/health_tracker.db", host: str = "127.0.0.1",
+                 port: int = 8080, max_in_flight: int = 64, request_timeout: float = 10.0,
+                 idle_timeout: float = 30.0, sessions=None, meal_base_url: Optional[str] = None,
+                 offline: bool = False, hash_cost: int = password_hashing.DEFAULT_COST,
+                 db_workers: int = 4, group_commit: bool = False, instrument: bool = False):
+        self.db_path = db_path
+        self.host = host
+        self.port = port
+        self.max_in_flight = max_in_flight
+        self.request_timeout = request_timeout
+        self.idle_timeout = idle_timeout
+        self.sessions = sessions if sessions is not None else MemorySessionStore()
+        self.meal_base_url = meal_base_url
+        self.offline = offline
+        self.hash_cost = hash_cost
+        self.group_commit = group_commit
+        self.instrument = instrument
+        self.in_flight = 0
+        self.served = 0
+        self.rejected = 0
+        self._server = None
+        self._db_executor = ThreadPoolExecutor(max_workers=db_workers, thread_name_prefix="tracker-db")
+        self._network = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tracker-net")
+        # Planning is CPU-bound and holds the GIL, so more threads wouldn't help
+        self._planning = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tracker-plan")
+        self._routes = {
+            ("GET", "/health"): self._health,
+            ("GET", "/metrics"): self._metrics,
+            ("POST", "/signup"): self._signup,
+            ("POST", "/login"): self._login,
+            ("POST", "/logout"): self._logout,
+            ("GET", "/profile"): self._profile,
+            ("GET", "/record"): self._get_record,
+            ("POST", "/record"): self._set_record,
+            ("GET", "/record/history"): self._record_history,
+            ("GET", "/workout"): self._get_workout,
+            ("POST", "/workout"): self._set_workout,
+            ("GET", "/workout/history"): self._workout_history,
+            ("GET", "/goals"): self._get_goals,
+            ("POST", "/goals"): self._set_goals,
+            ("GET", "/preferences"): self._get_preferences,
+            ("POST", "/preferences"): self._set_preferences,
+            ("GET", "/plan"): self._plan,
+        }
+
+    # Lifecycle
+
+    def _open(self):
+        """Create the tracker objects, shared by all database threads."""
+        from goals import Goals
+        from meal_catalog import MealCatalog
+        from meal_plans import MealPlanStore
+        from personal_record import PersonalRecord
+        from preferences import DietaryPreferences
+        self.ui = UserInformation(self.db_path, self.hash_cost)
+        self.record = PersonalRecord(self.db_path)
+        self.goals = Goals(self.db_path, self.ui, self.record)
+        options = {"base_url": self.meal_base_url} if self.meal_base_url else {}
+        self.catalog = MealCatalog(self.db_path, offline=self.offline, **options)
+        self.plans = MealPlanStore(self.db_path)
+        self.preferences = DietaryPreferences(self.db_path)
+        if self.group_commit:
+            self.ui.db.enable_group_commit()
+
+    def _close(self):
+        self.preferences.close()
+        self.plans.close()
+        self.catalog.close()
+        self.goals.close()
+        self.ui.close()
+        self.record.close()
+
+    async def start(self) -> int:
+        """Open the database and start listening. Returns the bound port."""
+        if self.instrument:
+            # Before the database opens, so its connections are instrumented
+            metrics.enable()
+        self._open()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            # Let calls already running on the executors finish first
+            self._db_executor.shutdown()
+            self._network.shutdown()
+            self._planning.shutdown()
+            self._close()
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Health Tracker service listening on http://{self.host}:{self.port}", file=sys.stderr)
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    def _track(self, future: Future) -> asyncio.Future:
+        """Await an executor job, counted against the current request's slot."""
+        jobs = _request_jobs.get(None)
+        if jobs is not None:
+            jobs.append(future)
+        return asyncio.wrap_future(future)
+
+    async def _db(self, fn, *args):
+        """Run a blocking tracker call on a database thread."""
+        return await self._track(self._db_executor.submit(fn, *args))
+
+    async def _network_call(self, fn, *args):
+        return await self._track(self._network.submit(fn, *args))
+
+    async def _planning_call(self, fn, *args):
+        return await self._track(self._planning.submit(fn, *args))
+
+    # HTTP
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 413, _error("Request headers too large."), False)
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                try:
+                    request = await self._read_request(head, reader)
+                except HTTPError as e:
+                    await self._respond(writer, e.status, _error(e.message), False)
+                    break
+                started = time.perf_counter()
+                status, payload = await self._dispatch(request)
+                if metrics.enabled():
+                    known = any(path == request.path for _, path in self._routes)
+                    metrics.observe(metrics.SERVER_SECONDS, time.perf_counter() - started,
+                                    route=request.path if known else "other", status=str(status))
+                await self._respond(writer, status, payload, request.keep_alive)
+                if not request.keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, head: bytes, reader: asyncio.StreamReader) -> Request:
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                if line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "Malformed request.")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large.")
+        try:
+            body = await asyncio.wait_for(reader.readexactly(length), self.request_timeout) if length else b""
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+            raise HTTPError(400, "Incomplete request body.")
+        return Request(method, target, version, headers, body)
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool):
+        """Send a dict as JSON, or a str as plain text."""
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        head = [
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if status == 503:
+            head.append("Retry-After: 1")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _dispatch(self, request: Request) -> Tuple[int, dict]:
+        handler = self._routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self._routes):
+                return 405, _error("Method not allowed.")
+            return 404, _error("Not found.")
+        if handler in (self._health, self._metrics):
+            # Always answered, so callers can see an overloaded service
+            return await handler(request)
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            return 503, _error("Server busy, please retry.")
+
+        self.in_flight += 1
+        jobs = []
+        # wait_for's task copies this context, so the handler sees the list
+        token = _request_jobs.set(jobs)
+        try:
+            return await asyncio.wait_for(handler(request), self.request_timeout)
+        except HTTPError as e:
+            return e.status, _error(e.message)
+        except SessionError as e:
+            return 401, _error(str(e))
+        except asyncio.TimeoutError:
+            return 504, _error("Request timed out. A change it made may still be applied.")
+        except Exception as e:
+            return 500, _error(f"Internal error: {e}")
+        finally:
+            _request_jobs.reset(token)
+            self.served += 1
+            self._release_slot(jobs)
+
+    def _release_slot(self, jobs: list):
+        """Free the request's slot once none of its executor jobs is running."""
+        running = [asyncio.wrap_future(job) for job in jobs if not job.done()]
+        if not running:
+            self.in_flight -= 1
+            return
+        def release(_):
+            self.in_flight -= 1
+        asyncio.gather(*running, return_exceptions=True).add_done_callback(release)
+
+    def _session(self, request: Request) -> Session:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        session = self.sessions.get(token.strip()) if scheme.lower() == "bearer" else None
+        if session is None:
+            raise HTTPError(401, "Invalid or expired session. Please log in again.")
+        return session
+
+    # Handlers
+
+    async def _health(self, request: Request) -> Tuple[int, dict]:
+        stats = {"in_flight": self.in_flight, "served": self.served, "rejected": self.rejected,
+                 "sessions": len(self.sessions)}
+        try:
+            # conn is resolved on the database thread, so this uses that thread's connection
+            await asyncio.wait_for(self._db(lambda: self.ui.conn.execute("SELECT 1")), HEALTH_CHECK_TIMEOUT)
+        except asyncio.TimeoutError:
+            return 503, {"ok": False, "message": "Database busy.", **stats}
+        return 200, {"ok": True, "message": "ok", **stats}
+
+    async def _metrics(self, request: Request) -> Tuple[int, str]:
+        return 200, metrics.registry.prometheus()
+
+    async def _signup(self, request: Request) -> Tuple[int, dict]:
+        data = request.json()
+        username, email, password = _field(data, "username"), _field(data, "email"), _field(data, "password")
+        year_of_birth, gender = _field(data, "year_of_birth", int), _field(data, "gender").lower()
+        error = UserInformation.validate_account(username, email, password, year_of_birth, gender)
+        if error:
+            return _result(False, error)
+        password_hash = await self._track(
+            password_hashing.get_pool().submit(password_hashing.hash_password, password, self.hash_cost))
+        ok, message = await self._db(self.ui.insert_user, username, email, password_hash,
+                                     data.get("first_name"), data.get("last_name"), year_of_birth, gender)
+        return _result(ok, message, username=username)
+
+    async def _login(self, request: Request) -> Tuple[int, dict]:
+        data = request.json()
+        username, password = _field(data, "username"), _field(data, "password")
+        stored = await self._db(self.ui.get_password_hash, username)
+        pool = password_hashing.get_pool()
+        if stored is None:
+            # Spend the same time on unknown users as on wrong passwords
+            stored = await self._track(pool.submit(password_hashing.dummy_hash, self.hash_cost))
+            await self._track(password_hashing.submit_verify(password, stored, self.hash_cost))
+            return 401, _error("Invalid username or password")
+        matches, needs_rehash = await self._track(
+            password_hashing.submit_verify(password, stored, self.hash_cost))
+        if not matches:
+            return 401, _error("Invalid username or password")
+        if needs_rehash:
+            new_hash = await self._track(
+                pool.submit(password_hashing.hash_password, password, self.hash_cost))
+            await self._db(self.ui.set_password_hash, username, new_hash)
+        session = self.sessions.create(username)
+        return _result(True, "Login successful", session=session.token, expires_at=session.expires_at)
+
+    async def _logout(self, request: Request) -> Tuple[int, dict]:
+        self.sessions.revoke(self._session(request).token)
+        return _result(True, "Logged out.")
+
+    async def _profile(self, request: Request) -> Tuple[int, dict]:
+        profile = await self._db(self.ui.get_user_profile, self._session(request))
+        if not profile:
+            return 404, _error("Your profile not found")
+        return _result(True, "ok", profile=profile)
+
+    async def _get_record(self, request: Request) -> Tuple[int, dict]:
+        data = await self._db(self.record.get_health_data, self._session(request))
+        return _result(True, "ok" if data else "No health record found.", health_data=data)
+
+    async def _set_record(self, request: Request) -> Tuple[int, dict]:
+        session = self._session(request)
+        data = request.json()
+        weight, height_cm = _field(data, "weight", float), _field(data, "height", float)
+        ok, message = await self._db(self.record.add_or_update_measurements, session, weight, height_cm / 100)
+        return _result(ok, message)
+
+    async def _record_history(self, request: Request) -> Tuple[int, dict]:
+        history = await self._db(self.record.get_health_history, self._session(request),
+                                 request.query.get("since"), request.query.get("until"))
+        return _result(True, "ok", history=history)
+
+    async def _get_workout(self, request: Request) -> Tuple[int, dict]:
+        data = await self._db(self.ui.get_workout_status, self._session(request))
+        return _result(True, "ok" if data else "You have not input your workout status yet.", workout_status=data)
+
+    async def _set_workout(self, request: Request) -> Tuple[int, dict]:
+        session = self._session(request)
+        data = request.json()
+        days, hours = _field(data, "days", int), _field(data, "hours", float)
+        ok, message = await self._db(self.ui.update_workout_status, session, days, hours)
+        return _result(ok, message)
+
+    async def _workout_history(self, request: Request) -> Tuple[int, dict]:
+        history = await self._db(self.ui.get_workout_history, self._session(request),
+                                 request.query.get("since"), request.query.get("until"))
+        return _result(True, "ok", history=history)
+
+    async def _get_goals(self, request: Request) -> Tuple[int, dict]:
+        goals = await self._db(self.goals.get_goals, self._session(request))
+        return _result(True, "ok" if goals else "You have not input your personal goals yet.", goals=goals)
+
+    async def _set_goals(self, request: Request) -> Tuple[int, dict]:
+        session = self._session(request)
+        goal = _field(request.json(), "goal").lower()
+        ok, message = await self._db(self.goals.set_calorie_goal, session, goal)
+        return _result(ok, message)
+
+    async def _get_preferences(self, request: Request) -> Tuple[int, dict]:
+        preferences = await self._db(self.preferences.get_preferences, self._session(request))
+        return _result(True, "ok" if preferences else "No dietary preferences set.", preferences=preferences)
+
+    async def _set_preferences(self, request: Request) -> Tuple[int, dict]:
+        session = self._session(request)
+        data = request.json()
+        lists = {}
+        for name in ("allowed_categories", "excluded_categories", "excluded_ingredients"):
+            lists[name] = data.get(name) or []
+            if not isinstance(lists[name], list) or not all(isinstance(item, str) for item in lists[name]):
+                raise HTTPError(400, f"{name} must be a list of names.")
+        ok, message = await self._db(self.preferences.set_preferences, session, lists["allowed_categories"],
+                                     lists["excluded_categories"], lists["excluded_ingredients"])
+        return _result(ok, message)
+
+    async def _plan(self, request: Request) -> Tuple[int, dict]:
+        import diet_plan
+        from meal_plans import plan_seed, week_start
+        session = self._session(request)
+        seed = _field(request.query, "seed", int) if "seed" in request.query else None
+        goals = await self._db(self.goals.get_goals, session)
+        if not goals:
+            return _result(False, "No calorie goal found for this user. Please set up your goal first.")
+        calorie_goal = int(goals["calorie intake"])
+        week = week_start()
+        if seed is None:
+            # This week's plan is stored until the week ends or the goal changes
+            plan = await self._db(self.plans.get_plan, session.username, week)
+            if plan is not None and plan["calorie_goal"] == calorie_goal:
+                return _result(True, "ok", plan=plan)
+        preferences = await self._db(self.preferences.get_preferences, session)
+
+        # Cache lookups and stores on a database thread, downloads off them
+        categories = diet_plan.CATEGORIES
+        found, stale = await self._db(self.catalog.lookup, categories)
+        downloaded = {}
+        if stale:
+            downloaded = await self._network_call(self.catalog.download, list(stale))
+        meals = await self._db(self.catalog.merge, categories, found, stale, downloaded)
+
+        candidates = diet_plan.cached_candidates(meals)
+        if candidates is None:
+            # The same split for the meal details the calorie estimates need
+            meal_ids = [meal["idMeal"] for listing in meals.values() for meal in listing]
+            details, missing = await self._db(self.catalog.lookup_details, meal_ids)
+            if missing and not self.catalog.offline:
+                fetched = await self._network_call(self.catalog.download_details, missing)
+                details = await self._db(self.catalog.store_details, details, fetched)
+            candidates = await self._planning_call(diet_plan.index_candidates, meals, details)
+        store = seed is None
+        try:
+            plan = await self._planning_call(diet_plan.plan_from, candidates, calorie_goal,
+                                             plan_seed(session.username, week) if store else seed,
+                                             diet_plan.DEFAULT_TOLERANCE, preferences)
+        except MealPlanError as e:
+            return _result(False, f"Failed to generate meal plan: {e}")
+        if store:
+            await self._db(self.plans.save_plan, session.username, plan, week)
+            plan["week"] = week
+        return _result(True, "Meal plan generated.", plan=plan)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Health Tracker HTTP/JSON service.")
+    parser.add_argument("--db", default="database/health_tracker.db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-in-flight", type=int, default=64, help="requests handled at once before 503")
+    parser.add_argument("--timeout", type=float, default=10.0, help="per-request timeout in seconds")
+    parser.add_argument("--offline", action="store_true", help="use cached meals only")
+    parser.add_argument("--db-workers", type=int, default=4, help="threads running database calls")
+    parser.add_argument("--group-commit", action="store_true", help="batch concurrent writes into shared commits")
+    parser.add_argument("--metrics", action="store_true", help="collect metrics and serve them at /metrics")
+    args = parser.parse_args(argv)
+
+    service = TrackerService(args.db, args.host, args.port, args.max_in_flight, args.timeout,
+                             offline=args.offline, db_workers=args.db_workers, group_commit=args.group_commit,
+                             instrument=args.metrics)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Login sessions identified by opaque tokens.
+
+A session is created once after a successful password check; afterwards
+its token (or the Session object itself) stands in for the username, so
+later operations don't re-run the expensive verification.
+
+Two stores share one interface: MemorySessionStore keeps sessions in
+process with a TTL and LRU eviction, and SQLiteSessionStore persists them
+in the tracker database so separate processes (e.g. CLI runs) can use them.
+"""
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Union
+
+from db import Repository, open_database
+
+DEFAULT_TTL = 12 * 60 * 60
+
+
+class SessionError(PermissionError):
+    """Raised when an expired session is used for an operation."""
+
+
+class Session:
+    def __init__(self, token: str, username: str, expires_at: float):
+        self.token = token
+        self.username = username
+        self.expires_at = expires_at
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+    def __repr__(self):
+        return f"Session(username={self.username!r})"
+
+
+# Anything an operation accepts to identify its user
+UserRef = Union[str, Session]
+
+
+def username_of(user: UserRef) -> str:
+    """Resolve a username or Session to a username.
+
+    Operations that take a user call this first, so they accept either.
+    """
+    if isinstance(user, Session):
+        if user.expired:
+            raise SessionError("Your session has expired. Please log in again.")
+        return user.username
+    return user
+
+
+class MemorySessionStore:
+    """In-process sessions with a fixed TTL and least-recently-used eviction."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_sessions: int = 10000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # token -> Session
+        self._lock = threading.Lock()
+
+    def create(self, username: str) -> Session:
+        session = Session(secrets.token_urlsafe(32), username, time.time() + self.ttl)
+        with self._lock:
+            self._sessions[session.token] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def get(self, token: str) -> Optional[Session]:
+        """Return the live session for a token, or None."""
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            if session.expired:
+                del self._sessions[token]
+                return None
+            self._sessions.move_to_end(token)
+            return session
+
+    def revoke(self, token: str):
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(Repository):
+    """Sessions persisted in the sessions table.
+
+    Only a SHA-256 of each token is stored, so the table can't be used to
+    hijack sessions. Expired rows are purged whenever a session is created.
+    """
+
+    def __init__(self, db_path: str = "database/health_tracker.db", ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+        self.db = open_database(db_path)
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def create(self, username: str) -> Session:
+        now = time.time()
+        session = Session(secrets.token_urlsafe(32), username, now + self.ttl)
+        self._write(self._write_session, session, now)
+        return session
+
+    def _write_session(self, cursor, session: Session, now: float):
+        cursor.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+        cursor.execute(
+            "INSERT INTO sessions (token_hash, username, created_at, expires_at) VALUES (?, ?, ?, ?)",
+            (self._key(session.token), session.username, now, session.expires_at),
+        )
+
+    def get(self, token: str) -> Optional[Session]:
+        row = self.conn.execute(
+            "SELECT username, expires_at FROM sessions WHERE token_hash = ?", (self._key(token),)
+        ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return Session(token, row[0], row[1])
+
+    def revoke(self, token: str):
+        self._write(self._write_revoke, self._key(token))
+
+    def _write_revoke(self, cursor, token_hash: str):
+        cursor.execute("DELETE FROM sessions WHERE token_hash = ?", (token_hash,))
+
+    def close(self):
+        self._release()
+
+
+_default_store: Optional[MemorySessionStore] = None
+
+def default_store() -> MemorySessionStore:
+    """The process-wide in-memory store used when none is given."""
+    global _default_store
+    if _default_store is None:
+        _default_store = MemorySessionStore()
+    return _default_store
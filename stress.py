@@ -0,0 +1,159 @@
+"""Stress the database layer with concurrent threads and processes.
+
+Each of ``processes`` worker processes shares one PersonalRecord and one
+UserInformation between ``threads`` threads. For ``iterations`` rounds
+every thread records a measurement and a workout for one of ``users``
+shared users, rotating through them, so threads in every process update
+the same rows at once. All of this hits a single database file. No call
+may fail. Afterwards each user's history must have grown by exactly the
+number of writes made for them, and each snapshot row (health_data,
+workout_status) must match the user's newest history row, so a lost or
+reordered update shows up. Counts are compared with ones taken before
+the run, so an existing --db works too.
+
+    python stress.py [--threads 8] [--processes 4] [--iterations 50] [--users 4] [--db path]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import List
+
+from db import open_database, release_database
+from personal_record import PersonalRecord
+from user_information import UserInformation
+
+
+def _username(user: int) -> str:
+    return f"stress{user}"
+
+def _user_for(process: int, thread: int, threads: int, iteration: int, users: int) -> int:
+    return (process * threads + thread + iteration) % users
+
+def _worker(path: str, process: int, threads: int, iterations: int, users: int,
+            group_commit: bool) -> List[str]:
+    """Run one process's threads; return a description of every failure."""
+    record = PersonalRecord(path)
+    ui = UserInformation(path)
+    if group_commit:
+        record.db.enable_group_commit()
+    errors = []
+
+    def run(thread: int):
+        writer = process * threads + thread
+        for i in range(iterations):
+            username = _username(_user_for(process, thread, threads, i, users))
+            # Unique per write, so the final snapshot identifies its write
+            value = 40.0 + writer + i / (iterations + 1)
+            ok, message = record.add_or_update_measurements(username, value, 1.7)
+            if not ok:
+                errors.append(f"{username} measurement {writer}/{i}: {message}")
+            if not record.get_health_data(username):
+                errors.append(f"{username} read {writer}/{i}: no health data")
+            ok, message = ui.update_workout_status(username, i % 8, value)
+            if not ok:
+                errors.append(f"{username} workout {writer}/{i}: {message}")
+            if not ui.get_workout_status(username):
+                errors.append(f"{username} workout read {writer}/{i}: no workout status")
+
+    try:
+        pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+    finally:
+        ui.close()
+        record.close()
+    return errors
+
+
+# (history table, value column, snapshot table)
+CHECKS = [
+    ("health_history", "weight", "health_data"),
+    ("workout_history", "duration_per_day", "workout_status"),
+]
+
+def _history_counts(conn, users: int) -> dict:
+    return {(history, user): conn.execute(f"SELECT COUNT(*) FROM {history} WHERE username = ?",
+                                          (_username(user),)).fetchone()[0]
+            for history, _, _ in CHECKS for user in range(users)}
+
+def _check(conn, users: int, before: dict, writes: Counter) -> List[str]:
+    """Compare history growth with the writes made, and snapshots with history."""
+    errors = []
+    after = _history_counts(conn, users)
+    for history, column, snapshot in CHECKS:
+        for user in range(users):
+            username = _username(user)
+            added = after[history, user] - before[history, user]
+            if added != writes[user]:
+                errors.append(f"{username}: expected {writes[user]} new {history} rows, found {added}")
+            newest = conn.execute(f"SELECT {column} FROM {history} WHERE username = ? ORDER BY id DESC LIMIT 1",
+                                  (username,)).fetchone()
+            current = conn.execute(f"SELECT {column} FROM {snapshot} WHERE username = ?",
+                                   (username,)).fetchone()
+            if newest != current:
+                errors.append(f"{username}: {snapshot} holds {current}, newest {history} row {newest}")
+    return errors
+
+def run_stress(path: str, threads: int = 8, processes: int = 4, iterations: int = 50,
+               group_commit: bool = False, users: int = 4) -> dict:
+    """Run the stress test against ``path`` and return counts and failures."""
+    # Create the schema once, before the workers race to migrate it
+    db = open_database(path)
+    try:
+        before = _history_counts(db.conn, users)
+    finally:
+        release_database(db)
+    writes = Counter(_user_for(p, t, threads, i, users)
+                     for p in range(processes) for t in range(threads) for i in range(iterations))
+
+    start = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes) as pool:
+        results = pool.starmap(_worker, [(path, p, threads, iterations, users, group_commit)
+                                         for p in range(processes)])
+    seconds = time.perf_counter() - start
+
+    errors = [error for result in results for error in result]
+    expected = threads * processes * iterations
+    db = open_database(path)
+    try:
+        errors.extend(_check(db.conn, users, before, writes))
+    finally:
+        release_database(db)
+    return {
+        "writes": 2 * expected,
+        "errors": errors,
+        "seconds": seconds,
+        "writes_per_second": 2 * expected / seconds if seconds else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--users", type=int, default=4, help="users the threads share")
+    parser.add_argument("--group-commit", action="store_true")
+    parser.add_argument("--db", help="database to use (default: a temporary file)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "health_tracker.db")
+        result = run_stress(path, args.threads, args.processes, args.iterations, args.group_commit, args.users)
+    for error in result["errors"][:20]:
+        print(error, file=sys.stderr)
+    print(f"{result['writes']} writes in {result['seconds']:.1f}s "
+          f"({result['writes_per_second']:,.0f}/s), {len(result['errors'])} errors")
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
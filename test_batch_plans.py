@@ -0,0 +1,65 @@
+import pytest
+from batch_plans import generate_all_plans, plan_seed
+from benchmark import generate
+from diet_plan import CATEGORIES
+from fake_meal_api import FakeMealAPI, make_catalog
+from meal_plans import MealPlanStore
+from preferences import DietaryPreferences
+
+WEEK = "2024-03-04"
+
+@pytest.fixture
+def api():
+    api = FakeMealAPI(make_catalog(CATEGORIES)).start()
+    yield api
+    api.stop()
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "health_tracker.db")
+    generate(path, 30, history=1, hash_cost=4)
+    store = MealPlanStore(path)
+    try:
+        with store.conn:
+            store.conn.execute("UPDATE user_goals SET calorie_intake = 0 WHERE username = 'u3'")
+    finally:
+        store.close()
+    preferences = DietaryPreferences(path)
+    try:
+        preferences.set_preferences("u5", excluded_categories=["Beef", "Chicken"])
+    finally:
+        preferences.close()
+    return path
+
+def _stored(path):
+    store = MealPlanStore(path)
+    try:
+        plans = store.conn.execute("SELECT username, week_start, seed FROM meal_plans ORDER BY username").fetchall()
+        items = store.conn.execute("SELECT COUNT(*) FROM meal_plan_items").fetchone()[0]
+    finally:
+        store.close()
+    return plans, items
+
+def test_plans_every_user_and_reports_failures(db_path, api):
+    result = generate_all_plans(db_path, "2024-03-06", processes=2, chunk_size=7, base_url=api.base_url)
+    assert result["week"] == WEEK
+    assert (result["users"], result["planned"], result["failed"]) == (30, 29, 1)
+    assert result["failures"] == [("u3", "No calorie goal set.")]
+    plans, items = _stored(db_path)
+    assert len(plans) == 29 and items == 29 * 21
+    assert all(week == WEEK and seed == plan_seed(name, WEEK) for name, week, seed in plans)
+    store = MealPlanStore(db_path)
+    try:
+        categories = {meal["category"] for day in store.get_plan("u5", WEEK)["days"] for meal in day["meals"]}
+    finally:
+        store.close()
+    assert categories and not categories & {"Beef", "Chicken"}
+
+def test_rerun_replaces_plans(db_path, api):
+    generate_all_plans(db_path, WEEK, processes=1, base_url=api.base_url)
+    first = _stored(db_path)
+    requests = api.request_count
+    # Catalog and details are cached now, so the second run stays offline
+    result = generate_all_plans(db_path, WEEK, processes=1, offline=True)
+    assert result["planned"] == 29 and api.request_count == requests
+    assert _stored(db_path) == first
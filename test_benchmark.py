@@ -0,0 +1,39 @@
+import pytest
+from benchmark import compare, generate, run_suite
+from personal_record import PersonalRecord
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "health_tracker.db")
+    generate(path, 50, history=3, hash_cost=4)
+    return path
+
+def test_generated_users_are_complete(db_path):
+    record = PersonalRecord(db_path)
+    try:
+        counts = {table: record.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ["users", "health_data", "health_history", "workout_history", "user_goals"]}
+        latest = record.get_health_history("u7")[-1]
+        assert record.get_health_data("u7")["weight in kg"] == latest["weight in kg"]
+        assert record.conn.execute("SELECT MIN(calorie_intake) FROM user_goals").fetchone()[0] > 0
+    finally:
+        record.close()
+    assert counts == {"users": 50, "health_data": 50, "health_history": 150,
+                      "workout_history": 150, "user_goals": 50}
+
+def test_suite_times_every_operation(db_path):
+    results = run_suite(db_path, 50, ops=20, slow_ops=2, hash_cost=4)
+    names = [r["name"] for r in results]
+    assert names == ["signup", "login", "get_user_profile", "get_health_data", "get_workout_status",
+                     "get_goals", "set_calorie_goal", "add_or_update_measurements",
+                     "recompute_all_goals", "meal_plan"]
+    assert all(r["users"] == 50 and r["ops_per_second"] > 0 for r in results)
+    assert results[2]["ops"] == 20 and results[0]["ops"] == 2
+
+def test_compare_reports_slowdowns():
+    def run(rate):
+        return {"results": [{"name": "login", "users": 10, "ops_per_second": rate},
+                            {"name": "signup", "users": 10, "ops_per_second": 5.0}]}
+    assert compare(run(90.0), run(100.0), threshold=0.25) == []
+    regressions = compare(run(50.0), run(100.0), threshold=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith("login (10 users)")
@@ -0,0 +1,117 @@
+import json
+import pytest
+import bulk_io
+from personal_record import PersonalRecord
+from user_information import UserInformation
+
+USERS_CSV = """username,email,password,first_name,last_name,year_of_birth,gender
+anna,anna@example.com,password123,Anna,Lee,1990,female
+bo,bo@example.com,password123,Bo,Kim,1990,male
+carl,carl@example.com,short,Carl,Ng,1990,male
+dina,dina@example.com,password123,Dina,Roy,1880,female
+erik,erik@example.com,password123,Erik,Berg,1985,MALE
+anna,anna2@example.com,password123,Anna,Dup,1990,female
+"""
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "health_tracker.db")
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+def test_import_users_reports_bad_lines(tmp_path, db_path):
+    result = bulk_io.import_file(_write(tmp_path, "users.csv", USERS_CSV), "users", db_path,
+                                 chunk_size=2, hash_cost=4)
+    assert result["imported"] == 2
+    assert result["errors"] == [
+        (3, "Your username must be between 3 and 8 characters."),
+        (4, "Your password must be at least 8 characters long."),
+        (5, "Please enter a valid year of birth."),
+        (7, "Username already exists"),
+    ]
+    ui = UserInformation(db_path)
+    try:
+        hashes = [row[0] for row in ui.conn.execute("SELECT password_hash FROM users")]
+        assert len(hashes) == 2 and all(h.startswith("scrypt$4$") for h in hashes)
+        assert ui.get_user_profile("erik")["gender"] == "male"
+        assert ui.login("anna", "password123")[0]
+    finally:
+        ui.close()
+
+def test_import_measurements_jsonl(tmp_path, db_path):
+    lines = [
+        {"username": "anna", "weight": 62, "height": 1.65, "recorded_at": "2024-01-01 08:00:00.000"},
+        {"username": "anna", "weight": 60, "height": 1.65, "recorded_at": "2024-03-01 08:00:00.000"},
+        {"username": "anna", "weight": 61, "height": 1.65, "recorded_at": "2024-02-01 08:00:00.000"},
+        {"username": "anna", "weight": -1, "height": 1.65},
+        {"username": "anna", "weight": "heavy", "height": 1.65},
+    ]
+    text = "\n".join(json.dumps(line) for line in lines) + "\nnot json\n"
+    result = bulk_io.import_file(_write(tmp_path, "m.jsonl", text), "measurements", db_path)
+    assert result["imported"] == 3
+    assert [line for line, _ in result["errors"]] == [4, 5, 6]
+    record = PersonalRecord(db_path)
+    try:
+        assert record.get_health_data("anna")["weight in kg"] == 60
+        assert len(record.get_health_history("anna")) == 3
+        snapshot = record.conn.execute("SELECT weight FROM health_data WHERE username = 'anna'").fetchone()
+        assert snapshot[0] == 60
+    finally:
+        record.close()
+
+def test_import_normalizes_recorded_at(tmp_path, db_path):
+    text = ("username,weight,height,recorded_at\n"
+            "anna,62,1.65,2024-01-01\n"
+            "anna,61,1.65,2024-02-01T09:30:00+01:00\n"
+            "anna,70,1.65,tomorrow\n"
+            "anna,70,1.65,2999-01-01 00:00:00\n")
+    result = bulk_io.import_file(_write(tmp_path, "m.csv", text), "measurements", db_path)
+    assert result["imported"] == 2
+    assert result["errors"] == [
+        (4, "recorded_at must be a date and time such as 2024-03-04 08:30:00."),
+        (5, "recorded_at is in the future."),
+    ]
+    record = PersonalRecord(db_path)
+    try:
+        assert [h["recorded_at"] for h in record.get_health_history("anna")] == \
+            ["2024-01-01 00:00:00.000", "2024-02-01 08:30:00.000"]
+        # A new measurement is still the latest one
+        record.add_or_update_measurements("anna", 55, 1.65)
+        assert record.get_health_data("anna")["weight in kg"] == 55
+    finally:
+        record.close()
+
+def test_import_rejects_lines_that_are_not_objects(tmp_path, db_path):
+    first = json.dumps({"username": "anna", "weight": 60, "height": 1.65})
+    text = "\n".join([first, "[1, 2]", "null", '"x"', "5"]) + "\n"
+    result = bulk_io.import_file(_write(tmp_path, "m.jsonl", text), "measurements", db_path)
+    assert result["imported"] == 1
+    assert result["errors"] == [(line, "Each line must be a JSON object.") for line in (2, 3, 4, 5)]
+
+def test_import_workouts_validates(tmp_path, db_path):
+    text = "username,workout_days_per_week,duration_per_day\nanna,3,1.5\nanna,9,1\n"
+    result = bulk_io.import_file(_write(tmp_path, "w.csv", text), "workouts", db_path)
+    assert result["imported"] == 1
+    assert result["errors"] == [(3, "Workout days must be 0-7 and duration must be a positive number.")]
+
+def test_export_round_trip(tmp_path, db_path):
+    bulk_io.import_file(_write(tmp_path, "users.csv", USERS_CSV), "users", db_path)
+    out = str(tmp_path / "out.jsonl")
+    assert bulk_io.export_file(out, "users", db_path) == 2
+
+    other_db = str(tmp_path / "other.db")
+    result = bulk_io.import_file(out, "users", other_db)
+    assert result["imported"] == 2
+    ui = UserInformation(other_db)
+    try:
+        assert ui.login("anna", "password123")[0]
+    finally:
+        ui.close()
+
+def test_export_csv_has_header(tmp_path, db_path):
+    out = str(tmp_path / "out.csv")
+    assert bulk_io.export_file(out, "measurements", db_path) == 0
+    assert open(out).read().strip() == ",".join(bulk_io.FIELDS["measurements"])
@@ -0,0 +1,127 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+import cli
+
+@pytest.fixture
+def run(tmp_path, capsys):
+    db_path = str(tmp_path / "health_tracker.db")
+
+    def _run(*argv):
+        code = cli.main(["--db", db_path, "--json", *argv])
+        out = capsys.readouterr().out
+        return code, json.loads(out)
+    return _run
+
+SIGNUP = ["signup", "--username", "anna", "--email", "anna@example.com", "--password", "password123",
+          "--first-name", "Anna", "--last-name", "Lee", "--year-of-birth", "1990", "--gender", "female"]
+
+def test_signup_and_login(run):
+    code, result = run(*SIGNUP)
+    assert code == 0 and result["ok"]
+    code, result = run(*[a if a != "anna@example.com" else "other@example.com" for a in SIGNUP])
+    assert code == 1
+    assert result["message"] == "Username already exists"
+
+    assert run("login", "--username", "anna", "--password", "password123")[0] == 0
+    assert run("login", "--username", "anna", "--password", "wrong")[0] == 1
+
+def test_record_workout_and_goal(run):
+    run(*SIGNUP)
+    code, result = run("record", "set", "--username", "anna", "--weight", "60", "--height", "165")
+    assert code == 0
+    assert result["health_data"]["height in meters"] == 1.65
+    assert run("record", "set", "--username", "anna", "--weight", "-1", "--height", "165")[0] == 1
+
+    code, result = run("workout", "set", "--username", "anna", "--days", "3", "--hours", "1")
+    assert code == 0
+    assert result["workout_status"]["Workout days per week"] == 3
+
+    code, result = run("goal", "set", "--username", "anna", "--goal", "lose")
+    assert code == 0
+    assert result["goals"]["goal"] == "lose"
+
+    code, result = run("recompute")
+    assert code == 0
+    assert result["updated"] == 1
+
+def test_session_token_replaces_username(run):
+    run(*SIGNUP)
+    code, result = run("login", "--username", "anna", "--password", "password123")
+    token = result["session"]
+    code, result = run("record", "set", "--session", token, "--weight", "60", "--height", "165")
+    assert code == 0
+    assert result["health_data"]["weight in kg"] == 60
+
+    assert run("logout", "--session", token)[0] == 0
+    code, result = run("goal", "set", "--session", token, "--goal", "gain")
+    assert code == 1
+    assert "expired session" in result["message"]
+
+def test_diet_preferences(run):
+    run(*SIGNUP)
+    code, result = run("diet", "set", "--username", "anna", "--allow", "vegan", "vegetarian",
+                       "--exclude-ingredient", "Peanuts")
+    assert code == 0
+    assert result["preferences"]["allowed categories"] == ["Vegan", "Vegetarian"]
+    assert result["preferences"]["excluded ingredients"] == ["peanut"]
+    code, result = run("diet", "set", "--username", "anna", "--exclude-category", "Dessert")
+    assert code == 1 and "Unknown category" in result["message"]
+
+def test_plan_without_goal_fails(run):
+    run(*SIGNUP)
+    code, result = run("plan", "--username", "anna")
+    assert code == 1
+    assert "No calorie goal" in result["message"]
+
+def test_plan_and_swap_keep_the_catalog_in_db(run, tmp_path, monkeypatch):
+    import diet_plan
+    monkeypatch.setattr(diet_plan, "_catalog", None)
+    monkeypatch.chdir(tmp_path)
+    run(*SIGNUP)
+    run("record", "set", "--username", "anna", "--weight", "60", "--height", "165")
+    run("goal", "set", "--username", "anna", "--goal", "lose")
+    try:
+        # Nothing is cached, so both fail, but they report it as JSON
+        assert run("plan", "--username", "anna", "--offline")[0] == 1
+        assert run("swap", "--username", "anna", "--day", "mon", "--offline")[0] == 1
+        assert diet_plan._catalog.database == str(tmp_path / "health_tracker.db")
+    finally:
+        diet_plan._catalog.close()
+    assert not os.path.exists("database")
+
+def test_seeded_plan_respects_preferences(run, tmp_path, monkeypatch):
+    import diet_plan
+    from fake_meal_api import FakeMealAPI, make_catalog
+    from meal_catalog import MealCatalog
+    api = FakeMealAPI(make_catalog(diet_plan.CATEGORIES)).start()
+    catalog = MealCatalog(str(tmp_path / "health_tracker.db"), base_url=api.base_url)
+    monkeypatch.setattr(diet_plan, "_catalog", catalog)
+    run(*SIGNUP)
+    run("record", "set", "--username", "anna", "--weight", "60", "--height", "165")
+    run("goal", "set", "--username", "anna", "--goal", "lose")
+    run("diet", "set", "--username", "anna", "--exclude-category", "Beef", "Chicken")
+    try:
+        code, result = run("plan", "--username", "anna", "--seed", "7")
+    finally:
+        catalog.close()
+        api.stop()
+    assert code == 0
+    categories = {meal["category"] for day in result["plan"]["days"] for meal in day["meals"]}
+    assert categories and not categories & {"Beef", "Chicken"}
+
+def test_usage_error_exits_2(capsys):
+    with pytest.raises(SystemExit) as exc:
+        cli.main(["goal", "set", "--username", "anna", "--goal", "bulk"])
+    assert exc.value.code == 2
+
+def test_requests_only_loaded_for_plan(tmp_path):
+    script = (
+        "import sys, cli;"
+        f"cli.main(['--db', {str(tmp_path / 'h.db')!r}, 'login', '--username', 'x', '--password', 'y']);"
+        "print('requests' in sys.modules)"
+    )
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    assert out.strip().splitlines()[-1] == "False"
@@ -0,0 +1,57 @@
+import sqlite3
+import threading
+import pytest
+from personal_record import PersonalRecord
+from stress import run_stress
+
+def test_threads_get_their_own_connections(tmp_path):
+    record = PersonalRecord(str(tmp_path / "health_tracker.db"))
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(record.conn))
+    thread.start()
+    thread.join()
+    assert seen[0] is not record.conn
+    assert record.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    record.close()
+    assert record.conn is None
+
+def test_connections_close_when_their_thread_exits(tmp_path):
+    record = PersonalRecord(str(tmp_path / "health_tracker.db"))
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(record.conn)) for _ in range(5)]
+    for t in threads:
+        t.start()
+        t.join()
+    assert record.db._connections == [record.conn]
+    with pytest.raises(sqlite3.ProgrammingError):
+        seen[0].execute("SELECT 1")
+    record.close()
+
+def test_shared_objects_across_threads(tmp_path):
+    record = PersonalRecord(str(tmp_path / "health_tracker.db"))
+    errors = []
+
+    def run(i):
+        for n in range(20):
+            ok, message = record.add_or_update_measurements(f"user{i}", 60 + n, 1.7)
+            if not ok:
+                errors.append(message)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert record.conn.execute("SELECT COUNT(*) FROM health_history").fetchone()[0] == 160
+    assert record.get_health_data("user3")["weight in kg"] == 79
+    record.close()
+
+def test_stress_threads_and_processes(tmp_path):
+    path = str(tmp_path / "health_tracker.db")
+    result = run_stress(path, threads=4, processes=2, iterations=10, users=3)
+    assert result["errors"] == []
+    assert result["writes"] == 160
+    # Counts are relative to what the database held before the run
+    assert run_stress(path, threads=2, processes=2, iterations=5, users=3)["errors"] == []
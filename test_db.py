@@ -0,0 +1,92 @@
+import os
+import sqlite3
+import pytest
+import db
+import migrations
+from goals import Goals
+from personal_record import PersonalRecord
+from user_information import UserInformation
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "nested" / "health_tracker.db")
+
+def test_open_creates_directory_and_schema(db_path):
+    database = db.open_database(db_path)
+    try:
+        assert os.path.exists(db_path)
+        tables = {row[0] for row in database.conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        assert set(migrations.BASELINE_TABLES) <= tables
+    finally:
+        db.release_database(database)
+
+def test_repositories_share_one_connection(db_path):
+    ui = UserInformation(db_path)
+    record = PersonalRecord(db_path)
+    try:
+        assert ui.conn is record.conn
+        assert ui.db.references == 2
+    finally:
+        ui.close()
+        record.close()
+
+def test_connection_closed_after_last_release(db_path):
+    first = db.open_database(db_path)
+    second = db.open_database(db_path)
+    assert first is second
+    db.release_database(first)
+    assert first.conn is not None
+    db.release_database(second)
+    assert first.conn is None
+    reopened = db.open_database(db_path)
+    try:
+        assert reopened is not first
+    finally:
+        db.release_database(reopened)
+
+def test_goals_uses_its_db_path_for_dependencies(db_path):
+    g = Goals(db_path)
+    try:
+        assert g.user_info.database == db_path
+        assert g.health_record.database == db_path
+        assert g.user_info.conn is g.conn
+    finally:
+        g.close()
+    assert g.db.conn is None
+
+def test_goals_leaves_shared_dependencies_open(db_path):
+    ui = UserInformation(db_path)
+    record = PersonalRecord(db_path)
+    g = Goals(db_path, user_info=ui, health_record=record)
+    g.close()
+    try:
+        assert ui.conn is not None
+        assert ui.get_user_profile("nobody") is None
+    finally:
+        ui.close()
+        record.close()
+
+def test_username_index_dedupes_existing_rows(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute(migrations.BASELINE_TABLES["health_data"])
+    conn.executemany(
+        "INSERT INTO health_data (username, weight, height, bmi) VALUES (?, ?, ?, ?)",
+        [("john", 70, 1.8, 21.6), ("john", 72, 1.8, 22.2), ("mary", 55, 1.6, 21.5)],
+    )
+    conn.commit()
+    conn.close()
+
+    record = PersonalRecord(path)
+    try:
+        assert record.get_health_data("john")["weight in kg"] == 72
+        count = record.conn.execute("SELECT COUNT(*) FROM health_data").fetchone()[0]
+        assert count == 2
+        record.add_or_update_measurements("john", 75, 1.8)
+        assert record.get_health_data("john")["weight in kg"] == 75
+        plan = record.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT weight FROM health_data WHERE username = ?", ("john",)
+        ).fetchall()
+        assert "idx_health_data_username" in str(plan)
+    finally:
+        record.close()
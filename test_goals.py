@@ -58,20 +58,25 @@ def test_db():
             last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
+    cursor.execute("CREATE UNIQUE INDEX idx_user_goals_username ON user_goals(username)")
+    cursor.execute("CREATE TABLE dirty_goals (username TEXT PRIMARY KEY, marked_at TIMESTAMP)")
+    cursor.execute("CREATE TABLE meal_plans (id INTEGER PRIMARY KEY, username TEXT, week_start TEXT, calorie_goal REAL)")
+    cursor.execute("CREATE TABLE meal_plan_items (plan_id INTEGER, day INTEGER, slot INTEGER)")
     conn.commit()
     
     yield conn, cursor
     conn.close()
 
 @pytest.fixture
-def goals(test_db):
+def goals(test_db, tmp_path):
     conn, cursor = test_db
-    g = Goals()
+    g = Goals(str(tmp_path / "health_tracker.db"))
     g.conn = conn
     g.cursor = cursor
     g.user_info = MockUserInformation()
     g.health_record = MockPersonalRecord()
-    return g
+    yield g
+    g.close()
 
 def test_get_bmr_male(goals):
     bmr = goals.get_bmr("male", 70, 175, 25)
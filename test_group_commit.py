@@ -0,0 +1,84 @@
+import sqlite3
+import threading
+import pytest
+import group_commit
+from personal_record import PersonalRecord
+from group_commit import GroupCommitter
+from user_information import UserInformation
+
+@pytest.fixture
+def record(tmp_path):
+    r = PersonalRecord(str(tmp_path / "health_tracker.db"))
+    yield r
+    r.close()
+
+def test_concurrent_writes_share_commits(record):
+    record.db.configure(journal_mode="wal", synchronous="normal")
+    record.db.enable_group_commit(window=0.05)
+    results = []
+    threads = [
+        threading.Thread(target=lambda i=i: results.append(record.add_or_update_measurements(f"user{i}", 60 + i, 1.7)))
+        for i in range(20)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    writer = record.db.writer
+    assert all(ok for ok, _ in results) and len(results) == 20
+    assert writer.writes == 20 and writer.batches < 20
+    # Visible to the shared connection as soon as the callers return
+    assert record.get_health_data("user7")["weight in kg"] == 67
+    assert record.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+def test_failing_write_is_isolated(tmp_path):
+    path = str(tmp_path / "health_tracker.db")
+    PersonalRecord(path).close()  # create the schema
+    writer = GroupCommitter(path, window=0.05)
+    insert = lambda cursor, name: cursor.execute("INSERT INTO health_data (username, weight, height, bmi) VALUES (?, 1, 1, 1)", (name,))
+    first = writer.submit(insert, "anna")
+    duplicate = writer.submit(insert, "anna")
+    last = writer.submit(insert, "bob")
+    writer.close()
+
+    first.result(), last.result()
+    with pytest.raises(Exception, match="UNIQUE"):
+        duplicate.result()
+    assert writer.batches == 1 and writer.writes == 2
+    with pytest.raises(RuntimeError):
+        writer.submit(insert, "carl")
+
+def test_errors_reach_the_caller_and_group_commit_can_be_disabled(tmp_path):
+    ui = UserInformation(str(tmp_path / "health_tracker.db"), hash_cost=4)
+    try:
+        ui.db.enable_group_commit()
+        assert ui.user_account("anna", "anna@example.com", "password123", "Anna", "Lee", 1990, "female")[0]
+        ok, message = ui.user_account("anna", "other@example.com", "password123", "Anna", "Lee", 1990, "female")
+        assert (ok, message) == (False, "Username already exists")
+
+        ui.db.disable_group_commit()
+        assert ui.db.writer is None
+        assert ui.update_workout_status("anna", 3, 1)[0]
+        assert ui.get_user_profile("anna")["email"] == "anna@example.com"
+    finally:
+        ui.close()
+
+def test_writer_waits_out_another_connections_lock(tmp_path, monkeypatch):
+    path = str(tmp_path / "health_tracker.db")
+    PersonalRecord(path).close()  # create the schema
+    # No busy timeout, so only the BEGIN IMMEDIATE retries can wait for the lock
+    monkeypatch.setattr(group_commit, "BUSY_TIMEOUT", 0.0)
+    writer = GroupCommitter(path)
+    other = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    timer = threading.Timer(0.2, other.execute, ("COMMIT",))
+    timer.start()
+    try:
+        insert = lambda cursor: cursor.execute("INSERT INTO health_data (username, weight, height, bmi) VALUES ('anna', 1, 1, 1)")
+        writer.submit(insert).result()
+    finally:
+        timer.join()
+        writer.close()
+        other.close()
+    assert writer.writes == 1
@@ -0,0 +1,136 @@
+import time
+import pytest
+import diet_plan
+from fake_meal_api import FakeMealAPI, make_catalog
+from meal_catalog import MealCatalog
+
+@pytest.fixture
+def api():
+    server = FakeMealAPI(make_catalog(diet_plan.CATEGORIES)).start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "health_tracker.db")
+
+@pytest.fixture
+def catalog(api, db_path):
+    c = MealCatalog(db_path=db_path, base_url=api.base_url)
+    yield c
+    c.close()
+
+def test_category_fetched_once(catalog, api):
+    first = catalog.get_category("Beef")
+    second = catalog.get_category("Beef")
+    assert len(first) == 20
+    assert first == second
+    assert api.request_count == 1
+
+def test_returned_list_is_a_copy(catalog):
+    meals = catalog.get_category("Beef")
+    meals.clear()
+    assert len(catalog.get_category("Beef")) == 20
+
+def test_persisted_across_instances(catalog, api, db_path):
+    catalog.get_category("Chicken")
+    other = MealCatalog(db_path=db_path, base_url=api.base_url)
+    try:
+        assert len(other.get_category("Chicken")) == 20
+    finally:
+        other.close()
+    assert api.request_count == 1
+
+def test_expired_entry_is_refetched(api, db_path):
+    c = MealCatalog(db_path=db_path, base_url=api.base_url, ttl=0)
+    try:
+        c.get_category("Pasta")
+        c.get_category("Pasta")
+    finally:
+        c.close()
+    assert api.request_count == 2
+
+def test_lru_eviction_falls_back_to_disk(api, db_path):
+    c = MealCatalog(db_path=db_path, base_url=api.base_url, max_entries=2)
+    try:
+        for category in diet_plan.CATEGORIES:
+            c.get_category(category)
+        assert len(c._memory) == 2
+        assert len(c.get_category("Beef")) == 20
+    finally:
+        c.close()
+    assert api.request_count == len(diet_plan.CATEGORIES)
+
+def test_offline_serves_stale_cache_only(api, db_path):
+    c = MealCatalog(db_path=db_path, base_url=api.base_url, ttl=0)
+    try:
+        c.get_category("Vegan")
+        c.offline = True
+        assert len(c.get_category("Vegan")) == 20
+        assert c.get_category("Seafood") == []
+    finally:
+        c.close()
+    assert api.request_count == 1
+
+def test_weekly_plan_uses_cache(catalog, api, monkeypatch):
+    monkeypatch.setattr(diet_plan, "_catalog", catalog)
+    plan = diet_plan.get_weekly_meal_plan()
+    assert sum(len(day) for day in plan) == 21
+    assert api.request_count <= len(diet_plan.CATEGORIES)
+
+    api.request_count = 0
+    start = time.perf_counter()
+    diet_plan.get_weekly_meal_plan()
+    assert time.perf_counter() - start < 0.5
+    assert api.request_count == 0
+
+def test_prefetch_runs_concurrently(catalog, api):
+    api.delay = 0.2
+    start = time.perf_counter()
+    meals = catalog.prefetch(diet_plan.CATEGORIES)
+    elapsed = time.perf_counter() - start
+    assert set(meals) == set(diet_plan.CATEGORIES)
+    assert all(len(m) == 20 for m in meals.values())
+    assert api.request_count == len(diet_plan.CATEGORIES)
+    assert elapsed < 0.2 * len(diet_plan.CATEGORIES) / 2
+
+def test_prefetch_retries_with_backoff(api, db_path):
+    c = MealCatalog(db_path=db_path, base_url=api.base_url, retries=2, backoff=0.01)
+    api.fail_next = 2
+    try:
+        assert len(c.get_category("Beef")) == 20
+    finally:
+        c.close()
+    assert api.request_count == 3
+
+def test_prefetch_gives_up_after_retries(api, db_path):
+    c = MealCatalog(db_path=db_path, base_url=api.base_url, retries=1, backoff=0.01)
+    api.fail_next = 5
+    try:
+        assert c.get_category("Beef") == []
+    finally:
+        c.close()
+    assert api.request_count == 2
+
+def test_details_fetched_once_and_persisted(catalog, api, db_path):
+    ids = [meal["idMeal"] for meal in catalog.get_category("Beef")]
+    details = catalog.get_details(ids + ["404"])
+    assert set(details) == set(ids) | {"404"} and details["404"] == {}
+    assert details[ids[0]]["strIngredient1"]
+    assert catalog.get_details(ids) == {i: details[i] for i in ids}
+    other = MealCatalog(db_path=db_path, base_url=api.base_url, offline=True)
+    try:
+        assert other.get_details(ids[:3]) == {i: details[i] for i in ids[:3]}
+    finally:
+        other.close()
+    assert api.requests_by_path == {"/filter.php": 1, "/lookup.php": 21}
+
+def test_failed_details_are_retried_later(catalog, api):
+    ids = [meal["idMeal"] for meal in catalog.get_category("Vegan")][:2]
+    api.fail_next = 2
+    c = MealCatalog(db_path=catalog.database, base_url=api.base_url, retries=0)
+    try:
+        assert c.get_details(ids) == {}
+        assert set(c.get_details(ids)) == set(ids)
+    finally:
+        c.close()
@@ -0,0 +1,154 @@
+import pytest
+import diet_plan
+from fake_meal_api import FakeMealAPI, make_catalog
+from meal_catalog import MealCatalog
+from meal_planner import DAYS, MEAL_TIMES, MealPlanError, MealPlanner
+
+def _listing(*ids):
+    return [{"idMeal": i, "strMeal": f"Meal {i}", "strMealThumb": f"{i}.jpg"} for i in ids]
+
+@pytest.fixture
+def meals_by_category():
+    return make_catalog(["Beef", "Chicken", "Vegan"], meals_per_category=10)
+
+def test_pool_is_deduplicated_by_id():
+    planner = MealPlanner({"Vegetarian": _listing("1", "2"), "Vegan": _listing("2", "3")})
+    assert list(planner.pool) == ["1", "2", "3"]
+    assert planner.pool["2"]["category"] == "Vegetarian"
+
+def test_plan_fills_every_slot_with_distinct_meals(meals_by_category):
+    plan = MealPlanner(meals_by_category).plan(2000)
+    assert plan["calorie_goal"] == 2000
+    assert [day["day"] for day in plan["days"]] == DAYS
+    ids = [meal["id"] for day in plan["days"] for meal in day["meals"]]
+    assert len(ids) == len(DAYS) * len(MEAL_TIMES)
+    assert len(set(ids)) == len(ids)
+    assert [m["slot"] for m in plan["days"][0]["meals"]] == MEAL_TIMES
+
+def test_same_seed_reproduces_plan(meals_by_category):
+    first = MealPlanner(meals_by_category).plan(2000, seed=42)
+    second = MealPlanner(meals_by_category).plan(2000, seed=42)
+    other = MealPlanner(meals_by_category).plan(2000, seed=7)
+    assert first == second
+    assert first["days"] != other["days"]
+
+def test_generated_seed_is_returned(meals_by_category):
+    planner = MealPlanner(meals_by_category)
+    plan = planner.plan(2000)
+    assert planner.plan(2000, seed=plan["seed"]) == plan
+
+def test_small_pool_raises_clear_error():
+    planner = MealPlanner({"Vegan": _listing(*[str(i) for i in range(20)])})
+    with pytest.raises(MealPlanError, match="only 20 are available"):
+        planner.plan(2000)
+
+def test_plan_week_uses_catalog(tmp_path, monkeypatch):
+    api = FakeMealAPI(make_catalog(diet_plan.CATEGORIES, meals_per_category=5)).start()
+    catalog = MealCatalog(db_path=str(tmp_path / "health_tracker.db"), base_url=api.base_url)
+    monkeypatch.setattr(diet_plan, "_catalog", catalog)
+    try:
+        plan = diet_plan.plan_week(1800, seed=1)
+        assert plan == diet_plan.plan_week(1800, seed=1)
+        # Listings and details are each downloaded once
+        assert api.requests_by_path == {"/filter.php": len(diet_plan.CATEGORIES),
+                                        "/lookup.php": 5 * len(diet_plan.CATEGORIES)}
+    finally:
+        catalog.close()
+        api.stop()
+
+def _pool(size, seed=0):
+    import random
+    rng = random.Random(seed)
+    listing = {"Mixed": _listing(*[str(i) for i in range(size)])}
+    return listing, {str(i): rng.uniform(150, 1400) for i in range(size)}
+
+def test_optimize_meets_calorie_goal():
+    listing, calories = _pool(300)
+    plan = MealPlanner(listing).optimize(2100, calories, tolerance=0.05, seed=4)
+    ids = [meal["id"] for day in plan["days"] for meal in day["meals"]]
+    assert len(set(ids)) == len(DAYS) * len(MEAL_TIMES)
+    for day in plan["days"]:
+        assert day["within_tolerance"] and abs(day["calories"] - 2100) <= 105
+        assert [m["slot"] for m in day["meals"]] == MEAL_TIMES
+        assert [m["calories"] for m in day["meals"]] == sorted(m["calories"] for m in day["meals"])
+    assert plan == MealPlanner(listing).optimize(2100, calories, tolerance=0.05, seed=4)
+
+def test_optimize_reports_unreachable_days():
+    listing, calories = _pool(40)
+    plan = MealPlanner(listing).optimize(9000, calories, seed=1)
+    assert not any(day["within_tolerance"] for day in plan["days"])
+    # The best the pool allows: the heaviest meals come first
+    assert plan["days"][0]["calories"] == round(sum(sorted(calories.values())[-3:]))
+
+def test_optimize_needs_estimates():
+    listing, calories = _pool(30)
+    with pytest.raises(MealPlanError, match="calorie estimates but only 10"):
+        MealPlanner(listing).optimize(2000, {k: v for k, v in list(calories.items())[:10]})
+
+def test_optimize_thousands_of_meals_quickly():
+    import time
+    listing, calories = _pool(5000)
+    start = time.perf_counter()
+    plan = MealPlanner(listing).optimize(2500, calories, seed=9)
+    assert time.perf_counter() - start < 0.5
+    assert all(day["within_tolerance"] for day in plan["days"])
+
+def _week_ids(plan):
+    return [meal["id"] for day in plan["days"] for meal in day["meals"]]
+
+def test_replace_swaps_one_balanced_meal():
+    listing, calories = _pool(300)
+    planner = MealPlanner(listing)
+    plan = planner.optimize(2100, calories, tolerance=0.05, seed=4)
+    swapped = planner.replace(plan, 2, 1, calories, seed=9)
+    before, after = _week_ids(plan), _week_ids(swapped)
+    changed = [i for i, (a, b) in enumerate(zip(before, after)) if a != b]
+    assert changed == [2 * len(MEAL_TIMES) + 1]
+    assert len(set(after)) == len(after) and after[changed[0]] not in before
+    day = swapped["days"][2]
+    assert day["within_tolerance"] and day["calories"] == sum(m["calories"] for m in day["meals"])
+    assert day["meals"][1]["slot"] == MEAL_TIMES[1]
+    # The original plan is left as it was
+    assert _week_ids(plan) == before
+
+def test_replace_redraws_a_whole_day():
+    listing, calories = _pool(300)
+    planner = MealPlanner(listing)
+    plan = planner.optimize(2100, calories, tolerance=0.05, seed=4)
+    swapped = planner.replace(plan, 0, calories=calories, seed=2)
+    assert swapped["days"][1:] == plan["days"][1:]
+    new = [meal["id"] for meal in swapped["days"][0]["meals"]]
+    assert not set(new) & set(_week_ids(plan))
+    assert swapped["days"][0]["within_tolerance"]
+
+def test_replace_in_random_plan(meals_by_category):
+    planner = MealPlanner(meals_by_category)
+    plan = planner.plan(None, seed=3)
+    swapped = planner.replace(plan, 6, 0, seed=1)
+    assert len(set(_week_ids(swapped))) == 21
+    assert _week_ids(swapped)[:-3] == _week_ids(plan)[:-3]
+
+def test_replace_fails_when_pool_is_used_up():
+    planner = MealPlanner({"Vegan": _listing(*[str(i) for i in range(21)])})
+    with pytest.raises(MealPlanError, match="No unused meals"):
+        planner.replace(planner.plan(None, seed=1), 0, 0)
+
+def test_candidate_index_intersects_preferences(meals_by_category):
+    from meal_planner import CandidateIndex
+    planner = MealPlanner(meals_by_category)
+    ids = list(planner.pool)
+    ingredients = {ids[0]: ["Pork Chops", "Salt"], ids[11]: ["Peanut Butter"], ids[12]: ["Peanuts"]}
+    index = CandidateIndex(planner, ingredients)
+    assert index.planner_for(None) is planner
+
+    chicken_or_vegan = index.planner_for({"allowed categories": ["Chicken", "Vegan"],
+                                          "excluded ingredients": ["peanut"]})
+    assert {m["category"] for m in chicken_or_vegan.pool.values()} == {"Chicken", "Vegan"}
+    assert len(chicken_or_vegan.pool) == 18 and ids[11] not in chicken_or_vegan.pool
+    # A run of words in an ingredient matches, so "pork" excludes "pork chop"
+    assert ids[0] not in index.planner_for({"excluded ingredients": ["Pork"]}).pool
+    assert index.planner_for({"excluded categories": ["Beef"], "allowed categories": None}).pool.keys() == \
+        {i for i in ids if planner.pool[i]["category"] != "Beef"}
+    # The same eligible set reuses its planner
+    assert index.planner_for({"allowed categories": ["Vegan", "Chicken"], "excluded ingredients": ["Peanuts"]}) \
+        is chicken_or_vegan
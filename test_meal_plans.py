@@ -0,0 +1,89 @@
+import pytest
+import diet_plan
+from fake_meal_api import FakeMealAPI, make_catalog
+from goals import Goals
+from meal_catalog import MealCatalog
+from meal_plans import MealPlanStore, week_start
+from preferences import DietaryPreferences
+
+@pytest.fixture
+def tracker(tmp_path, monkeypatch):
+    path = str(tmp_path / "health_tracker.db")
+    api = FakeMealAPI(make_catalog(diet_plan.CATEGORIES, meals_per_category=5)).start()
+    catalog = MealCatalog(path, base_url=api.base_url)
+    monkeypatch.setattr(diet_plan, "_catalog", catalog)
+    goals = Goals(path)
+    goals.user_info.user_account("anna", "anna@example.com", "password123", "Anna", "Lee", 1990, "female")
+    goals.health_record.add_or_update_measurements("anna", 60, 1.65)
+    goals.set_calorie_goal("anna", "maintain")
+    store = MealPlanStore(path)
+    yield goals, store, api
+    store.close()
+    goals.close()
+    catalog.close()
+    api.stop()
+
+def _target(goals):
+    return int(goals.get_goals("anna")["calorie intake"])
+
+def test_plan_is_stored_and_read_back(tracker):
+    goals, store, api = tracker
+    plan = diet_plan.current_plan("anna", _target(goals), store)
+    assert plan["week"] == week_start()
+    assert store.get_plan("anna") == plan
+    assert store.get_plan("anna", "2000-01-03") is None
+
+    requests = api.request_count
+    assert diet_plan.current_plan("anna", _target(goals), store) == plan
+    assert api.request_count == requests
+
+def test_goal_change_discards_this_weeks_plan(tracker):
+    goals, store, _ = tracker
+    plan = diet_plan.current_plan("anna", _target(goals), store)
+    store.save_plan("anna", plan, "2000-01-03")
+
+    goals.set_calorie_goal("anna", "maintain")
+    assert store.get_plan("anna") == plan
+
+    goals.set_calorie_goal("anna", "lose")
+    assert store.get_plan("anna") is None
+    # Earlier weeks are history and stay
+    assert store.get_plan("anna", "2000-01-03") is not None
+    assert diet_plan.current_plan("anna", _target(goals), store)["calorie_goal"] == _target(goals)
+
+def test_swap_keeps_the_rest_of_the_stored_plan(tracker):
+    goals, store, api = tracker
+    plan = diet_plan.current_plan("anna", _target(goals), store)
+    requests = api.request_count
+    swapped = diet_plan.swap_meals("anna", _target(goals), diet_plan.parse_day("wed"),
+                                   diet_plan.parse_meal_time("Dinner"), store, seed=5)
+    # The catalog and its details are cached, so swapping makes no requests
+    assert api.request_count == requests
+    assert store.get_plan("anna") == swapped
+    assert swapped["days"][2]["meals"][2]["id"] != plan["days"][2]["meals"][2]["id"]
+    assert swapped["days"][3:] == plan["days"][3:]
+
+def test_swap_without_a_goal_raises(tracker):
+    goals, _, _ = tracker
+    goals.user_info.user_account("bo", "bo@example.com", "password123", "Bo", "Kim", 1990, "male")
+    with pytest.raises(ValueError, match="No calorie goal"):
+        diet_plan.swap_and_display_meal_plan("bo", "mon", "", goals)
+
+def test_preferences_restrict_and_replace_the_plan(tracker):
+    goals, store, _ = tracker
+    preferences = DietaryPreferences(store.database)
+    try:
+        assert preferences.set_preferences("anna", ["meat"])[0] is False
+        diet_plan.current_plan("anna", _target(goals), store)
+        ok, _ = preferences.set_preferences("anna", ["vegan", "Vegetarian", "pasta", "chicken", "seafood", "beef"],
+                                            ["Beef"], ["Peanuts"])
+        assert ok and preferences.get_preferences("anna") == {
+            "allowed categories": ["Beef", "Chicken", "Pasta", "Seafood", "Vegan", "Vegetarian"],
+            "excluded categories": ["Beef"], "excluded ingredients": ["peanut"]}
+    finally:
+        preferences.close()
+    # Changing preferences discards the stored plan
+    assert store.get_plan("anna") is None
+    plan = diet_plan.current_plan("anna", _target(goals), store)
+    categories = {meal["category"] for day in plan["days"] for meal in day["meals"]}
+    assert "Beef" not in categories
@@ -0,0 +1,84 @@
+import sqlite3
+import pytest
+import diet_plan
+import metrics
+from fake_meal_api import FakeMealAPI, make_catalog
+from meal_catalog import MealCatalog
+from personal_record import PersonalRecord
+
+@pytest.fixture
+def collecting():
+    metrics.registry.reset()
+    metrics.enable()
+    yield metrics.registry
+    metrics.disable()
+    metrics.registry.reset()
+
+def test_disabled_records_nothing(tmp_path):
+    record = PersonalRecord(str(tmp_path / "health_tracker.db"))
+    try:
+        record.add_or_update_measurements("anna", 60, 1.65)
+        assert type(record.conn) is sqlite3.Connection
+    finally:
+        record.close()
+    assert metrics.registry.snapshot() == {"counters": {}, "histograms": {}}
+
+def test_operations_count_sql(tmp_path, collecting):
+    record = PersonalRecord(str(tmp_path / "health_tracker.db"))
+    try:
+        record.add_or_update_measurements("anna", 60, 1.65)
+        record.get_health_data("anna")
+    finally:
+        record.close()
+    snapshot = collecting.snapshot()
+    write = '{operation="PersonalRecord.add_or_update_measurements"}'
+    read = '{operation="PersonalRecord.get_health_data"}'
+    assert snapshot["histograms"]["operation_seconds"][write]["count"] == 1
+    # BEGIN, two inserts, mark dirty, COMMIT
+    assert snapshot["counters"]["sql_statements_total"][write] == 5
+    assert snapshot["counters"]["sql_rows_written_total"][write] == 2
+    assert snapshot["counters"]["sql_rows_read_total"][read] == 1
+
+def test_nested_operations_include_callees(collecting):
+    @metrics.timed("inner")
+    def inner():
+        metrics._count_sql(0, 2)
+
+    @metrics.timed("outer")
+    def outer():
+        metrics._count_sql(0, 1)
+        inner()
+
+    outer()
+    statements = collecting.snapshot()["counters"]["sql_statements_total"]
+    assert statements == {'{operation="inner"}': 2, '{operation="outer"}': 3}
+
+def test_http_requests_counted(tmp_path, collecting):
+    api = FakeMealAPI(make_catalog(diet_plan.CATEGORIES)).start()
+    catalog = MealCatalog(str(tmp_path / "health_tracker.db"), base_url=api.base_url, retries=0)
+    try:
+        catalog.get_category("Beef")
+        api.fail_next = 1
+        catalog.invalidate()
+        catalog.get_category("Beef")
+    finally:
+        catalog.close()
+        api.stop()
+    host = api.base_url.split("//")[1]
+    counters = collecting.snapshot()["counters"]
+    assert counters["http_requests_total"] == {f'{{host="{host}",status="200"}}': 1,
+                                               f'{{host="{host}",status="500"}}': 1}
+    assert counters["http_request_errors_total"] == {f'{{host="{host}"}}': 1}
+    assert counters["http_response_bytes_total"][f'{{host="{host}"}}'] > 1000
+
+def test_prometheus_export(tmp_path, collecting):
+    collecting.observe("operation_seconds", 0.003, operation="login")
+    collecting.inc("sql_statements_total", 4, operation="login")
+    path = tmp_path / "metrics.prom"
+    metrics.write(str(path))
+    text = path.read_text()
+    assert "# TYPE health_tracker_operation_seconds histogram" in text
+    assert 'health_tracker_operation_seconds_bucket{operation="login",le="0.0025"} 0' in text
+    assert 'health_tracker_operation_seconds_bucket{operation="login",le="0.005"} 1' in text
+    assert 'health_tracker_operation_seconds_count{operation="login"} 1' in text
+    assert 'health_tracker_sql_statements_total{operation="login"} 4' in text
@@ -0,0 +1,62 @@
+import sqlite3
+import pytest
+import migrations
+
+@pytest.fixture
+def conn():
+    c = sqlite3.connect(":memory:")
+    yield c
+    c.close()
+
+def _tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index')")}
+
+def test_fresh_database_reaches_latest_version(conn):
+    assert migrations.current_version(conn) == 0
+    assert migrations.migrate(conn) == migrations.LATEST_VERSION
+    assert migrations.current_version(conn) == migrations.LATEST_VERSION
+    assert set(migrations.BASELINE_TABLES) <= _tables(conn)
+    rows = conn.execute("SELECT version FROM schema_version ORDER BY version").fetchall()
+    assert [r[0] for r in rows] == [m[0] for m in migrations.MIGRATIONS]
+
+def test_up_to_date_check_runs_one_query(conn):
+    migrations.migrate(conn)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    migrations.migrate(conn)
+    assert len(statements) == 1
+    assert statements[0].startswith("SELECT MAX(version)")
+
+def test_legacy_database_upgraded_in_place(conn):
+    conn.execute(migrations.BASELINE_TABLES["user_goals"])
+    conn.executemany(
+        "INSERT INTO user_goals (username, goal, bmr, calorie_intake) VALUES (?, ?, ?, ?)",
+        [("john", "lose", 1700, 2000), ("john", "gain", 1700, 3000)],
+    )
+    conn.commit()
+    migrations.migrate(conn)
+    rows = conn.execute("SELECT goal FROM user_goals WHERE username = 'john'").fetchall()
+    assert rows == [("gain",)]
+    assert "idx_user_goals_username" in _tables(conn)
+
+def test_failed_migration_rolls_back(conn, monkeypatch):
+    def broken(c):
+        c.execute("CREATE TABLE half_done (id INTEGER)")
+        raise RuntimeError("boom")
+    monkeypatch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS + [(99, "broken", broken)])
+    monkeypatch.setattr(migrations, "LATEST_VERSION", 99)
+    with pytest.raises(RuntimeError):
+        migrations.migrate(conn)
+    assert migrations.current_version(conn) == 0
+    assert "half_done" not in _tables(conn)
+    assert "users" not in _tables(conn)
+
+def test_history_backfilled_from_snapshots(conn):
+    conn.execute(migrations.BASELINE_TABLES["health_data"])
+    conn.execute(
+        "INSERT INTO health_data (username, weight, height, bmi, last_updated) VALUES ('ann', 60, 1.6, 23.4, '2024-05-01 08:00:00')"
+    )
+    conn.commit()
+    migrations.migrate(conn)
+    rows = conn.execute("SELECT username, weight, recorded_at FROM health_history").fetchall()
+    assert rows == [("ann", 60, "2024-05-01 08:00:00")]
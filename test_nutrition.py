@@ -0,0 +1,27 @@
+import pytest
+from nutrition import estimate_calories, lookup_ingredient, meal_calories, parse_grams
+
+@pytest.mark.parametrize("measure, grams", [
+    ("200g", 200), ("1kg", 1000), ("1 1/2 cups", 360), ("2 tbsp", 30), ("½ tsp", 2.5),
+    ("2-3 cloves", 10), ("3", 3 * 60), ("Juice of 1", 60), ("pinch", 0.5), ("To taste", 0), ("", 0),
+])
+def test_parse_grams(measure, grams):
+    assert parse_grams(measure, piece_grams=60) == pytest.approx(grams)
+
+def test_lookup_falls_back_to_shorter_names():
+    assert lookup_ingredient("Boneless Skinless Chicken Thighs") == lookup_ingredient("chicken thigh")
+    assert lookup_ingredient("Extra Virgin Olive Oil") == (884, None)
+    assert lookup_ingredient("Tomatoes") == lookup_ingredient("tomato")
+    assert lookup_ingredient("Xanthan Gum") is None
+
+def test_estimate_per_serving():
+    meal = {"strIngredient1": "Spaghetti", "strMeasure1": "400g",
+            "strIngredient2": "Olive Oil", "strMeasure2": "2 tbsp",
+            "strIngredient3": "Mystery Spice", "strMeasure3": "1 tsp",
+            "strIngredient4": "", "strMeasure4": ""}
+    assert estimate_calories(meal) == round((400 * 3.71 + 30 * 8.84) / 4)
+    assert estimate_calories({"strIngredient1": "Mystery Spice", "strMeasure1": "1 tsp"}) is None
+
+def test_meal_calories_skips_unknown_meals():
+    details = {"1": {"strIngredient1": "Rice", "strMeasure1": "100g"}, "2": {}, "3": {"strIngredient1": "Salt"}}
+    assert meal_calories(details) == {"1": 90}
@@ -0,0 +1,32 @@
+import pytest
+import password_hashing as ph
+
+COST = 10  # keep the tests fast
+
+def test_hash_round_trip():
+    stored = ph.hash_password("password123", COST)
+    assert stored.startswith(f"scrypt${COST}$")
+    assert ph.verify_password("password123", stored, COST) == (True, False)
+    assert ph.verify_password("password124", stored, COST) == (False, False)
+
+def test_hashes_are_salted():
+    assert ph.hash_password("password123", COST) != ph.hash_password("password123", COST)
+
+def test_legacy_hash_verifies_and_needs_rehash():
+    stored = ph.legacy_hash("password123")
+    assert ph.is_legacy_hash(stored)
+    assert ph.verify_password("password123", stored) == (True, True)
+    assert ph.verify_password("wrong", stored) == (False, False)
+
+def test_cost_change_needs_rehash():
+    stored = ph.hash_password("password123", COST)
+    assert ph.verify_password("password123", stored, COST + 1) == (True, True)
+
+@pytest.mark.parametrize("stored", ["", "bcrypt$1$2$3$00$00", "scrypt$x$8$1$00$00", "scrypt$10$8$1$zz$00", "scrypt$10$8$1$00$zz"])
+def test_malformed_hash_never_matches(stored):
+    assert ph.verify_password("password123", stored) == (False, False)
+
+def test_pool_verifies_concurrently():
+    stored = ph.hash_password("password123", COST)
+    futures = [ph.submit_verify("password123", stored, COST) for _ in range(8)]
+    assert all(f.result() == (True, False) for f in futures)
@@ -6,17 +6,18 @@ from personal_record import PersonalRecord
 TEST_DB = "test_health_tracker.db"
 
 @pytest.fixture
-def record():
+def record(tmp_path):
     if os.path.exists(TEST_DB):
         os.remove(TEST_DB)
     
-    pr = PersonalRecord()
+    pr = PersonalRecord(str(tmp_path / "health_tracker.db"))
     pr.conn = sqlite3.connect(TEST_DB)
     pr.cursor = pr.conn.cursor()
     pr.create_health_table()
     yield pr
 
     pr.conn.close()
+    pr.close()
     os.remove(TEST_DB)
 
 def test_table_creation(record):
@@ -54,4 +55,27 @@ def test_update_health_data(record):
 
 def test_get_health_data_for_nonexistent_user(record):
     data = record.get_health_data("nonexistent")
-    assert data is None
\ No newline at end of file
+    assert data is None
+
+def test_history_keeps_every_measurement(record):
+    record.add_or_update_measurements("hist", 80, 1.8)
+    record.add_or_update_measurements("hist", 78, 1.8)
+    record.add_or_update_measurements("hist", 75, 1.8)
+    history = record.get_health_history("hist")
+    assert [h["weight in kg"] for h in history] == [80, 78, 75]
+    assert record.get_health_data("hist")["weight in kg"] == 75
+
+def test_history_time_bounds(record):
+    record.add_or_update_measurements("hist", 80, 1.8)
+    assert record.get_health_history("hist", since="9999") == []
+    assert record.get_health_history("hist", until="0000") == []
+    assert len(record.get_health_history("hist", since="2000-01-01")) == 1
+
+def test_latest_value_uses_index_without_sorting(record):
+    plan = record.cursor.execute("""
+        EXPLAIN QUERY PLAN
+        SELECT weight FROM health_history WHERE username = ?
+        ORDER BY recorded_at DESC, id DESC LIMIT 1
+    """, ("hist",)).fetchall()
+    assert "idx_health_history_user_time" in str(plan)
+    assert "TEMP B-TREE" not in str(plan)
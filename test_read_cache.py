@@ -0,0 +1,97 @@
+import pytest
+from datetime import datetime
+import goal_staleness
+from read_cache import GOALS, HEALTH, PROFILE, ReadCache
+import goals as goals_module
+import user_information
+from goals import Goals
+
+def test_hits_misses_and_lru_eviction():
+    cache = ReadCache(max_entries=2)
+    loads = []
+    load = lambda name: (lambda: loads.append(name) or {"name": name})
+    cache.get(PROFILE, "a", load("a"))
+    cache.get(PROFILE, "b", load("b"))
+    cache.get(PROFILE, "a", load("a"))
+    cache.get(PROFILE, "c", load("c"))
+    cache.get(PROFILE, "b", load("b"))
+    assert loads == ["a", "b", "c", "b"]
+    assert (cache.hits, cache.misses) == (1, 4)
+    assert len(cache) == 2
+
+def test_returned_values_are_copies():
+    cache = ReadCache()
+    cache.get(HEALTH, "a", lambda: {"bmi": 20})["bmi"] = 99
+    assert cache.get(HEALTH, "a", lambda: None) == {"bmi": 20}
+
+def test_invalidate_by_kind_and_racing_loads():
+    cache = ReadCache()
+    cache.get(HEALTH, "a", lambda: 1)
+    cache.get(GOALS, "a", lambda: 2)
+    cache.invalidate("a", HEALTH)
+    assert cache.get(GOALS, "a", lambda: 0) == 2
+    assert cache.get(HEALTH, "a", lambda: 3) == 3
+
+    # A write landing while a value loads must not leave the old value cached
+    cache.get(PROFILE, "a", lambda: cache.invalidate("a") or "stale")
+    assert cache.get(PROFILE, "a", lambda: "fresh") == "fresh"
+
+@pytest.fixture
+def goals(tmp_path):
+    g = Goals(str(tmp_path / "health_tracker.db"))
+    g.user_info.user_account("anna", "anna@example.com", "password123", "Anna", "Lee", 1990, "female")
+    g.health_record.add_or_update_measurements("anna", 60, 1.65)
+    yield g
+    g.close()
+
+def test_hot_reads_skip_sqlite(goals):
+    statements = []
+    goals.conn.set_trace_callback(statements.append)
+    goals.set_calorie_goal("anna", "lose")
+    first = len(statements)
+    goals.set_calorie_goal("anna", "gain")
+    # The second time only the goal write's transaction reaches SQLite (the
+    # DELETEs clear the dirty mark and meal plans made for the old target)
+    assert [s.split()[0] for s in statements[first:]] == ["BEGIN", "INSERT", "DELETE", "DELETE", "DELETE", "COMMIT"]
+    assert goals.get_goals("anna")["goal"] == "gain"
+    assert goals.db.cache.hits >= 3
+
+def test_writes_invalidate_cached_reads(goals):
+    assert goals.health_record.get_health_data("anna")["weight in kg"] == 60
+    goals.health_record.add_or_update_measurements("anna", 58, 1.65)
+    assert goals.health_record.get_health_data("anna")["weight in kg"] == 58
+
+    assert goals.user_info.get_workout_status("anna") is None
+    goals.user_info.update_workout_status("anna", 3, 1)
+    assert goals.user_info.get_workout_status("anna")["Workout days per week"] == 3
+
+    assert goals.user_info.get_user_profile("bob") is None
+    goals.user_info.user_account("bob", "bob@example.com", "password123", "Bob", "Lee", 1990, "male")
+    assert goals.user_info.get_user_profile("bob")["username"] == "bob"
+
+def test_cached_goals_from_last_year_are_reloaded(goals, monkeypatch):
+    goals.set_calorie_goal("anna", "lose")
+    assert goals.get_goals("anna")["goal"] == "lose"
+    # Behind the cache's back, so only a reload can see it
+    goals.conn.execute("UPDATE user_goals SET goal = 'gain' WHERE username = 'anna'")
+    goals.conn.commit()
+    assert goals.get_goals("anna")["goal"] == "lose"
+
+    next_year = goal_staleness.year_start(datetime.now().year + 1)
+    monkeypatch.setattr(goal_staleness, "year_start", lambda year=None: next_year)
+    assert goals.get_goals("anna")["goal"] == "gain"
+
+def test_new_year_recompute_uses_the_new_age(goals, monkeypatch):
+    goals.set_calorie_goal("anna", "lose")
+    before = goals.get_goals("anna")["calorie intake"]
+    assert goals.user_info.get_user_profile("anna")["age"] is not None
+
+    class NextYear(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz).replace(year=datetime.now().year + 1)
+    for module in (goal_staleness, goals_module, user_information):
+        monkeypatch.setattr(module, "datetime", NextYear)
+    # One more year of age lowers BMR by 5 kcal, times the sedentary multiplier
+    assert goals.get_goals("anna")["calorie intake"] == before - 6
+    assert goals.user_info.get_user_profile("anna")["age"] == NextYear.now().year - 1990
@@ -0,0 +1,90 @@
+import pytest
+from datetime import datetime
+from goals import Goals
+from recompute import recompute_all_goals, recompute_stale_goals
+
+USERS = [
+    ("anna", "female", 1990, 60, 1.65, 0, 1.0, "lose"),
+    ("bob", "male", 1985, 85, 1.80, 3, 1.0, "maintain"),
+    ("carl", "male", 2000, 70, 1.75, 5, 1.5, "gain"),
+    ("dina", "female", 1970, 72, 1.60, 7, 2.0, "maintain"),
+]
+
+@pytest.fixture
+def goals(tmp_path):
+    g = Goals(str(tmp_path / "health_tracker.db"))
+    for name, gender, year, weight, height, days, duration, goal in USERS:
+        g.user_info.user_account(name, f"{name}@example.com", "password123", name, "Test", year, gender)
+        g.health_record.add_or_update_measurements(name, weight, height)
+        if days:
+            g.user_info.update_workout_status(name, days, duration)
+        assert g.set_calorie_goal(name, goal)[0]
+    yield g
+    g.close()
+
+def _targets(g):
+    return g.conn.execute("SELECT username, bmr, calorie_intake FROM user_goals ORDER BY username").fetchall()
+
+def test_batch_matches_per_user_path(goals):
+    expected = _targets(goals)
+    goals.conn.execute("UPDATE user_goals SET bmr = 0, calorie_intake = 0")
+    goals.conn.commit()
+
+    result = recompute_all_goals(goals.database)
+    assert result["users"] == len(USERS)
+    assert result["updated"] == len(USERS)
+    assert _targets(goals) == expected
+
+def test_batch_uses_given_year(goals):
+    before = {name: bmr for name, bmr, _ in _targets(goals)}
+    recompute_all_goals(goals.database, year=datetime.now().year + 1)
+    after = {name: bmr for name, bmr, _ in _targets(goals)}
+    # One more year of age lowers BMR by 5 kcal
+    assert all(after[name] == pytest.approx(before[name] - 5) for name in before)
+
+def test_invalid_rows_are_skipped(goals):
+    goals.conn.execute("UPDATE users SET gender = 'other' WHERE username = 'bob'")
+    goals.conn.execute("UPDATE user_goals SET calorie_intake = -1 WHERE username = 'bob'")
+    goals.conn.commit()
+    result = recompute_all_goals(goals.database)
+    assert result["skipped"] == 1
+    row = goals.conn.execute("SELECT calorie_intake FROM user_goals WHERE username = 'bob'").fetchone()
+    assert row[0] == -1
+
+def test_empty_database(tmp_path):
+    result = recompute_all_goals(str(tmp_path / "empty.db"))
+    assert result["users"] == 0
+
+def _dirty(g):
+    return [row[0] for row in g.conn.execute("SELECT username FROM dirty_goals ORDER BY username")]
+
+def test_input_changes_mark_goal_dirty(goals):
+    assert _dirty(goals) == []
+    goals.health_record.add_or_update_measurements("anna", 58, 1.65)
+    goals.user_info.update_workout_status("bob", 5, 1.0)
+    goals.user_info.user_account("eve", "eve@example.com", "password123", "Eve", "Test", 1990, "female")
+    goals.health_record.add_or_update_measurements("eve", 50, 1.60)
+    assert _dirty(goals) == ["anna", "bob"]
+
+def test_stale_goal_recomputed_on_read(goals):
+    before = goals.get_goals("anna")["calorie intake"]
+    goals.health_record.add_or_update_measurements("anna", 70, 1.65)
+    # 10 kg more raises BMR by 100 kcal, times the sedentary multiplier
+    assert goals.get_goals("anna")["calorie intake"] == pytest.approx(before + 120, abs=1)
+    assert _dirty(goals) == []
+
+def test_stale_batch_touches_only_stale_users(goals):
+    goals.conn.execute("UPDATE user_goals SET calorie_intake = 0")
+    goals.conn.commit()
+    goals.health_record.add_or_update_measurements("carl", 72, 1.75)
+
+    result = recompute_stale_goals(goals.database)
+    assert result["users"] == 1
+    targets = {name: calories for name, _, calories in _targets(goals)}
+    assert targets["carl"] > 0 and targets["anna"] == 0
+    assert _dirty(goals) == []
+
+def test_goals_from_earlier_years_are_stale(goals):
+    goals.conn.execute("UPDATE user_goals SET last_updated = '2000-06-01 00:00:00' WHERE username = 'dina'")
+    goals.conn.commit()
+    assert recompute_stale_goals(goals.database)["users"] == 1
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import pytest
+import diet_plan
+from fake_meal_api import FakeMealAPI, make_catalog, make_details
+from service import TrackerService
+
+ANNA = {"username": "anna", "email": "anna@example.com", "password": "password123",
+        "first_name": "Anna", "last_name": "Lee", "year_of_birth": 1990, "gender": "female"}
+
+@pytest.fixture
+def api():
+    server = FakeMealAPI(make_catalog(diet_plan.CATEGORIES)).start()
+    yield server
+    server.stop()
+
+async def call(port, method, path, body=None, token=None, raw=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = raw if raw is not None else (json.dumps(body).encode() if body is not None else b"")
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\nContent-Length: {len(data)}\r\n"
+    if token:
+        head += f"Authorization: Bearer {token}\r\n"
+    writer.write(head.encode() + b"\r\n" + data)
+    response = await reader.read()
+    writer.close()
+    status_line, _, payload = response.partition(b"\r\n\r\n")
+    return int(status_line.split()[1]), json.loads(payload)
+
+def run(service, scenario):
+    async def main():
+        port = await service.start()
+        try:
+            return await scenario(port)
+        finally:
+            await service.stop()
+    return asyncio.run(main())
+
+def make_service(tmp_path, api, **options):
+    return TrackerService(str(tmp_path / "health_tracker.db"), port=0, meal_base_url=api.base_url,
+                          hash_cost=4, **options)
+
+async def signed_in(port):
+    await call(port, "POST", "/signup", ANNA)
+    status, result = await call(port, "POST", "/login", {"username": "anna", "password": "password123"})
+    assert status == 200
+    return result["session"]
+
+def test_full_flow(tmp_path, api):
+    async def scenario(port):
+        token = await signed_in(port)
+        assert (await call(port, "GET", "/profile", token=token))[1]["profile"]["username"] == "anna"
+        assert (await call(port, "POST", "/record", {"weight": 60, "height": 165}, token))[0] == 200
+        assert (await call(port, "POST", "/workout", {"days": 3, "hours": 1}, token))[0] == 200
+        assert (await call(port, "POST", "/goals", {"goal": "lose"}, token))[0] == 200
+        status, result = await call(port, "GET", "/plan?seed=3", token=token)
+        assert status == 200
+        assert len(result["plan"]["days"]) == 7
+        assert (await call(port, "GET", "/plan?seed=3", token=token))[1]["plan"] == result["plan"]
+        # Without a seed the week's plan is stored, then read back without the catalog
+        stored = (await call(port, "GET", "/plan", token=token))[1]["plan"]
+        requests = api.request_count
+        assert (await call(port, "GET", "/plan", token=token))[1] == {"ok": True, "message": "ok", "plan": stored}
+        assert api.request_count == requests
+
+        assert (await call(port, "POST", "/logout", token=token))[0] == 200
+        assert (await call(port, "GET", "/goals", token=token))[0] == 401
+    run(make_service(tmp_path, api), scenario)
+
+def test_plan_reuses_the_candidate_index(tmp_path, api, monkeypatch):
+    monkeypatch.setattr(diet_plan, "_candidates", None)
+    service = make_service(tmp_path, api)
+    async def scenario(port):
+        token = await signed_in(port)
+        await call(port, "POST", "/record", {"weight": 60, "height": 165}, token)
+        await call(port, "POST", "/goals", {"goal": "lose"}, token)
+        assert (await call(port, "GET", "/plan?seed=1", token=token))[0] == 200
+        candidates = diet_plan._candidates
+        lookups = []
+        monkeypatch.setattr(service.catalog, "lookup_details", lambda ids: lookups.append(ids))
+        assert (await call(port, "GET", "/plan?seed=2", token=token))[0] == 200
+        assert lookups == [] and diet_plan._candidates is candidates
+    run(service, scenario)
+
+def test_errors(tmp_path, api):
+    async def scenario(port):
+        assert (await call(port, "POST", "/login", {"username": "anna", "password": "nope"}))[0] == 401
+        assert (await call(port, "GET", "/goals"))[0] == 401
+        assert (await call(port, "POST", "/signup", raw=b"{not json"))[0] == 400
+        assert (await call(port, "GET", "/nowhere"))[0] == 404
+        assert (await call(port, "DELETE", "/goals"))[0] == 405
+        token = await signed_in(port)
+        status, result = await call(port, "POST", "/record", {"weight": "heavy", "height": 165}, token)
+        assert status == 400 and "numeric" in result["message"]
+    run(make_service(tmp_path, api), scenario)
+
+def test_many_concurrent_clients(tmp_path, api):
+    async def scenario(port):
+        token = await signed_in(port)
+        results = await asyncio.gather(*(call(port, "GET", "/profile", token=token) for _ in range(50)))
+        assert all(status == 200 for status, _ in results)
+    run(make_service(tmp_path, api), scenario)
+
+def test_backpressure_and_health(tmp_path, api):
+    # A small catalog keeps the slow plan (listings, then meal details) short
+    api.catalog = make_catalog(diet_plan.CATEGORIES, meals_per_category=4)
+    api.details = make_details(api.catalog)
+    api.delay = 0.3
+    async def scenario(port):
+        token = await signed_in(port)
+        await call(port, "POST", "/record", {"weight": 60, "height": 165}, token)
+        await call(port, "POST", "/goals", {"goal": "lose"}, token)
+        slow = asyncio.ensure_future(call(port, "GET", "/plan", token=token))
+        await asyncio.sleep(0.2)
+        assert (await call(port, "GET", "/goals", token=token))[0] == 503
+        status, health = await call(port, "GET", "/health")
+        assert status == 200 and health["in_flight"] == 1 and health["rejected"] == 1
+        assert (await slow)[0] == 200
+    run(make_service(tmp_path, api, max_in_flight=1), scenario)
+
+def test_request_timeout(tmp_path, api):
+    api.delay = 1.0
+    async def scenario(port):
+        token = await signed_in(port)
+        await call(port, "POST", "/record", {"weight": 60, "height": 165}, token)
+        await call(port, "POST", "/goals", {"goal": "lose"}, token)
+        status, result = await call(port, "GET", "/plan", token=token)
+        assert status == 504 and "may still be applied" in result["message"]
+        # The download it was waiting on still holds the only slot
+        assert (await call(port, "GET", "/goals", token=token))[0] == 503
+        assert (await call(port, "GET", "/health"))[1]["in_flight"] == 1
+        for _ in range(50):
+            await asyncio.sleep(0.1)
+            if (await call(port, "GET", "/health"))[1]["in_flight"] == 0:
+                break
+        assert (await call(port, "GET", "/goals", token=token))[0] == 200
+    run(make_service(tmp_path, api, request_timeout=0.3, max_in_flight=1), scenario)
+
+def test_keep_alive_serves_several_requests(tmp_path, api):
+    async def scenario(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for _ in range(3):
+            writer.write(b"GET /health HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+            assert json.loads(await reader.readexactly(length))["ok"]
+        writer.close()
+    run(make_service(tmp_path, api), scenario)
+
+def test_metrics_endpoint(tmp_path, api):
+    import metrics
+    service = make_service(tmp_path, api, instrument=True)
+
+    async def scenario(port):
+        await signed_in(port)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nConnection: close\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        return response.decode()
+
+    try:
+        response = run(service, scenario)
+    finally:
+        metrics.disable()
+        metrics.registry.reset()
+    assert response.startswith("HTTP/1.1 200")
+    assert "Content-Type: text/plain" in response
+    assert 'health_tracker_operation_seconds_count{operation="UserInformation.insert_user"} 1' in response
+    assert 'health_tracker_server_request_seconds_count{route="/login",status="200"} 1' in response
@@ -0,0 +1,76 @@
+import time
+import pytest
+from sessions import MemorySessionStore, Session, SessionError, SQLiteSessionStore, username_of
+from personal_record import PersonalRecord
+from user_information import UserInformation
+
+def test_memory_store_round_trip_and_revoke():
+    store = MemorySessionStore()
+    session = store.create("anna")
+    assert store.get(session.token) is session
+    store.revoke(session.token)
+    assert store.get(session.token) is None
+    assert store.get("unknown") is None
+
+def test_memory_store_expires_sessions():
+    store = MemorySessionStore(ttl=0)
+    session = store.create("anna")
+    assert store.get(session.token) is None
+    assert len(store) == 0
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemorySessionStore(max_sessions=2)
+    first, second = store.create("a"), store.create("b")
+    store.get(first.token)
+    store.create("c")
+    assert store.get(second.token) is None
+    assert store.get(first.token) is first
+
+def test_sqlite_store_persists_hashed_tokens(tmp_path):
+    db_path = str(tmp_path / "health_tracker.db")
+    store = SQLiteSessionStore(db_path)
+    session = store.create("anna")
+    stored = [row[0] for row in store.conn.execute("SELECT token_hash FROM sessions")]
+    assert stored and session.token not in stored
+    store.close()
+
+    store = SQLiteSessionStore(db_path)
+    assert store.get(session.token).username == "anna"
+    store.revoke(session.token)
+    assert store.get(session.token) is None
+    store.close()
+
+def test_sqlite_store_writes_join_group_commit(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "health_tracker.db"))
+    try:
+        store.db.enable_group_commit()
+        session = store.create("anna")
+        store.revoke(session.token)
+        assert store.db.writer.writes == 2
+        assert store.get(session.token) is None
+    finally:
+        store.db.disable_group_commit()
+        store.close()
+
+def test_expired_session_is_rejected():
+    assert username_of("anna") == "anna"
+    assert username_of(Session("t", "anna", time.time() + 60)) == "anna"
+    with pytest.raises(SessionError):
+        username_of(Session("t", "anna", time.time() - 1))
+
+def test_operations_accept_a_session(tmp_path):
+    record = PersonalRecord(str(tmp_path / "health_tracker.db"))
+    session = MemorySessionStore().create("anna")
+    ok, _ = record.add_or_update_measurements(session, 60, 1.65)
+    assert ok
+    assert record.get_health_data("anna")["weight in kg"] == 60
+    record.close()
+
+def test_profile_lookup_raises_for_an_expired_session(tmp_path):
+    ui = UserInformation(str(tmp_path / "health_tracker.db"))
+    try:
+        ui.user_account("anna", "anna@example.com", "password123", "Anna", "Lee", 1990, "female")
+        with pytest.raises(SessionError):
+            ui.get_user_profile(Session("t", "anna", time.time() - 1))
+    finally:
+        ui.close()
@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+import pytest
+from bench_startup import import_profile
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+
+# Generous ceilings: importing main used to cost ~150 ms because it loaded
+# requests through diet_plan; it is now a few ms.
+BUDGET_MS = {"main": 40, "cli": 60}
+
+@pytest.mark.parametrize("module", ["main", "cli"])
+def test_entry_point_import_budget(module):
+    total, modules = import_profile(module)
+    assert total / 1000 < BUDGET_MS[module]
+    for heavy in ("requests", "numpy", "sqlite3", "diet_plan"):
+        assert heavy not in modules
+
+def test_import_has_no_filesystem_side_effects(tmp_path):
+    env = dict(os.environ, PYTHONPATH=REPO)
+    subprocess.run([sys.executable, "-c", "import main, cli"], cwd=tmp_path, env=env, check=True)
+    assert os.listdir(tmp_path) == []
@@ -122,3 +122,27 @@ def test_get_workout_status(user_info):
 def test_get_workout_status_nonexistent_user(user_info):
     status = user_info.get_workout_status("ghost")
     assert status is None
+
+def test_workout_history(user_info):
+    user_info.update_workout_status("John", 2, 1.0)
+    user_info.update_workout_status("John", 5, 0.5)
+    history = user_info.get_workout_history("John")
+    assert [h["Workout days per week"] for h in history] == [2, 5]
+    assert user_info.get_workout_status("John")["Workout days per week"] == 5
+
+def test_password_stored_salted(user_info):
+    user_info.user_account("john", "john@example.com", "password123", "John", "Thomas", 2000, "male")
+    user_info.cursor.execute("SELECT password_hash FROM users WHERE username = 'john'")
+    assert user_info.cursor.fetchone()[0].startswith("scrypt$")
+
+def test_legacy_hash_upgraded_on_login(user_info):
+    user_info.cursor.execute(
+        "INSERT INTO users (username, email, password_hash, year_of_birth, gender) VALUES (?, ?, ?, ?, ?)",
+        ("old", "old@example.com", user_info._hash_password("password123"), 1990, "male")
+    )
+    user_info.conn.commit()
+    assert user_info.login("old", "wrongpassword")[0] is False
+    assert user_info.login("old", "password123")[0] is True
+    user_info.cursor.execute("SELECT password_hash FROM users WHERE username = 'old'")
+    assert user_info.cursor.fetchone()[0].startswith("scrypt$")
+    assert user_info.login("old", "password123")[0] is True
@@ -1,75 +1,92 @@
 import sqlite3
 import hashlib
 import re
+import password_hashing
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from workout_status import WorkoutStatus
+from db import Repository, open_database
+from metrics import timed
+from migrations import migrate
+from read_cache import PROFILE
+from sessions import Session, UserRef, default_store, username_of
 
 database = "database/health_tracker.db"
 
-class UserInformation:
-    def __init__(self, db_path: str = "database/health_tracker.db"):
-        """Initialize the UserInformation class with optional database path."""
+class UserInformation(Repository):
+    @timed()
+    def __init__(self, db_path: str = "database/health_tracker.db",
+                 hash_cost: int = password_hashing.DEFAULT_COST):
+        """Initialize the UserInformation class with optional database path.
+        hash_cost is the scrypt cost (log2 N) for new password hashes."""
         self.database = db_path
-        self.conn = sqlite3.connect(self.database)
-        self.cursor = self.conn.cursor()
-        self.create_user_table()
-        self.workout_status = WorkoutStatus(self.cursor, self.conn)
+        self.hash_cost = hash_cost
+        self.db = open_database(self.database)
+        self.workout_status = WorkoutStatus(db=self.db)
         
     def create_user_table(self):  
         """ Create users table""" 
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                first_name TEXT,
-                last_name TEXT,
-                year_of_birth INTEGER, 
-                gender TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        self.conn.commit()
+        migrate(self.conn)
 
     def _hash_password(self, password: str) -> str:
-        """Hash the password using SHA-256."""
+        """Hash the password using SHA-256.
+
+        This is the legacy unsalted format, still recognised at login and
+        upgraded there; new accounts use password_hashing.hash_password.
+        """
         return hashlib.sha256(password.encode()).hexdigest()
 
-    def user_account(self, username: str, email: str, password: str, first_name: str, last_name: str, year_of_birth: int, gender: str) -> Tuple[bool, str]:
-        """Register a new user with username, email, password, first name, last name, year of birth
-           and check validation of username, email, and password. 
-        Returns: (success, message) tuple.
+    @staticmethod
+    def validate_account(username: str, email: str, password: Optional[str], year_of_birth: int, gender: str) -> Optional[str]:
+        """Check new account details.
+        Returns: the error message for the first invalid field, or None.
+        Pass password=None to skip the password check (pre-hashed imports).
         """
         # Validate username
         if not (3 <= len(username) <= 8):
-            return False, "Your username must be between 3 and 8 characters."
+            return "Your username must be between 3 and 8 characters."
         
         # Validate password length
-        if len(password) < 8:
-            return False, "Your password must be at least 8 characters long."
+        if password is not None and len(password) < 8:
+            return "Your password must be at least 8 characters long."
         
         # Validate email format
         email_regex = r"^[\w\.-]+@[\w\.-]+\.\w+$"
         if not re.match(email_regex, email):
-            return False, "Invalid email address"
+            return "Invalid email address"
         
         # Validate year_of_birth
         if not (1945 <= year_of_birth <= 2012):
-            return False, "Please enter a valid year of birth."
+            return "Please enter a valid year of birth."
         
         if gender.lower() not in {"male", "female"}:
-            return False, "Invalid input."
+            return "Invalid input."
+        return None
+
+    @timed()
+    def user_account(self, username: str, email: str, password: str, first_name: str, last_name: str, year_of_birth: int, gender: str) -> Tuple[bool, str]:
+        """Register a new user with username, email, password, first name, last name, year of birth
+           and check validation of username, email, and password. 
+        Returns: (success, message) tuple.
+        """
+        error = self.validate_account(username, email, password, year_of_birth, gender)
+        if error:
+            return False, error
         
+        password_hash = password_hashing.hash_password(password, self.hash_cost)
+        return self.insert_user(username, email, password_hash, first_name, last_name, year_of_birth, gender)
+
+    @timed()
+    def insert_user(self, username: str, email: str, password_hash: str, first_name: str, last_name: str, year_of_birth: int, gender: str) -> Tuple[bool, str]:
+        """Store an already validated account whose password was hashed by the caller.
+        Returns: (success, message) tuple.
+        """
         try:
-            password_hash = self._hash_password(password)
-            
-            self.cursor.execute(
-                    "INSERT INTO users (username, email, password_hash, first_name, last_name, year_of_birth, gender) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    (username, email, password_hash, first_name, last_name, year_of_birth, gender)
-                )
-            self.conn.commit()
+            self._write(self._write_user, username, email, password_hash, first_name, last_name, year_of_birth, gender)
+            cache = self._cache()
+            if cache is not None:
+                # Drop any cached "no such user" result
+                cache.invalidate(username, PROFILE)
                 
             return True, "User registered successfully"
             
@@ -80,28 +97,70 @@ class UserInformation:
                 return False, "Email already exists"
             return False, "Database Error"
 
+    def _write_user(self, cursor, *values):
+        cursor.execute(
+                "INSERT INTO users (username, email, password_hash, first_name, last_name, year_of_birth, gender) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                values
+            )
+
+    @timed()
     def login(self, username: str, password: str) -> Tuple[bool, str]:
         """
         Authenticate a user with username and password.
+        The hash check runs on the shared verifier pool. A legacy or
+        outdated hash is replaced with a current one on success.
         Returns:
             - (success, message) tuple.
         """
-        password_hash = self._hash_password(password)
-        self.cursor.execute(
-            "SELECT id FROM users WHERE username = ? AND password_hash = ?",
-            (username, password_hash)
-        )
-        user = self.cursor.fetchone()
-        if user:
-            return True, "Login successful"
-        return False, "Invalid username or password"
-
-
-    def get_user_profile(self, username: str) -> Optional[dict]:
+        user = self.get_password_hash(username)
+        stored = user if user else password_hashing.dummy_hash(self.hash_cost)
+        matches, needs_rehash = password_hashing.submit_verify(password, stored, self.hash_cost).result()
+        if not (user and matches):
+            return False, "Invalid username or password"
+        if needs_rehash:
+            self.set_password_hash(username, password_hashing.hash_password(password, self.hash_cost))
+        return True, "Login successful"
+
+    def get_password_hash(self, username: str) -> Optional[str]:
+        """Return the stored password hash, or None for an unknown user."""
+        self.cursor.execute("SELECT password_hash FROM users WHERE username = ?", (username,))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
+    def set_password_hash(self, username: str, password_hash: str):
+        self._write(lambda cursor: cursor.execute(
+            "UPDATE users SET password_hash = ? WHERE username = ?", (password_hash, username)))
+
+
+    @timed()
+    def login_session(self, username: str, password: str, store=None) -> Tuple[Optional[Session], str]:
+        """
+        Authenticate once and open a session in ``store`` (the process-wide
+        in-memory store by default). Pass the session to later operations
+        instead of the username.
+        Returns:
+            - (session or None, message) tuple.
+        """
+        success, message = self.login(username, password)
+        if not success:
+            return None, message
+        store = store if store is not None else default_store()
+        return store.create(username), message
+
+    @timed()
+    def get_user_profile(self, username: UserRef) -> Optional[dict]:
         """Retrieve user profile information.
         Returns:
             - None if user not found.
+        Results are served from the shared read cache when possible.
         """
+        username = username_of(username)
+        cache = self._cache()
+        if cache is not None:
+            return cache.get(PROFILE, username, lambda: self._load_user_profile(username))
+        return self._load_user_profile(username)
+
+    def _load_user_profile(self, username: str) -> Optional[dict]:
         try:
             self.cursor.execute(
                     """SELECT id, username, email, first_name, last_name, year_of_birth, gender, created_at 
@@ -130,15 +189,20 @@ class UserInformation:
         except Exception as e:
             return None
         
-    def update_workout_status(self, username: str, workout_days: int, duration: float) -> Tuple[bool, str]:
+    @timed()
+    def update_workout_status(self, username: UserRef, workout_days: int, duration: float) -> Tuple[bool, str]:
         return self.workout_status.add_or_update_workout(username, workout_days, duration)
 
-    def get_workout_status(self, username: str) -> Optional[dict]:
+    @timed()
+    def get_workout_status(self, username: UserRef) -> Optional[dict]:
          return self.workout_status.get_workout_status(username)
 
+    @timed()
+    def get_workout_history(self, username: UserRef, since: Optional[str] = None,
+                            until: Optional[str] = None) -> List[dict]:
+        return self.workout_status.get_workout_history(username, since, until)
+
     def close(self):
-        """ Close the database connection."""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
+        """ Release the shared database connection."""
+        self._release()
 
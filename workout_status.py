@@ -1,54 +1,73 @@
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
+from migrations import migrate
+import goal_staleness
+from db import Repository
+from read_cache import GOALS, WORKOUT
+from sessions import UserRef, username_of
 
-class WorkoutStatus:
-    def __init__(self, cursor, conn):
-        self.cursor = cursor
-        self.conn = conn
-        self.create_workout_table()
+class WorkoutStatus(Repository):
+    def __init__(self, cursor=None, conn=None, db=None):
+        """Use the shared Database ``db`` (with its per-thread connections,
+        read cache and group commit writer), or a fixed cursor and conn."""
+        self.db = db
+        if conn is not None:
+            self.conn = conn
+        if cursor is not None:
+            self.cursor = cursor
 
     def create_workout_table(self):
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS workout_status (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL,
-                workout_days_per_week INTEGER NOT NULL,
-                duration_per_day REAL NOT NULL,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (username) REFERENCES users(username)
-            )
-        """)
-        self.conn.commit()
-
-    def add_or_update_workout(self, username: str, workout_days: int, duration_per_day: float) -> Tuple[bool, str]:
+        migrate(self.conn)
+
+    @staticmethod
+    def validate_workout(workout_days: int, duration_per_day: float) -> Optional[str]:
+        """Return an error message if the workout values are out of range."""
         if not (0 <= workout_days <= 7 and duration_per_day > 0):
-            return False, "Workout days must be 0-7 and duration must be a positive number."
+            return "Workout days must be 0-7 and duration must be a positive number."
+        return None
+
+    def add_or_update_workout(self, username: UserRef, workout_days: int, duration_per_day: float) -> Tuple[bool, str]:
+        username = username_of(username)
+        error = self.validate_workout(workout_days, duration_per_day)
+        if error:
+            return False, error
 
         try:
-            self.cursor.execute("SELECT id FROM workout_status WHERE username = ?", (username,))
-            existing = self.cursor.fetchone()
-
-            if existing:
-                self.cursor.execute("""
-                    UPDATE workout_status
-                    SET workout_days_per_week = ?, duration_per_day = ?, last_updated = CURRENT_TIMESTAMP
-                    WHERE username = ?
-                """, (workout_days, duration_per_day, username))
-            else:
-                self.cursor.execute("""
-                    INSERT INTO workout_status (username, workout_days_per_week, duration_per_day)
-                    VALUES (?, ?, ?)
-                """, (username, workout_days, duration_per_day))
-
-            self.conn.commit()
-            return True, "Workout status updated successfully."
-        
+            self._write(self._write_workout, username, workout_days, duration_per_day)
         except Exception as e:
             return False, f"Error: {e}"
+        cache = self._cache()
+        if cache is not None:
+            cache.invalidate(username, WORKOUT, GOALS)
+        return True, "Workout status updated successfully."
 
-    def get_workout_status(self, username: str) -> Optional[dict]:
+    def _write_workout(self, cursor, username: str, workout_days: int, duration_per_day: float):
+        cursor.execute("""
+            INSERT INTO workout_history (username, workout_days_per_week, duration_per_day)
+            VALUES (?, ?, ?)
+        """, (username, workout_days, duration_per_day))
+        cursor.execute("""
+            INSERT INTO workout_status (username, workout_days_per_week, duration_per_day)
+            VALUES (?, ?, ?)
+            ON CONFLICT(username) DO UPDATE SET
+                workout_days_per_week = excluded.workout_days_per_week,
+                duration_per_day = excluded.duration_per_day,
+                last_updated = CURRENT_TIMESTAMP
+        """, (username, workout_days, duration_per_day))
+        goal_staleness.mark_dirty(cursor, username)
+
+    def get_workout_status(self, username: UserRef) -> Optional[dict]:
+        """Return the newest workout_history entry for the user."""
+        username = username_of(username)
+        cache = self._cache()
+        if cache is not None:
+            return cache.get(WORKOUT, username, lambda: self._load_workout_status(username))
+        return self._load_workout_status(username)
+
+    def _load_workout_status(self, username: str) -> Optional[dict]:
         self.cursor.execute("""
-            SELECT workout_days_per_week, duration_per_day, last_updated
-            FROM workout_status WHERE username = ?
+            SELECT workout_days_per_week, duration_per_day, substr(recorded_at, 1, 19)
+            FROM workout_history WHERE username = ?
+            ORDER BY recorded_at DESC, id DESC LIMIT 1
         """, (username,))
         result = self.cursor.fetchone()
         if result:
@@ -57,4 +76,23 @@ class WorkoutStatus:
                 "Average duration per day (hrs)": result[1],
                 "Last updated": result[2]
             }
-        return None
\ No newline at end of file
+        return None
+
+    def get_workout_history(self, username: UserRef, since: Optional[str] = None,
+                            until: Optional[str] = None) -> List[dict]:
+        """Return a user's workout entries, oldest first, optionally bounded
+        like PersonalRecord.get_health_history."""
+        username = username_of(username)
+        query = "SELECT workout_days_per_week, duration_per_day, recorded_at FROM workout_history WHERE username = ?"
+        params = [username]
+        if since:
+            query += " AND recorded_at >= ?"
+            params.append(since)
+        if until:
+            query += " AND recorded_at < ?"
+            params.append(until)
+        self.cursor.execute(query + " ORDER BY recorded_at, id", params)
+        return [
+            {"Workout days per week": row[0], "Average duration per day (hrs)": row[1], "Recorded at": row[2]}
+            for row in self.cursor.fetchall()
+        ]